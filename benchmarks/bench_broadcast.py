@@ -0,0 +1,90 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Compare sending breakpoints and resume-all to many sessions through a
+session group, which encodes each command once, with encoding it for
+every session as done before session groups.
+
+    python benchmarks/bench_broadcast.py [ sessions [ rounds ] ]
+"""
+
+import sys
+import time
+
+import cui
+
+import cui_pydevd
+from cui_pydevd import constants
+from cui_pydevd import payload
+
+
+class Connection(object):
+    """Counts the bytes written to a session."""
+
+    def __init__(self):
+        self.written = 0
+
+    def send_all(self, data):
+        self.written += len(data)
+
+
+def per_session(connections, file_mappings, rounds):
+    sequence_no = 1
+    for _ in range(rounds):
+        for line in range(100):
+            for connection, file_mapping in zip(connections, file_mappings):
+                argument = cui_pydevd.break_argument(file_mapping, line, '/src/module.py', line)
+                connection.send_all(payload.encode_command(constants.CMD_SET_BREAK,
+                                                           sequence_no, argument))
+                sequence_no += 2
+        for connection in connections:
+            connection.send_all(payload.encode_command(constants.CMD_THREAD_RESUME,
+                                                       sequence_no, '*'))
+            sequence_no += 2
+
+
+def grouped(group, rounds):
+    for _ in range(rounds):
+        for line in range(100):
+            group.broadcast(constants.CMD_SET_BREAK,
+                            cui_pydevd.break_argument(group.file_mapping, line,
+                                                      '/src/module.py', line))
+        group.resume_all()
+
+
+def measure(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    sessions = int(argv[1]) if len(argv) > 1 else 64
+    rounds = int(argv[2]) if len(argv) > 2 else 20
+
+    connections = [Connection() for _ in range(sessions)]
+    file_mappings = [cui.get_variable(constants.ST_FILE_MAPPING).copy()
+                     for _ in range(sessions)]
+    baseline = measure(per_session, connections, file_mappings, rounds)
+
+    group = cui_pydevd.SessionGroup('benchmark')
+    group.sessions.extend(Connection() for _ in range(sessions))
+    broadcast = measure(grouped, group, rounds)
+
+    commands = rounds * 101
+    print('%s sessions, %s commands each' % (sessions, commands))
+    print('per session: %8.2f ms  (%.2f us per command and session)'
+          % (1000 * baseline, 1e6 * baseline / (commands * sessions)))
+    print('broadcast:   %8.2f ms  (%.2f us per command and session)'
+          % (1000 * broadcast, 1e6 * broadcast / (commands * sessions)))
+    print('speedup:     %8.2fx' % (baseline / broadcast))
+    print('bytes written: %s per session, %s broadcast'
+          % (sum(c.written for c in connections), sum(c.written for c in group.sessions)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
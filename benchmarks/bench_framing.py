@@ -0,0 +1,100 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Measure inbound throughput for a large CMD_GET_VAR response, received
+in chunks of RECEIVE_SIZE bytes. Framing on the bytes level with
+LineFramer is compared with decoding each chunk and splitting lines of
+text, as LineBufferedSession does.
+
+    python benchmarks/bench_framing.py [ megabytes [ rounds ] ]
+"""
+
+import sys
+import time
+
+from urllib.parse import quote
+
+import cui
+
+from cui_pydevd import constants
+from cui_pydevd import framing
+from cui_pydevd import payload
+
+
+def get_var_response(megabytes):
+    """Encode a CMD_GET_VAR response of about ``megabytes`` MB."""
+    variable = '<var name="item_%s" type="str" qualifier="builtins" value="%s" />'
+    value = quote("'%s'" % ('x' * 200), '/>_= \t')
+    count = megabytes * 1000000 // len(variable % (0, value))
+    xml = '<xml>%s</xml>' % ''.join(variable % (index, value) for index in range(count))
+    return payload.encode_command(constants.CMD_GET_VAR, 2, quote(xml, '/<>_=" \t')), count
+
+
+def chunks(data):
+    return [data[start:start + constants.RECEIVE_SIZE]
+            for start in range(0, len(data), constants.RECEIVE_SIZE)]
+
+
+def text_lines(received):
+    """Decode and split like a line buffered session working on str."""
+    buffer = ''
+    lines = []
+    for data in received:
+        buffer += data.decode('utf-8')
+        *complete, buffer = buffer.split('\n')
+        lines.extend(complete)
+    return lines
+
+
+def byte_lines(received):
+    framer = framing.LineFramer()
+    lines = []
+    for data in received:
+        lines.extend(framer.feed(data))
+    return lines
+
+
+def parse(lines, file_mapping):
+    for line in lines:
+        if isinstance(line, str):
+            command, sequence_no, payload_raw = line.split('\t', 2)
+            command = int(command)
+        else:
+            command, sequence_no, payload_raw = payload.split_message(line)
+        payload.create_payload(file_mapping, command, payload_raw)
+
+
+def measure(fn, rounds):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    megabytes = int(argv[1]) if len(argv) > 1 else 8
+    rounds = int(argv[2]) if len(argv) > 2 else 5
+
+    data, count = get_var_response(megabytes)
+    received = chunks(data)
+    file_mapping = cui.get_variable(constants.ST_FILE_MAPPING)
+    size = len(data) / 1e6
+
+    print('%.2f MB GET_VAR response, %s variables, %s chunks'
+          % (size, count, len(received)))
+    for name, frame in (('text', text_lines), ('bytes', byte_lines)):
+        framed = measure(lambda: frame(received), rounds)
+        total = measure(lambda: parse(frame(received), file_mapping), rounds)
+        print('%-5s framing %8.2f ms (%7.1f MB/s), with parsing %8.2f ms (%6.1f MB/s)'
+              % (name, 1000 * framed, size / framed, 1000 * total, size / total))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
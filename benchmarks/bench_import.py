@@ -0,0 +1,73 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Measure the cost cui_pydevd adds to the startup of cui: the time to
+import the package, measured with -X importtime in a fresh interpreter,
+and the time spent in ``initialize``.
+
+    python benchmarks/bench_import.py [ runs ]
+"""
+
+import statistics
+import subprocess
+import sys
+
+STARTUP = """
+import socket, sys, time
+import cui
+started = time.perf_counter()
+import cui_pydevd
+imported = time.perf_counter()
+from cui_pydevd import constants
+# Let the server listen on a free port
+probe = socket.socket()
+probe.bind(('localhost', 0))
+port = probe.getsockname()[1]
+probe.close()
+cui.set_variable(constants.ST_PORT, port)
+cui_pydevd.initialize()
+initialized = time.perf_counter()
+sys.stdout.write('%f %f\\n' % (imported - started, initialized - imported))
+"""
+
+
+def import_times():
+    """Return cumulative import time in us per module of cui_pydevd."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import cui; import cui_pydevd'],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        module = module.strip()
+        if module.startswith('cui_pydevd'):
+            times[module] = int(cumulative)
+    return times
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    runs = int(argv[1]) if len(argv) > 1 else 10
+
+    imports, initializes = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP], stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout
+        imported, initialized = map(float, output.split())
+        imports.append(imported)
+        initializes.append(initialized)
+
+    print('%s runs, median' % runs)
+    print('import cui_pydevd:   %8.2f ms' % (1000 * statistics.median(imports)))
+    print('initialize():        %8.2f ms' % (1000 * statistics.median(initializes)))
+    print('cumulative import time per module (us):')
+    for module, cumulative in sorted(import_times().items(), key=lambda item: -item[1]):
+        print('  %-30s %8s' % (module, cumulative))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
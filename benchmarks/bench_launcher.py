@@ -0,0 +1,86 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Measure the time from starting a program to its first line, once run
+directly and once through pydevd_stub.py connected to a local server
+that accepts the connection and discards all traffic.
+
+    python benchmarks/bench_launcher.py [ runs ]
+
+Requires pydevd to be importable.
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    os.pardir, 'cui_pydevd', 'pydevd_stub.py')
+TARGET = "import sys\nsys.stdout.write('first line\\n')\nsys.stdout.flush()\n"
+
+
+def serve(listener):
+    """Accept debugger connections and drain them."""
+    def drain(connection):
+        with connection:
+            while connection.recv(65536):
+                pass
+    while True:
+        try:
+            connection, _ = listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=drain, args=(connection,), daemon=True).start()
+
+
+def time_to_first_line(command):
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    process.stdout.readline()
+    elapsed = time.perf_counter() - started
+    process.kill()
+    process.wait()
+    return elapsed
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    runs = int(argv[1]) if len(argv) > 1 else 10
+    try:
+        import pydevd
+    except ImportError:
+        print('pydevd is not installed, nothing to measure.', file=sys.stderr)
+        return 1
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('localhost', 0))
+    listener.listen(5)
+    port = listener.getsockname()[1]
+    threading.Thread(target=serve, args=(listener,), daemon=True).start()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as target:
+        target.write(TARGET)
+    try:
+        direct = [time_to_first_line([sys.executable, target.name]) for _ in range(runs)]
+        stub = [time_to_first_line([sys.executable, STUB, 'localhost', str(port), target.name])
+                for _ in range(runs)]
+    finally:
+        os.unlink(target.name)
+        listener.close()
+
+    print('%s runs, median time to first line' % runs)
+    print('direct:   %8.2f ms' % (1000 * statistics.median(direct)))
+    print('launcher: %8.2f ms' % (1000 * statistics.median(stub)))
+    print('overhead: %8.2f ms' % (1000 * (statistics.median(stub) - statistics.median(direct))))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Measure how many lines of debuggee output per second go through
+framing, parsing of CMD_WRITE_TO_CONSOLE and the output log, and how
+long a progress bar redrawing its line with carriage returns takes.
+
+    python benchmarks/bench_output.py [ lines ]
+
+Exits with status 1 if output is handled slower than 100k lines/s.
+"""
+
+import sys
+import time
+
+from urllib.parse import quote
+
+import cui
+
+from cui_pydevd import constants
+from cui_pydevd import framing
+from cui_pydevd import output
+from cui_pydevd import payload
+
+REQUIRED_LINES_PER_SECOND = 100000
+
+
+def console_traffic(lines):
+    """Encode ``lines`` lines of print output as pydevd sends them."""
+    data = bytearray()
+    for index in range(lines):
+        text = quote('line %s of output from the debuggee\n' % index, '/>_= ')
+        data += payload.encode_command(constants.CMD_WRITE_TO_CONSOLE, 2 * index,
+                                       '<xml><io s="%s" ctx="1"/></xml>' % text)
+    return bytes(data)
+
+
+def handle_output(data, log, file_mapping):
+    framer = framing.LineFramer()
+    for start in range(0, len(data), constants.RECEIVE_SIZE):
+        for line in framer.feed(data[start:start + constants.RECEIVE_SIZE]):
+            command, _, payload_raw = payload.split_message(line)
+            for item in payload.create_payload(file_mapping, command, payload_raw):
+                log.write(item['ctx'], item['text'])
+
+
+def progress_bar(log, redraws):
+    for index in range(redraws):
+        log.write(constants.OUTPUT_STDOUT, '%-50s\r' % ('#' * (index % 50)))
+
+
+def measure(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    lines = int(argv[1]) if len(argv) > 1 else 100000
+
+    data = console_traffic(lines)
+    log = output.OutputLog(cui.get_variable(constants.ST_OUTPUT_LINES) or 10000)
+    elapsed = measure(handle_output, data, log, cui.get_variable(constants.ST_FILE_MAPPING))
+    rate = lines / elapsed
+    print('%s lines, %.2f MB: %8.2f ms  (%.0f lines/s)'
+          % (lines, len(data) / 1e6, 1000 * elapsed, rate))
+
+    log = output.OutputLog(10000)
+    elapsed = measure(progress_bar, log, 20000)
+    print('20000 progress bar redraws: %8.2f ms, partial line %s chars'
+          % (1000 * elapsed, max(len(text) for _, text in log.partial_lines())))
+
+    if rate < REQUIRED_LINES_PER_SECOND:
+        print('slower than %s lines/s' % REQUIRED_LINES_PER_SECOND)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Measure decode cost and bytes on the wire of the variables of a frame,
+as CMD_GET_FRAME response in pydevd's XML line protocol and as DAP
+variables response fed through dap.DapTransport, which frames, decodes
+and maps it to the same payload.
+
+    python benchmarks/bench_payload.py [ variables [ rounds ] ]
+"""
+
+import sys
+import time
+
+from urllib.parse import quote
+
+import cui
+
+from cui_pydevd import constants
+from cui_pydevd import dap
+from cui_pydevd import payload
+
+
+def variables(count):
+    return [{'name': 'var_%s' % index,
+             'type': 'str' if index % 2 else 'int',
+             'value': "'<value %s>'" % index if index % 2 else str(index)}
+            for index in range(count)]
+
+
+def xml_response(variables):
+    """Encode ``variables`` like pydevd's frame variables response."""
+    xml = ''.join('<var name="%s" type="%s" qualifier="builtins" value="%s" />'
+                  % (variable['name'], variable['type'],
+                     quote(variable['value'], '/>_= \t')
+                     .replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;'))
+                  for variable in variables)
+    return payload.encode_command(constants.CMD_GET_FRAME, 2,
+                                  quote('<xml>%s</xml>' % xml, '/<>_=" \t'))
+
+
+def dap_response(request_seq, variables, reference=0):
+    return dap.encode_message({'seq': 2, 'type': 'response', 'request_seq': request_seq,
+                               'success': True, 'command': 'variables',
+                               'body': {'variables': [{'name': variable['name'],
+                                                       'type': variable['type'],
+                                                       'value': variable['value'],
+                                                       'variablesReference': reference}
+                                                      for variable in variables]}})
+
+
+class Group(object):
+    def __init__(self, file_mapping):
+        self.file_mapping = file_mapping
+        self.sequence_no = 1
+
+    def next_sequence_no(self):
+        self.sequence_no += 2
+        return self.sequence_no
+
+
+class Session(object):
+    def __init__(self, file_mapping):
+        self.group = Group(file_mapping)
+
+    def send_all(self, data):
+        pass
+
+
+def dap_transport(file_mapping):
+    """
+    Return a transport that listed the frame with the container
+    ``obj``, whose variables are requested with CMD_GET_VAR.
+    """
+    session = Session(file_mapping)
+    transport = dap.DapTransport(session)
+    transport.encode([(constants.CMD_GET_FRAME, 1, '1\t1\t')])
+    transport.feed(dap.encode_message({'seq': 2, 'type': 'response', 'request_seq': 1,
+                                       'success': True, 'command': 'scopes',
+                                       'body': {'scopes': [{'name': 'Locals',
+                                                            'variablesReference': 1}]}}))
+    transport.feed(dap_response(session.group.sequence_no, [{'name': 'obj', 'type': 'object', 'value': ''}],
+                                reference=5))
+    return transport
+
+
+def decode_xml(line, file_mapping, rounds):
+    for _ in range(rounds):
+        command, _, payload_raw = payload.split_message(line[:-1])
+        payload.create_payload(file_mapping, command, payload_raw)
+
+
+def decode_dap(transport, message, rounds):
+    elapsed = 0
+    for _ in range(rounds):
+        transport.encode([(constants.CMD_GET_VAR, 1, '1\t1\tFRAME\tobj')])
+        started = time.perf_counter()
+        transport.feed(message)
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def measure(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    count = int(argv[1]) if len(argv) > 1 else 100
+    rounds = int(argv[2]) if len(argv) > 2 else 1000
+
+    file_mapping = cui.get_variable(constants.ST_FILE_MAPPING)
+    values = variables(count)
+    line = xml_response(values)
+    message = dap_response(1, values)
+    xml = measure(decode_xml, line, file_mapping, rounds)
+    dap_ = decode_dap(dap_transport(file_mapping), message, rounds)
+
+    print('%s variables, %s rounds' % (count, rounds))
+    print('xml line protocol: %8.2f us per response, %7s bytes'
+          % (1e6 * xml / rounds, len(line)))
+    print('dap transport:     %8.2f us per response, %7s bytes'
+          % (1e6 * dap_ / rounds, len(message)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
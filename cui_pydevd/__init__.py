@@ -5,8 +5,11 @@
 import collections
 import cui
 import cui_source
+import functools
+import itertools
 import json
 import os
+import weakref
 
 from cui.tools import server
 from cui.tools import file_mapping
@@ -14,7 +17,10 @@ from cui.util import find_index
 
 from cui_pydevd import buffers
 from cui_pydevd import constants
-from cui_pydevd import payload
+
+# Feature modules and the payload parsers are imported where they are
+# first used, so loading cui_pydevd does not pay for them before a
+# debuggee connects.
 
 cui.def_foreground('comment',         'yellow')
 cui.def_foreground('keyword',         'magenta')
@@ -29,39 +35,188 @@ cui.def_variable(constants.ST_SERVER,       None)
 cui.def_variable(constants.ST_DEBUG_LOG,    False)
 cui.def_variable(constants.ST_FILE_MAPPING, file_mapping.FileMapping())
 cui.def_variable(constants.ST_SERIALIZE_BREAKPOINTS, True)
+cui.def_variable(constants.ST_SESSION_GROUP, 'default')
+cui.def_variable(constants.ST_ARRAY_PAGE_ROWS, 20)
+cui.def_variable(constants.ST_ARRAY_PAGE_COLS, 8)
+cui.def_variable(constants.ST_SEARCH_MAX_DEPTH, 5)
+cui.def_variable(constants.ST_SEARCH_MAX_NODES, 5000)
+cui.def_variable(constants.ST_SEARCH_WINDOW, 8)
+cui.def_variable(constants.ST_OUTPUT_LINES,  10000)
+cui.def_variable(constants.ST_OUTPUT_REFRESH, 0.2)
+cui.def_variable(constants.ST_REQUEST_TIMEOUT, 10.0)
+cui.def_variable(constants.ST_REQUEST_RETRIES, 1)
+cui.def_variable(constants.ST_PROFILE_INTERVAL, 0.05)
+cui.def_variable(constants.ST_HISTORY,       False)
+cui.def_variable(constants.ST_HISTORY_MAX_BYTES, 16 * 1024 * 1024)
+cui.def_variable(constants.ST_HEADLESS,      False)
+cui.def_variable(constants.ST_PROJECT_ROOTS, [])
+cui.def_variable(constants.ST_REVALIDATE_SOURCES, False)
+cui.def_variable(constants.ST_PROTOCOL,      'line')
 
 cui.def_hook(constants.ST_ON_SET_FRAME)
 cui.def_hook(constants.ST_ON_SUSPEND)
 cui.def_hook(constants.ST_ON_RESUME)
 cui.def_hook(constants.ST_ON_KILL_THREAD)
 cui.def_hook(constants.ST_ON_KILL_SESSION)
+cui.def_hook(constants.ST_ON_NEW_SESSION)
 
 
 class Command(object):
-    def __init__(self, command, sequence_no, payload):
+    """
+    A message received from pydevd. Only the header is parsed on
+    construction, the payload is decoded when first accessed.
+    """
+
+    def __init__(self, command, sequence_no, payload_raw, file_mapping):
         self.command = command
         self.sequence_no = sequence_no
-        self.payload = payload
+        self.payload_raw = payload_raw
+        self._file_mapping = file_mapping
+        self._payload = None
+        self._parsed = False
+
+    @property
+    def payload(self):
+        if not self._parsed:
+            from cui_pydevd import payload
+            self._payload = payload.create_payload(self._file_mapping,
+                                                   self.command,
+                                                   self.payload_raw)
+            self._parsed = True
+        return self._payload
 
     @staticmethod
     def from_string(file_mapping, s):
-        command, sequence_no, payload_raw = s.split('\t', 2)
-        return Command(int(command),
-                       int(sequence_no),
-                       payload.create_payload(file_mapping, int(command), payload_raw))
+        from cui_pydevd import payload
+        return Command(*payload.split_message(s), file_mapping)
+
+    @staticmethod
+    def from_payload(command, sequence_no, payload):
+        """Return a message whose payload a transport has decoded."""
+        message = Command(command, sequence_no, None, None)
+        message._payload = payload
+        message._parsed = True
+        return message
+
+
+def break_argument(file_mapping, breakpoint_id, path, line,
+                   condition=None, log_expression=None, hit_count=None):
+    return '\t'.join([str(breakpoint_id),
+                      'python-line',
+                      file_mapping.to_other(path),
+                      str(line + 1),
+                      'None',
+                      str(condition),
+                      str(log_expression),
+                      str(hit_condition(hit_count)),
+                      str(log_expression is not None),
+                      'NONE'])
+
+
+def set_break_argument(file_mapping, path, line):
+    breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+    return break_argument(file_mapping, breakpoints.pydevd_id(path, line), path, line,
+                          **breakpoints.properties(path, line))
+
+
+def remove_break_argument(file_mapping, path, line, breakpoint_id=None):
+    if breakpoint_id is None:
+        breakpoint_id = cui.get_variable(constants.ST_BREAKPOINTS).pydevd_id(path, line)
+    return '\t'.join(['python-line',
+                      file_mapping.to_other(path),
+                      str(breakpoint_id)])
+
+
+def exception_break_argument(name, properties, condition=None):
+    return '\t'.join(['python-%s' % name,
+                      str(condition),
+                      'None',
+                      str(int(properties['caught'])),
+                      str(int(properties['uncaught'])),
+                      str(int(properties['project_only']))])
+
+
+def exception_registrations(exception_breakpoints):
+    """
+    Return the CMD_ADD_EXCEPTION_BREAK arguments by type name for
+    ``exception_breakpoints``.
+
+    pydevd suspends on the most specific registered type an exception
+    is an instance of. Each excluded type is registered as well, with
+    the caught and uncaught flags of the breakpoints excluding it and
+    condition False, so excluded exceptions never suspend and never
+    reach the frontend. Types with a breakpoint of their own are not
+    overridden by excludes.
+    """
+    registrations = collections.OrderedDict(
+        (name, exception_break_argument(name, properties))
+        for name, properties in exception_breakpoints.items())
+    excluded = collections.OrderedDict()
+    for properties in exception_breakpoints.values():
+        for name in properties['excludes']:
+            flags = excluded.setdefault(name, {'caught': False, 'uncaught': False,
+                                               'project_only': False})
+            flags['caught'] = flags['caught'] or properties['caught']
+            flags['uncaught'] = flags['uncaught'] or properties['uncaught']
+    for name, flags in excluded.items():
+        if name not in registrations:
+            registrations[name] = exception_break_argument(name, flags, False)
+    return registrations
+
+
+def project_roots_argument(file_mapping, roots):
+    return '\t'.join(file_mapping.to_other(root) for root in roots)
+
+
+def hit_condition(hit_count):
+    """
+    Translate a hit count threshold into a pydevd hit condition, which
+    is evaluated in the debuggee with @HIT@ replaced by the number of
+    times the breakpoint has been reached.
+    """
+    return None if hit_count is None else '@HIT@ >= %s' % hit_count
+
+
+class Stack(object):
+    """
+    Immutable signature of a suspended stack, a tuple of (file, name,
+    line) triples. Sessions intern stacks, so threads suspended with
+    identical stacks share the same instance.
+    """
+
+    __slots__ = ('frames', '__weakref__')
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def __eq__(self, other):
+        return isinstance(other, Stack) and self.frames == other.frames
+
+    def __hash__(self):
+        return hash(self.frames)
+
+    def __len__(self):
+        return len(self.frames)
 
 
 class D_Thread(object):
     def __init__(self, session, the_id, name, state=constants.THREAD_STATE_INITIAL):
         self.session = session
         self.id = the_id
+        # Names buffers and window set, taken over on re-attach
+        self.key = the_id
         self.name = name
         self.state = state
         self.frames = []
-        self.evals = set()
+        self.stack = None
+        self.watch_values = {}
+        self.search = None
+        from cui_pydevd import completion
+        self.completions = completion.Completions(self)
+        self._watches_pending = False
 
     def _init_window_set(self):
-        name = '%s %s' % (constants.WINDOW_SET_NAME, self.id)
+        name = '%s %s' % (constants.WINDOW_SET_NAME, self.key)
         if not cui.has_window_set(name):
             cui.new_window_set(name)
             cui.buffer_visible(buffers.ThreadBuffer, self.session,
@@ -85,6 +240,13 @@ class D_Thread(object):
     def resume(self):
         self.session.send_command(constants.CMD_THREAD_RESUME, self.id)
 
+    def run_to_line(self, path, line, condition=None):
+        """
+        Resume until ``line`` in ``path`` is reached, and if given,
+        ``condition`` evaluates to true there.
+        """
+        self.session.run_to_line(self, path, line, condition)
+
     def eval(self, frame, expr):
         try:
             compile(expr, '<string>', 'eval')
@@ -93,20 +255,44 @@ class D_Thread(object):
         else:
             method = constants.CMD_EVAL_EXPR
 
-        self.evals.add(
-            self.session.send_command(method,
-                                      "%(thread)s\t%(frame)s\tLOCAL\t%(expr)s\t0"
-                                      % {'thread': self.id,
-                                         'frame': frame.id,
-                                         'expr': expr}))
-
-    def on_eval(self, sequence_no, variables):
-        if sequence_no in self.evals:
-            self.evals.remove(sequence_no)
-            cui.exec_if_buffer_exists(lambda b: b.extend(*[v['value']
-                                                           for v in variables
-                                                           if v['vtype'] != 'NoneType']),
-                                      buffers.EvalBuffer, self)
+        self.session.add_eval_history(expr)
+        self.session.requests.send(method,
+                                   "%(thread)s\t%(frame)s\tLOCAL\t%(expr)s\t0"
+                                   % {'thread': self.id,
+                                      'frame': frame.id,
+                                      'expr': expr},
+                                   self, self._on_eval)
+
+    def eval_watches(self, frame):
+        """
+        Evaluate all watch expressions of the session in ``frame``.
+        The expressions are sent as one batch of pipelined
+        CMD_EVAL_EXPR commands, results are routed by sequence number.
+        """
+        watches = self.session.watches
+        if not watches:
+            return
+
+        self.session.requests.send_batch([
+            (constants.CMD_EVAL_EXPR,
+             '%(thread)s\t%(frame)s\tLOCAL\t%(expr)s\t0' % {'thread': self.id,
+                                                          'frame': frame.id,
+                                                          'expr': expr},
+             functools.partial(self._on_watch, expr))
+            for expr in watches
+        ], self)
+
+    def _on_watch(self, expr, variables):
+        value = variables[0]['value'] if variables else ''
+        previous = self.watch_values.get(expr)
+        self.watch_values[expr] = (value,
+                                   previous is not None and previous[0] != value)
+
+    def _on_eval(self, variables):
+        cui.exec_if_buffer_exists(lambda b: b.extend(*[v['value']
+                                                       for v in variables
+                                                       if v['vtype'] != 'NoneType']),
+                                  buffers.EvalBuffer, self)
 
     def update_thread(self, thread_info):
         if thread_info['type'] == 'thread_suspend':
@@ -114,7 +300,15 @@ class D_Thread(object):
             self._init_frames(thread_info['frames'])
         elif thread_info['type'] == 'thread_resume':
             self.state = constants.THREAD_STATE_RUNNING
+            if self.search:
+                self.search.cancel()
+            self.session.requests.cancel_thread(self)
+            if cui.get_variable(constants.ST_HISTORY):
+                from cui_pydevd import history
+                history.store.record(self, cui.get_variable(constants.ST_HISTORY_MAX_BYTES))
             self.frames = []
+            self.stack = None
+            self.completions.clear()
             cui.exec_if_buffer_exists(lambda b: b.set_file(),
                                       buffers.CodeBuffer, self)
             cui.run_hook(constants.ST_ON_RESUME, self)
@@ -127,35 +321,62 @@ class D_Thread(object):
                                        frame_info['file'],
                                        frame_info['name'],
                                        frame_info['line']))
+        self.stack = self.session.intern_stack(
+            tuple((frame.file, frame.name, frame.line) for frame in self.frames))
+        self._watches_pending = True
         frame = self.frames[0]
         cui.run_hook(constants.ST_ON_SUSPEND, self, frame.file, frame.line)
-        self.display_frame(frame)
+
+    def search_variables(self, frame, pattern):
+        """
+        Search variables reachable from ``frame`` whose name, type or
+        value contains ``pattern``, cancelling any running search.
+        """
+        if self.search:
+            self.search.cancel()
+        from cui_pydevd import search
+        self.search = search.VariableSearch(frame, pattern,
+                                            cui.get_variable(constants.ST_SEARCH_MAX_DEPTH),
+                                            cui.get_variable(constants.ST_SEARCH_MAX_NODES),
+                                            cui.get_variable(constants.ST_SEARCH_WINDOW))
+        self.search.start()
+        return self.search
 
     def display_frame(self, frame):
+        """
+        Display ``frame`` in the window set of this thread. Window set,
+        frame contents and watches are only requested here, so threads
+        of a suspend batch that are never looked at cost nothing.
+        """
         self._init_window_set()
+        if self._watches_pending:
+            self._watches_pending = False
+            self.eval_watches(self.frames[0])
         frame.display()
 
     def update(self, thread_info):
         self.name = thread_info['name']
 
-    def update_frame(self, sequence_no, variables):
-        for frame in self.frames:
-            if frame.pending == sequence_no:
-                frame.init_variables(variables)
-                for b in [buffers.EvalBuffer, buffers.FrameBuffer]:
-                    cui.exec_if_buffer_exists(lambda b: b.set_frame(frame), b, self)
-
-
-    def update_variable(self, sequence_no, variables):
-        for frame in self.frames:
-            if sequence_no in frame.pending_vars:
-                frame.update_variable(sequence_no, variables)
+    def close(self, keep_buffers=False):
+        if self.search:
+            self.search.cancel()
+        self.session.requests.cancel_thread(self)
+        from cui_pydevd import history
+        history.store.remove(self)
+        if not keep_buffers:
+            self.kill_buffers()
+        cui.run_hook(constants.ST_ON_KILL_THREAD, self)
 
-    def close(self):
-        for b in [buffers.CodeBuffer, buffers.FrameBuffer, buffers.EvalBuffer]:
+    def kill_buffers(self):
+        for b in THREAD_BUFFERS:
             cui.kill_buffer(b, self)
-        cui.delete_window_set_by_name('%s %s' % (constants.WINDOW_SET_NAME, self.id))
-        cui.run_hook(constants.ST_ON_KILL_THREAD, self)
+        cui.delete_window_set_by_name('%s %s' % (constants.WINDOW_SET_NAME, self.key))
+
+    def adopt(self, thread):
+        """Take over buffers and window set of ``thread``."""
+        self.key = thread.key
+        for b in THREAD_BUFFERS:
+            cui.exec_if_buffer_exists(lambda buf: buf.attach_thread(self), b, self)
 
     @staticmethod
     def from_thread_info(session, thread_info):
@@ -171,26 +392,36 @@ class D_Frame(object):
         self.line = line
         self.variables = None
         self.pending = None
-        self.pending_vars = {}
 
     def display(self):
         if self.variables is None and self.pending is None:
-            self.pending = self.thread.session.send_command(constants.CMD_GET_FRAME,
-                                                            '%s\t%s\t%s'
-                                                            % (self.thread.id, self.id, ''))
-
-        cui.exec_in_buffer_window(lambda b: b.set_file(self.file, self.line),
-                                  buffers.CodeBuffer, self.thread)
+            self.pending = self.thread.session.requests.send(constants.CMD_GET_FRAME,
+                                                             '%s\t%s\t%s'
+                                                             % (self.thread.id, self.id, ''),
+                                                             self.thread,
+                                                             self.init_variables,
+                                                             self._cancel_variables,
+                                                             idempotent=True)
+
+        self._display_source()
         cui.exec_if_buffer_exists(lambda b: b.set_frame(self),
                                   buffers.FrameBuffer, self.thread)
         cui.exec_if_buffer_exists(lambda b: b.set_frame(self),
                                   buffers.EvalBuffer, self.thread)
         cui.run_hook(constants.ST_ON_SET_FRAME, self.thread, self.file, self.line)
 
+    def _display_source(self):
+        path = self.thread.session.local_source(self.file, self.thread, self._display_source)
+        if path:
+            cui.exec_in_buffer_window(lambda b: b.set_file(self.file, self.line, path),
+                                      buffers.CodeBuffer, self.thread)
+
     def _extend_variables(self, variables, parent=None):
+        from cui_pydevd import arrays
         for variable in variables:
             variable['pending'] = None
-            variable['has_children'] = variable['isContainer']
+            # Arrays are inspected page-wise in an ArrayBuffer
+            variable['has_children'] = variable['isContainer'] and not arrays.is_array(variable)
             variable['parent'] = parent
             variable['variables'] = []
             variable['expanded'] = False
@@ -206,43 +437,163 @@ class D_Frame(object):
     def init_variables(self, variables):
         self.variables = self._extend_variables(variables)
         self.pending = None
+        expanded = self.thread.session.expanded.get((self.file, self.name))
+        if expanded:
+            self.expand_paths(sorted(expanded))
+        for b in [buffers.EvalBuffer, buffers.FrameBuffer]:
+            cui.exec_if_buffer_exists(lambda b: b.set_frame(self), b, self.thread)
 
-    def request_variable(self, variable):
-        if variable['pending']:
-            return
+    def _cancel_variables(self):
+        self.pending = None
 
-        path = self._get_path(variable)
-        joined_path = ' '.join(path)
-        arg_string = '%(thread)s\t%(frame)s\tFRAME\t%(path)s' % {
+    def inspect_array(self, variable):
+        from cui_pydevd import arrays
+        inspector = arrays.ArrayInspector(self, self._get_path(variable), variable['vtype'],
+                                          cui.get_variable(constants.ST_ARRAY_PAGE_ROWS),
+                                          cui.get_variable(constants.ST_ARRAY_PAGE_COLS))
+        inspector.fetch_summary()
+        inspector.fetch_page()
+        return inspector
+
+    def get_var_argument(self, path):
+        return '%(thread)s\t%(frame)s\tFRAME\t%(path)s' % {
             'thread': self.thread.id,
             'frame': self.id,
             'path': '\t'.join(path)
         }
-        sequence_no = self.thread.session.send_command(constants.CMD_GET_VAR,
-                                                       arg_string)
-        variable['pending'] = sequence_no
-        self.pending_vars[sequence_no] = variable
 
-    def update_variable(self, sequence_no, variables):
-        variable = self.pending_vars.pop(sequence_no)
+    def request_variable(self, variable, on_loaded=None):
+        if variable['pending']:
+            return
+
+        variable['pending'] = self.thread.session.requests.send(
+            constants.CMD_GET_VAR, self.get_var_argument(self._get_path(variable)), self.thread,
+            functools.partial(self.update_variable, variable, on_loaded),
+            functools.partial(self.cancel_variable, variable),
+            idempotent=True)
+
+    def cancel_variable(self, variable):
+        variable['pending'] = None
+
+    def update_variable(self, variable, on_loaded, variables):
         if variables:
             variable['variables'] = self._extend_variables(variables, variable)
         else:
             variable['has_children'] = False
         variable['pending'] = None
+        if on_loaded:
+            on_loaded()
+
+    def set_expanded(self, variable, expanded):
+        variable['expanded'] = expanded
+        self.thread.session.remember_expanded((self.file, self.name),
+                                              tuple(self._get_path(variable)),
+                                              expanded)
+
+    def expand_paths(self, paths, variables=None):
+        """
+        Expand the variables at each of ``paths`` and their ancestors.
+        Children that have not been loaded yet are requested as a single
+        batch per level.
+        """
+        fetch = []
+        self._expand_loaded(paths, self.variables if variables is None else variables, fetch)
+        if not fetch:
+            return
+
+        sequence_nos = self.thread.session.requests.send_batch([
+            (constants.CMD_GET_VAR,
+             self.get_var_argument(self._get_path(variable)),
+             functools.partial(self._on_expanded, variable, rest),
+             functools.partial(self.cancel_variable, variable))
+            for variable, rest in fetch
+        ], self.thread, idempotent=True)
+        for (variable, _), sequence_no in zip(fetch, sequence_nos):
+            variable['pending'] = sequence_no
+
+    def _expand_loaded(self, paths, variables, fetch):
+        rests = {}
+        for path in paths:
+            rests.setdefault(path[0], []).append(path[1:])
+        for variable in variables:
+            if variable['name'] not in rests or not variable['has_children']:
+                continue
+            rest = [path for path in rests[variable['name']] if path]
+            variable['expanded'] = True
+            if variable['variables']:
+                self._expand_loaded(rest, variable['variables'], fetch)
+            elif not variable['pending']:
+                fetch.append((variable, rest))
+
+    def _on_expanded(self, variable, paths, variables):
+        self.update_variable(variable, None, variables)
+        if paths:
+            self.expand_paths(paths, variable['variables'])
+
+    def expand_path(self, path, variables=None):
+        """
+        Expand the variables along ``path``, fetching children that
+        have not been loaded yet one level at a time.
+        """
+        for variable in self.variables if variables is None else variables:
+            if variable['name'] == path[0]:
+                if len(path) > 1 and variable['has_children']:
+                    variable['expanded'] = True
+                    if variable['variables']:
+                        self.expand_path(path[1:], variable['variables'])
+                    else:
+                        self.request_variable(variable,
+                                              lambda: self.expand_path(path[1:],
+                                                                       variable['variables']))
+                return
+
+
+THREAD_BUFFERS = [buffers.CodeBuffer, buffers.FrameBuffer, buffers.EvalBuffer, buffers.WatchBuffer,
+                  buffers.HistoryBuffer, buffers.SearchBuffer, buffers.ArrayBuffer]
+SESSION_BUFFERS = [buffers.ThreadBuffer, buffers.OutputBuffer, buffers.StatsBuffer,
+                   buffers.ProfileBuffer]
 
 
 class Session(server.LineBufferedSession):
     def __init__(self, socket):
+        from cui_pydevd import dap, framing, output, pending, profiler, reattach
+
         super(Session, self).__init__(socket)
+        # Names buffers, taken over on re-attach
+        self.key = reattach.store.unique_key('%s:%s' % self.address)
         self.threads = collections.OrderedDict()
-        self._sequence_no = 1
-        self._file_mapping = cui.get_variable(constants.ST_FILE_MAPPING).copy()
-
+        self.group = session_group(cui.get_variable(constants.ST_SESSION_GROUP))
+        self.group.add_session(self)
+        self._file_mapping = self.group.file_mapping
+        self._framer = framing.LineFramer()
+        # Translates commands and messages if the group speaks DAP
+        self.dap = dap.DapTransport(self) if self.group.protocol == 'dap' else None
+        self.output = output.OutputLog(cui.get_variable(constants.ST_OUTPUT_LINES))
+        self.watches = []
+        self._stacks = weakref.WeakValueDictionary()
+        self.sampler = profiler.Sampler(self)
+        self._temporary_breakpoints = []
+        self._temporary_breakpoint_ids = itertools.count(constants.TEMPORARY_BREAKPOINT_ID)
+        self._sources_checked = set()
+        self.identity = None
+        # Threads of the previous session with this identity by name,
+        # whose buffers have not been taken over yet
+        self._detached_threads = {}
+        self.expanded = {}
+        self.eval_history = []
+        self.requests = pending.RequestTracker(self,
+                                               cui.get_variable(constants.ST_REQUEST_TIMEOUT),
+                                               cui.get_variable(constants.ST_REQUEST_RETRIES))
+
+        if not cui.get_variable(constants.ST_HEADLESS):
+            init_layout()
         cui.get_variable(constants.ST_BREAKPOINTS).add_session(self)
 
-        # Initialize debugger, load threads, start process
-        self.send_command(constants.CMD_VERSION, 'cui\tWINDOWS\tLINE')
+        # Initialize debugger, load threads, start process. Hooks may
+        # send breakpoints that need to be set before the process runs.
+        self.send_command(constants.CMD_VERSION, 'cui\tWINDOWS\tID')
+        self._send_exception_breakpoints()
+        cui.run_hook(constants.ST_ON_NEW_SESSION, self)
         self.send_command(constants.CMD_LIST_THREADS)
         self.send_command(constants.CMD_RUN)
 
@@ -252,25 +603,27 @@ class Session(server.LineBufferedSession):
             settings_raw = json.load(f)
             self._file_mapping = settings_raw.get('file-mapping')
 
+    def _send_exception_breakpoints(self):
+        roots = cui.get_variable(constants.ST_PROJECT_ROOTS)
+        commands = [(constants.CMD_SET_PROJECT_ROOTS,
+                     project_roots_argument(self._file_mapping, roots))] if roots else []
+        commands.extend((constants.CMD_ADD_EXCEPTION_BREAK, argument)
+                        for argument in self.group.exception_registrations().values())
+        if commands:
+            self.send_commands(commands)
+
     def toggle_breakpoint(self, path, line, activate=True):
-        active_map = cui.get_variable(constants.ST_BREAKPOINTS) \
-                        ._active_map[_Breakpoints.breakpoint_id(path, line)]
+        breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+        breakpoints.touch(path)
+        active_map = breakpoints._active_map[_Breakpoints.breakpoint_id(path, line)]
         is_active = active_map.get(str(self), False)
         if is_active:
             self.send_command(constants.CMD_REMOVE_BREAK,
-                              '\t'.join(['python-line',
-                                         self._file_mapping.to_other(path),
-                                         str(line + 1)]))
+                              remove_break_argument(self._file_mapping, path, line))
             active_map[str(self)] = False
         elif not is_active and activate:
             self.send_command(constants.CMD_SET_BREAK,
-                              '\t'.join(['python-line',
-                                         self._file_mapping.to_other(path),
-                                         str(line + 1),
-                                         'None',
-                                         'THREAD',
-                                         'None',
-                                         'None']))
+                              set_break_argument(self._file_mapping, path, line))
             active_map[str(self)] = True
         else:
             active_map[str(self)] = is_active
@@ -279,25 +632,260 @@ class Session(server.LineBufferedSession):
         cui.message('pydevd version (%s): %s' % (self, version))
 
     def send_command(self, command, argument=''):
-        sequence_no = self._sequence_no
-        payload = ('%s\t%s\t%s\n'
-                   % (command, sequence_no, argument))
+        from cui_pydevd import payload
+        sequence_no = self.group.next_sequence_no()
+        if self.dap is not None:
+            data = self.dap.encode([(command, sequence_no, argument)])
+        else:
+            data = payload.encode_command(command, sequence_no, argument)
         if cui.get_variable(constants.ST_DEBUG_LOG):
-            cui.message('=== Sending command: \n%s' % (payload,))
-        self.send_all(payload.encode('utf-8'))
-        self._sequence_no += 2
+            cui.message('=== Sending command: \n%s' % (data.decode('utf-8'),))
+        self.send_all(data)
         return sequence_no
 
+    def send_commands(self, commands):
+        """
+        Send a list of (command, argument) tuples with a single write
+        and return their sequence numbers.
+        """
+        from cui_pydevd import payload
+        sequence_nos = [self.group.next_sequence_no() for _ in commands]
+        if self.dap is not None:
+            data = self.dap.encode([(command, sequence_no, argument)
+                                    for sequence_no, (command, argument)
+                                    in zip(sequence_nos, commands)])
+        else:
+            data = b''.join(payload.encode_command(command, sequence_no, argument)
+                            for sequence_no, (command, argument)
+                            in zip(sequence_nos, commands))
+        if cui.get_variable(constants.ST_DEBUG_LOG):
+            cui.message('=== Sending commands: \n%s' % (data.decode('utf-8'),))
+        self.send_all(data)
+        return sequence_nos
+
+    def intern_stack(self, frames):
+        stack = self._stacks.get(frames)
+        if stack is None:
+            stack = self._stacks[frames] = Stack(frames)
+        return stack
+
+    def run_to_line(self, thread, path, line, condition=None):
+        """
+        Set a temporary breakpoint, which is not part of _Breakpoints,
+        and resume ``thread`` with the same write. The debuggee checks
+        the condition, the breakpoint is removed when it is hit or when
+        ``thread`` suspends elsewhere.
+        """
+        breakpoint_id = next(self._temporary_breakpoint_ids)
+        self._temporary_breakpoints.append((thread, path, line, breakpoint_id))
+        self.send_commands([
+            (constants.CMD_SET_BREAK,
+             break_argument(self._file_mapping, breakpoint_id, path, line, condition or None)),
+            (constants.CMD_THREAD_RESUME, thread.id)
+        ])
+
+    def _remove_temporary_breakpoints(self, suspends):
+        """
+        Remove the temporary breakpoints hit by ``suspends``, and those
+        whose thread is among the suspended threads.
+        """
+        threads = set(item['id'] for item in suspends)
+        # Breakpoint lines are 0-based, frame lines 1-based
+        hits = set((item['frames'][0]['file'], item['frames'][0]['line'] - 1)
+                   for item in suspends
+                   if item['stop_reason'] == constants.CMD_SET_BREAK and item['frames'])
+        done = [temporary for temporary in self._temporary_breakpoints
+                if temporary[0].id in threads or temporary[1:3] in hits]
+        if done:
+            self.send_commands([
+                (constants.CMD_REMOVE_BREAK,
+                 remove_break_argument(self._file_mapping, path, line, breakpoint_id))
+                for _, path, line, breakpoint_id in done
+            ])
+            self._temporary_breakpoints = [temporary for temporary in self._temporary_breakpoints
+                                           if temporary not in done]
+
+    def local_source(self, path, thread, on_loaded):
+        """
+        Return a local file containing the source of ``path``. If the
+        mapped path does not exist locally, the source cache is used.
+
+        Cached sources are trusted, a source is only fetched from the
+        debuggee if it is not cached. With pydevds/revalidate-sources
+        set, cached sources are fetched again once per session as
+        well. Sources are fetched while ``thread`` is suspended, and
+        ``on_loaded`` is called if the result differs from the cached
+        one. Sources pydevd fails to load are not requested again in
+        this session.
+        """
+        if os.path.exists(path):
+            return path
+
+        from cui_pydevd import sources
+        remote_path = self._file_mapping.to_other(path)
+        cache = sources.cache()
+        cached = cache.lookup(remote_path)
+        if cached and not cui.get_variable(constants.ST_REVALIDATE_SOURCES):
+            return cached
+        if remote_path not in self._sources_checked and remote_path not in cache.loading:
+            def _on_source(source):
+                cache.loading.discard(remote_path)
+                if cache.store(remote_path, source) != cached:
+                    on_loaded()
+            def _on_cancel():
+                cache.loading.discard(remote_path)
+                self._sources_checked.discard(remote_path)
+            cache.loading.add(remote_path)
+            self._sources_checked.add(remote_path)
+            self.requests.send(constants.CMD_LOAD_SOURCE, remote_path, thread, _on_source,
+                               _on_cancel, on_fail=lambda: cache.loading.discard(remote_path))
+        return cached
+
+    def remember_expanded(self, key, path, expanded):
+        """
+        Remember that the variable at ``path`` in the frames of function
+        ``key``, (file, name), is expanded or collapsed. Collapsing a
+        variable forgets its expanded descendants.
+        """
+        paths = self.expanded.setdefault(key, set())
+        if expanded:
+            paths.add(path)
+        else:
+            paths.difference_update([p for p in paths if p[:len(path)] == path])
+
+    def add_eval_history(self, expr):
+        if expr in self.eval_history:
+            self.eval_history.remove(expr)
+        self.eval_history.append(expr)
+        del self.eval_history[:-constants.EVAL_HISTORY_SIZE]
+
+    def attach(self, identity):
+        """
+        Set the identity announced by the debuggee. If a session with
+        the same identity has been closed before, its state is restored,
+        only breakpoints not yet active in this session are sent.
+        """
+        from cui_pydevd import reattach
+        self.identity = identity
+        state = reattach.store.take(identity)
+        if state is None:
+            return
+
+        breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+        commands = []
+        for path, line in state.breakpoints:
+            if breakpoints.pydevd_id(path, line) is None:
+                continue
+            active_map = breakpoints.sessions(path, line)
+            if not active_map.get(str(self), False):
+                commands.append((constants.CMD_SET_BREAK,
+                                 set_break_argument(self._file_mapping, path, line)))
+                active_map[str(self)] = True
+                breakpoints.touch(path)
+        if commands:
+            self.send_commands(commands)
+
+        self.expanded = state.expanded
+        self.eval_history = state.eval_history
+        for expr in state.watches:
+            self.add_watch(expr)
+
+        self.key = state.session.key
+        for b in SESSION_BUFFERS:
+            cui.exec_if_buffer_exists(lambda buf: buf.attach_session(self), b, self)
+        self._detached_threads = state.threads
+        for thread in self.threads.values():
+            self._adopt_thread(thread)
+        cui.message('Restored state of %s for %s' % (identity, self))
+
+    def _adopt_thread(self, thread):
+        detached = self._detached_threads.pop(thread.name, None)
+        if detached is not None:
+            thread.adopt(detached)
+
+    def _detach(self):
+        """
+        Keep the state of this session for the next one with the same
+        identity. Buffers of threads are kept by thread name.
+        """
+        from cui_pydevd import reattach
+        threads = collections.OrderedDict()
+        for thread in list(self.threads.values()) + list(self._detached_threads.values()):
+            if thread.name in threads:
+                thread.kill_buffers()
+            else:
+                threads[thread.name] = thread
+
+        breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+        evicted = reattach.store.store(self.identity, reattach.SessionState(
+            self,
+            threads,
+            [(path, line)
+             for path in breakpoints.paths()
+             for line in breakpoints.breakpoints(path)
+             if breakpoints.sessions(path, line).get(str(self), False)],
+            self.expanded,
+            list(self.watches),
+            self.eval_history))
+        for state in evicted:
+            state.session.kill_buffers()
+            for thread in state.threads.values():
+                thread.kill_buffers()
+
+    def add_watch(self, expr):
+        if expr not in self.watches:
+            self.watches.append(expr)
+            for thread in self.threads.values():
+                if thread.state == constants.THREAD_STATE_SUSPENDED:
+                    thread.eval_watches(thread.frames[0])
+
+    def remove_watch(self, expr):
+        if expr in self.watches:
+            self.watches.remove(expr)
+            for thread in self.threads.values():
+                thread.watch_values.pop(expr, None)
+
+    def handle(self):
+        # Frame lines on the bytes level instead of decoding the whole
+        # receive buffer, payloads are decoded by their parsers.
+        data = self.socket.recv(constants.RECEIVE_SIZE)
+        if not data:
+            raise ConnectionResetError('Connection closed by %s' % self)
+        if self.dap is not None:
+            for message in self.dap.feed(data):
+                self._dispatch(Command.from_payload(*message))
+            return
+        for line in self._framer.feed(data):
+            if line:
+                self.handle_line(line)
+
+    def poll(self):
+        """Dispatch messages for commands the transport answered itself."""
+        if self.dap is not None:
+            for message in self.dap.poll():
+                self._dispatch(Command.from_payload(*message))
+
     def handle_line(self, line):
         if cui.get_variable(constants.ST_DEBUG_LOG):
-            cui.message('=== Received response: \n%s' % (line,))
+            cui.message('=== Received response: \n%s' % (line.decode('utf-8', 'replace'),))
         self._dispatch(Command.from_string(self._file_mapping, line))
 
     def _dispatch_thread_info(self, thread_info):
         if thread_info['id'] in self.threads:
             self.threads[thread_info['id']].update(thread_info)
         else:
-            self.threads[thread_info['id']] = D_Thread.from_thread_info(self, thread_info)
+            thread = self.threads[thread_info['id']] = D_Thread.from_thread_info(self, thread_info)
+            self._adopt_thread(thread)
+
+    def _display_suspended(self, threads):
+        """
+        Display a single thread out of a batch of suspended threads,
+        preferring the one the user is currently looking at. The others
+        are displayed once they are selected.
+        """
+        focused = getattr(cui.current_buffer(), 'thread', None)
+        thread = focused if focused in threads else threads[0]
+        thread.display_frame(thread.frames[0])
 
     def _dispatch(self, response):
         if response.command == constants.CMD_VERSION:
@@ -314,44 +902,228 @@ class Session(server.LineBufferedSession):
             self.threads.pop(response.payload).close()
             cui.message('Thread %s killed.' % response.payload)
         elif response.command == constants.CMD_THREAD_SUSPEND:
-            for item in response.payload:
-                if item['type'] == 'thread_suspend':
-                    self.threads[item['id']].update_thread(item)
+            suspends = [item for item in self.sampler.filter_suspends(response.payload)
+                        if item['type'] == 'thread_suspend']
+            suspended = []
+            for item in suspends:
+                self.threads[item['id']].update_thread(item)
+                suspended.append(self.threads[item['id']])
+            if suspended:
+                self._remove_temporary_breakpoints(suspends)
+                if not cui.get_variable(constants.ST_HEADLESS):
+                    self._display_suspended(suspended)
         elif response.command == constants.CMD_THREAD_RESUME:
-            self.threads[response.payload['id']].update_thread(response.payload)
-        elif response.command == constants.CMD_GET_FRAME:
-            for thread in self.threads.values():
-                thread.update_frame(response.sequence_no, response.payload)
-        elif response.command == constants.CMD_GET_VAR:
-            for thread in self.threads.values():
-                thread.update_variable(response.sequence_no, response.payload)
-        elif response.command == constants.CMD_EVAL_EXPR:
-            for thread in self.threads.values():
-                thread.on_eval(response.sequence_no, response.payload)
+            if not self.sampler.filter_resume(response.payload):
+                self.threads[response.payload['id']].update_thread(response.payload)
+        elif response.command in (constants.CMD_GET_FRAME,
+                                  constants.CMD_GET_VAR,
+                                  constants.CMD_GET_ARRAY,
+                                  constants.CMD_LOAD_SOURCE,
+                                  constants.CMD_GET_COMPLETIONS,
+                                  constants.CMD_EVAL_EXPR):
+            # Responses nobody waits for anymore are dropped unparsed
+            self.requests.complete(response)
+        elif response.command == constants.CMD_WRITE_TO_CONSOLE:
+            for item in response.payload:
+                if item['type'] == 'output':
+                    self.output.write(item['ctx'], item['text'])
+        elif response.command == constants.CMD_CUI_IDENTITY:
+            self.attach(response.payload)
         elif response.command == constants.CMD_ERROR:
+            self.requests.fail(response.sequence_no)
             cui.message(response.payload)
         else:
             cui.message('Unhandled response from pydevd: %s' % response.command)
 
     def close(self):
+        # Buffers and window sets are kept for a debuggee that may
+        # reconnect, until its state is dropped
+        keep_buffers = self.identity is not None
+        if keep_buffers:
+            self._detach()
         cui.get_variable(constants.ST_BREAKPOINTS).remove_session(self)
         for thread in self.threads.values():
-            thread.close()
-        cui.kill_buffer(buffers.ThreadBuffer, self)
+            thread.close(keep_buffers)
+        self.requests.cancel_all()
+        self.sampler.stop()
+        if keep_buffers:
+            self.threads.clear()
+        else:
+            self.kill_buffers()
         cui.run_hook(constants.ST_ON_KILL_SESSION)
+        self.group.remove_session(self)
         super(Session, self).close()
 
+    def kill_buffers(self):
+        for b in SESSION_BUFFERS:
+            cui.kill_buffer(b, self)
+
+
+class SessionGroup(object):
+    """
+    A group of sessions sharing a file mapping, protocol and a
+    sequence counter.
+
+    Since all members draw their sequence numbers from the group,
+    group-wide commands are serialized once and the same line is
+    written to every member. DAP requests depend on the state of each
+    connection and are translated per member.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.sessions = []
+        self.file_mapping = cui.get_variable(constants.ST_FILE_MAPPING).copy()
+        self.protocol = cui.get_variable(constants.ST_PROTOCOL)
+        self._sequence_no = 1
+        self._exception_registrations = None
+
+    def next_sequence_no(self):
+        sequence_no = self._sequence_no
+        self._sequence_no += 2
+        return sequence_no
+
+    def add_session(self, session):
+        self.sessions.append(session)
+
+    def remove_session(self, session):
+        self.sessions.remove(session)
+        if not self.sessions:
+            _session_groups.pop(self.name, None)
+
+    def broadcast(self, command, argument='', sessions=None):
+        """
+        Send a command to ``sessions`` (default: all members of the
+        group), encoding it only once. Returns the sequence number
+        shared by all sent commands.
+        """
+        sessions = self.sessions if sessions is None else sessions
+        if not sessions:
+            return None
+
+        from cui_pydevd import payload
+        sequence_no = self.next_sequence_no()
+        if self.protocol == 'dap':
+            for session in sessions:
+                session.send_all(session.dap.encode([(command, sequence_no, argument)]))
+            return sequence_no
+
+        data = payload.encode_command(command, sequence_no, argument)
+        if cui.get_variable(constants.ST_DEBUG_LOG):
+            cui.message('=== Broadcasting command to %s sessions: \n%s'
+                        % (len(sessions), data.decode('utf-8')))
+        for session in sessions:
+            session.send_all(data)
+        return sequence_no
+
+    def suspend_all(self):
+        return self.broadcast(constants.CMD_THREAD_SUSPEND, '*')
+
+    def resume_all(self):
+        return self.broadcast(constants.CMD_THREAD_RESUME, '*')
+
+    def set_breakpoint(self, path, line):
+        active_map = cui.get_variable(constants.ST_BREAKPOINTS).sessions(path, line)
+        inactive = [session for session in self.sessions
+                    if not active_map.get(str(session), False)]
+        self.broadcast(constants.CMD_SET_BREAK,
+                       set_break_argument(self.file_mapping, path, line),
+                       inactive)
+        for session in inactive:
+            active_map[str(session)] = True
+
+    def update_breakpoint(self, path, line):
+        """
+        Resend a breakpoint to all members for which it is active,
+        replacing its properties in the debuggee.
+        """
+        active_map = cui.get_variable(constants.ST_BREAKPOINTS).sessions(path, line)
+        self.broadcast(constants.CMD_SET_BREAK,
+                       set_break_argument(self.file_mapping, path, line),
+                       [session for session in self.sessions
+                        if active_map.get(str(session), False)])
+
+    def exception_registrations(self):
+        """Return the exception types registered with the members."""
+        if self._exception_registrations is None:
+            self._exception_registrations = exception_registrations(
+                cui.get_variable(constants.ST_BREAKPOINTS).exception_breakpoints())
+        return self._exception_registrations
+
+    def update_exception_breakpoints(self):
+        """
+        Send the changes of exception breakpoints and their excludes to
+        all members, removing types that are no longer registered.
+        """
+        previous = self._exception_registrations or {}
+        self._exception_registrations = exception_registrations(
+            cui.get_variable(constants.ST_BREAKPOINTS).exception_breakpoints())
+        for name in previous:
+            if name not in self._exception_registrations:
+                self.broadcast(constants.CMD_REMOVE_EXCEPTION_BREAK, 'python-%s' % name)
+        for name, argument in self._exception_registrations.items():
+            if previous.get(name) != argument:
+                self.broadcast(constants.CMD_ADD_EXCEPTION_BREAK, argument)
+
+    def remove_breakpoint(self, path, line):
+        active_map = cui.get_variable(constants.ST_BREAKPOINTS).sessions(path, line)
+        active = [session for session in self.sessions
+                  if active_map.get(str(session), False)]
+        self.broadcast(constants.CMD_REMOVE_BREAK,
+                       remove_break_argument(self.file_mapping, path, line),
+                       active)
+        for session in active:
+            active_map[str(session)] = False
+
+    def __str__(self):
+        return self.name
+
+
+_session_groups = collections.OrderedDict()
+
+
+def session_group(name):
+    if name not in _session_groups:
+        _session_groups[name] = SessionGroup(name)
+    return _session_groups[name]
+
+
+def pydevd_session_groups():
+    return list(_session_groups.values())
+
 
 def pydevd_sessions():
     return list(cui.get_variable(constants.ST_SERVER).clients.values())
 
 
+@cui.update_func
+def update_sessions():
+    if cui.get_variable(constants.ST_SERVER):
+        for session in pydevd_sessions():
+            session.poll()
+            session.requests.expire()
+            session.sampler.tick()
+
+
 def pydevd_session(session_id):
     return cui.get_variable(constants.ST_SERVER).clients_by_name[session_id]
 
 
+def _with_breakpoints_loaded(fn):
+    @functools.wraps(fn)
+    def _fn(self, *args, **kwargs):
+        if not self._loaded:
+            self._loaded = True
+            self._read_breakpoints()
+        return fn(self, *args, **kwargs)
+    return _fn
+
+
 class _Breakpoints(cui_source.AnnotationSource):
     MARKER = 'B'
+    DEFAULT_PROPERTIES = {'condition': None, 'hit_count': None, 'log_expression': None}
+    DEFAULT_EXCEPTION_PROPERTIES = {'caught': False, 'uncaught': True,
+                                    'excludes': [], 'project_only': False}
 
     @staticmethod
     def breakpoint_id(path, line):
@@ -362,9 +1134,17 @@ class _Breakpoints(cui_source.AnnotationSource):
         self._pydevd_ids = {}
         self._pydevd_id_counter = 0
         self._active_map = {}
+        self._properties = {}
+        self._exception_breakpoints = collections.OrderedDict()
 
-        # Load serializes breakpoints
-        self._read_breakpoints()
+        # Annotations are memoized per path and viewport until the
+        # version of the path is bumped by a change to its breakpoints
+        self._versions = collections.Counter()
+        self._annotations = {}
+        self._handles_file = {}
+
+        # Serialized breakpoints are loaded on first access
+        self._loaded = False
         cui.add_exit_handler(self._write_breakpoints)
 
     def _read_breakpoints(self):
@@ -372,25 +1152,56 @@ class _Breakpoints(cui_source.AnnotationSource):
             try:
                 with open(cui.user_directory('pydevd_breaks.json'), 'r') as f:
                     for entry in json.load(f):
+                        if 'exception' in entry:
+                            properties = dict(self.DEFAULT_EXCEPTION_PROPERTIES,
+                                              **entry['properties'])
+                            properties['excludes'] = list(properties['excludes'])
+                            self._exception_breakpoints[entry['exception']] = properties
+                            continue
                         path = entry['path']
+                        properties = entry.get('properties', {})
                         for line in entry['lines']:
                             self.add_breakpoint(path, line)
+                            self._properties[self.breakpoint_id(path, line)] \
+                                .update(properties.get(str(line), {}))
             except IOError:
                 pass
 
     def _write_breakpoints(self):
-        if cui.get_variable(constants.ST_SERIALIZE_BREAKPOINTS):
+        if self._loaded and cui.get_variable(constants.ST_SERIALIZE_BREAKPOINTS):
             with open(cui.user_directory('pydevd_breaks.json'), 'w') as f:
-                json.dump([{'path': path, 'lines': lines}
-                           for path, lines in self._breakpoints.items()], f)
+                json.dump([{'path': path,
+                            'lines': lines,
+                            'properties': {
+                                str(line): self.properties(path, line)
+                                for line in lines
+                                if self.properties(path, line) != self.DEFAULT_PROPERTIES
+                            }}
+                           for path, lines in self._breakpoints.items()] +
+                          [{'exception': name, 'properties': properties}
+                           for name, properties in self._exception_breakpoints.items()], f)
 
     def handles_file(self, path):
-        return os.path.splitext(path)[1] == '.py'
+        handles = self._handles_file.get(path)
+        if handles is None:
+            handles = self._handles_file[path] = os.path.splitext(path)[1] == '.py'
+        return handles
+
+    def touch(self, path):
+        """Invalidate memoized annotations of ``path``."""
+        self._versions[path] += 1
 
+    @_with_breakpoints_loaded
     def paths(self):
         return list(self._breakpoints.keys())
 
+    @_with_breakpoints_loaded
     def get_annotations(self, path, first_line, length):
+        key = (first_line, length, self._versions[path])
+        cached = self._annotations.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
         breakpoints = self._breakpoints.get(path, [])
         start_index = find_index(breakpoints,
                                  lambda line, _: line >= first_line,
@@ -398,8 +1209,11 @@ class _Breakpoints(cui_source.AnnotationSource):
         end_index = find_index(breakpoints,
                                lambda line, _: line >= first_line + length,
                                default_index=len(breakpoints))
-        return breakpoints[start_index:end_index]
+        annotations = breakpoints[start_index:end_index]
+        self._annotations[path] = (key, annotations)
+        return annotations
 
+    @_with_breakpoints_loaded
     def add_session(self, session):
         """
         Add a session entry for all existing breakpoints. This should
@@ -409,6 +1223,7 @@ class _Breakpoints(cui_source.AnnotationSource):
             for line in lines:
                 session.toggle_breakpoint(path, line, activate=False)
 
+    @_with_breakpoints_loaded
     def remove_session(self, session):
         """
         Remove session entry for all existing breakpoints. This should
@@ -418,6 +1233,7 @@ class _Breakpoints(cui_source.AnnotationSource):
             for line in lines:
                 del self._active_map[self.breakpoint_id(path, line)][str(session)]
 
+    @_with_breakpoints_loaded
     def add_breakpoint(self, path, line, activate=False):
         """
         Add a breakpoint at path?line if it does not exist.
@@ -428,6 +1244,7 @@ class _Breakpoints(cui_source.AnnotationSource):
         if path not in self._breakpoints:
             self._breakpoints[path] = []
         if line not in self._breakpoints[path]:
+            self.touch(path)
             self._breakpoints[path].append(line)
             self._breakpoints[path].sort()
 
@@ -435,28 +1252,75 @@ class _Breakpoints(cui_source.AnnotationSource):
             self._pydevd_id_counter += 1
 
             self._active_map[self.breakpoint_id(path, line)] = {}
+            self._properties[self.breakpoint_id(path, line)] = dict(self.DEFAULT_PROPERTIES)
             for session in pydevd_sessions():
-                session.toggle_breakpoint(path, line, activate=activate)
+                session.toggle_breakpoint(path, line, activate=False)
+            if activate:
+                for group in pydevd_session_groups():
+                    group.set_breakpoint(path, line)
 
+    @_with_breakpoints_loaded
     def pydevd_id(self, path, line):
         return self._pydevd_ids.get(self.breakpoint_id(path, line))
 
+    @_with_breakpoints_loaded
     def breakpoints(self, path):
         return self._breakpoints[path]
 
+    @_with_breakpoints_loaded
+    def properties(self, path, line):
+        return self._properties[self.breakpoint_id(path, line)]
+
+    @_with_breakpoints_loaded
+    def set_properties(self, path, line, **properties):
+        """
+        Update condition, hit count or log expression of the breakpoint at path?line
+        and resend it to all sessions for which it is active.
+        """
+        self._properties[self.breakpoint_id(path, line)].update(properties)
+        self.touch(path)
+        for group in pydevd_session_groups():
+            group.update_breakpoint(path, line)
+
+    @_with_breakpoints_loaded
+    def exception_breakpoints(self):
+        return self._exception_breakpoints
+
+    @_with_breakpoints_loaded
+    def set_exception_breakpoint(self, name, **properties):
+        """
+        Add an exception breakpoint for type ``name`` or update its
+        properties, and send it to all sessions.
+        """
+        if name not in self._exception_breakpoints:
+            self._exception_breakpoints[name] = dict(self.DEFAULT_EXCEPTION_PROPERTIES,
+                                                     excludes=[])
+        self._exception_breakpoints[name].update(properties)
+        for group in pydevd_session_groups():
+            group.update_exception_breakpoints()
+
+    @_with_breakpoints_loaded
+    def remove_exception_breakpoint(self, name):
+        if name in self._exception_breakpoints:
+            del self._exception_breakpoints[name]
+            for group in pydevd_session_groups():
+                group.update_exception_breakpoints()
+
+    @_with_breakpoints_loaded
     def sessions(self, path, line):
         return self._active_map[self.breakpoint_id(path, line)]
 
+    @_with_breakpoints_loaded
     def remove_breakpoint(self, path, line):
         # Disable breakpoint in all sessions
-        active_map = self._active_map[self.breakpoint_id(path, line)]
-        for session in pydevd_sessions():
-            if active_map[str(session)]:
-                session.toggle_breakpoint(path, line)
+        for group in pydevd_session_groups():
+            group.remove_breakpoint(path, line)
 
         # Remove bookkeeping data
         if path in self._breakpoints and line in self._breakpoints[path]:
+            self.touch(path)
             del self._active_map[self.breakpoint_id(path, line)]
+            del self._properties[self.breakpoint_id(path, line)]
             del self._pydevd_ids[self.breakpoint_id(path, line)]
             self._breakpoints[path].remove(line)
             if len(self._breakpoints[path]) == 0:
@@ -484,6 +1348,42 @@ def pydevd_id(path, line):
     return cui.get_variable(constants.ST_BREAKPOINTS).pydevd_id(path, line)
 
 
+def set_breakpoint_condition(path, line, condition):
+    return cui.get_variable(constants.ST_BREAKPOINTS) \
+              .set_properties(path, line, condition=condition or None)
+
+
+def set_breakpoint_hit_count(path, line, hit_count):
+    return cui.get_variable(constants.ST_BREAKPOINTS) \
+              .set_properties(path, line, hit_count=hit_count or None)
+
+
+def set_breakpoint_log_expression(path, line, log_expression):
+    """
+    Turn the breakpoint at path?line into a logpoint, which prints
+    ``log_expression`` in the debuggee instead of suspending. Passing
+    an empty expression turns it back into a regular breakpoint.
+    """
+    return cui.get_variable(constants.ST_BREAKPOINTS) \
+              .set_properties(path, line, log_expression=log_expression or None)
+
+
+def set_exception_breakpoint(name, **properties):
+    """
+    Suspend on exceptions of type ``name``. Properties are ``caught``,
+    ``uncaught``, ``excludes``, a list of type names that do not
+    suspend, and ``project_only``, which ignores exceptions raised
+    outside of the project roots.
+    """
+    return cui.get_variable(constants.ST_BREAKPOINTS) \
+              .set_exception_breakpoint(name, **properties)
+
+
+def remove_exception_breakpoint(name):
+    return cui.get_variable(constants.ST_BREAKPOINTS) \
+              .remove_exception_breakpoint(name)
+
+
 @cui_source.with_current_file
 @buffers.with_optional_session
 def toggle_breakpoint_in_current_file(session, path, line):
@@ -521,11 +1421,16 @@ def initialize():
     cui.set_local_key(cui_source.BaseFileBuffer, 'r', remove_breakpoint_in_current_file)
     cui_source.add_annotation_source(breakpoints)
 
-    # Initialize Layout
+    srv.start()
+
+
+def init_layout():
+    """
+    Create the pydevds window set. This is deferred until the first
+    session connects or py_display_sessions is run.
+    """
     if not cui.has_window_set('pydevds'):
         cui.new_window_set('pydevds')
         cui.buffer_visible(buffers.BreakpointBuffer, None,
                            split_method=cui.split_window_right)
         cui.buffer_visible(buffers.SessionBuffer)
-
-    srv.start()
@@ -0,0 +1,125 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Inspection of numpy arrays and pandas data frames.
+
+Shape, dtype and summary statistics are computed by evaluating an
+expression in the debuggee, contents are fetched one rectangular page
+at a time with CMD_GET_ARRAY, so large arrays are never transferred
+as a whole.
+"""
+
+import functools
+
+from . import constants
+
+ARRAY_TYPES = ('ndarray', 'DataFrame', 'Series')
+
+_summary_expressions = {
+    'ndarray': "'shape=%%s dtype=%%s min=%%s max=%%s mean=%%s std=%%s' %% "
+               "((%(e)s).shape, (%(e)s).dtype, (%(e)s).min(), (%(e)s).max(), "
+               "(%(e)s).mean(), (%(e)s).std())",
+    'DataFrame': "'shape=%%s\\n%%s' %% ((%(e)s).shape, (%(e)s).describe().to_string())",
+    'Series': "'shape=%%s dtype=%%s\\n%%s' %% ((%(e)s).shape, (%(e)s).dtype, "
+              "(%(e)s).describe().to_string())",
+}
+
+
+def is_array(variable):
+    return variable['vtype'] in ARRAY_TYPES
+
+
+def expression(path):
+    """
+    Return a Python expression for the variable at ``path`` or None,
+    if it cannot be expressed as attribute access.
+    """
+    if all(name.isidentifier() for name in path):
+        return '.'.join(path)
+    return None
+
+
+class ArrayInspector(object):
+    def __init__(self, frame, path, vtype, rows, cols):
+        self.frame = frame
+        self.path = path
+        self.vtype = vtype
+        self.page_rows = rows
+        self.page_cols = cols
+        self.summary = []
+        self.shape = None
+        self.row_offset = 0
+        self.col_offset = 0
+        self.data = []
+        self.pending = False
+
+    def _send(self, command, argument, on_response):
+        thread = self.frame.thread
+        return thread.session.requests.send(command, argument, thread, on_response,
+                                            functools.partial(setattr, self, 'pending', False),
+                                            idempotent=True)
+
+    def _unavailable(self):
+        self.summary = ['Summary and contents not available for %s, it cannot be '
+                        'expressed as attribute access' % '/'.join(self.path)]
+
+    def fetch_summary(self):
+        expr = expression(self.path)
+        if expr is None:
+            self._unavailable()
+            return
+
+        thread = self.frame.thread
+        thread.session.requests.send(
+            constants.CMD_EVAL_EXPR,
+            '%s\t%s\tLOCAL\t%s\t0' % (thread.id, self.frame.id,
+                                      _summary_expressions[self.vtype] % {'e': expr}),
+            thread, self._on_summary)
+
+    def _on_summary(self, variables):
+        if variables:
+            value = variables[0]['value']
+            self.summary = value.strip('\'"').replace('\\n', '\n').splitlines()
+
+    def fetch_page(self):
+        if self.pending:
+            return
+        # pydevd evaluates only the last element of the path in the
+        # frame, so nested arrays are sent as one expression
+        expr = expression(self.path)
+        if expr is None:
+            self._unavailable()
+            return
+        self.pending = True
+        thread = self.frame.thread
+        self._send(constants.CMD_GET_ARRAY,
+                   '\t'.join([str(self.row_offset),
+                              str(self.col_offset),
+                              str(self.page_rows),
+                              str(self.page_cols),
+                              '%',
+                              thread.id,
+                              self.frame.id,
+                              'FRAME',
+                              expr]),
+                   self._on_page)
+
+    def _on_page(self, array):
+        self.pending = False
+        if array:
+            self.shape = (array['rows'], array['cols'])
+            self.data = array['data']
+
+    def move(self, rows, cols):
+        row_offset = max(0, self.row_offset + rows * self.page_rows)
+        col_offset = max(0, self.col_offset + cols * self.page_cols)
+        if self.shape:
+            if row_offset >= self.shape[0]:
+                row_offset = self.row_offset
+            if col_offset >= self.shape[1]:
+                col_offset = self.col_offset
+        if (row_offset, col_offset) != (self.row_offset, self.col_offset):
+            self.row_offset, self.col_offset = row_offset, col_offset
+            self.fetch_page()
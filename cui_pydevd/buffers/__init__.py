@@ -5,7 +5,8 @@
 from .base import \
     with_session, with_optional_session, \
     BreakpointBuffer, py_display_all_breakpoints, py_display_session_breakpoints, \
-    SessionBuffer
+    SessionBuffer, py_display_sessions, OutputBuffer, py_display_output, StatsBuffer, py_display_stats, \
+    ProfileBuffer, py_toggle_profiler
 
 from .threads import \
-    ThreadBuffer, CodeBuffer, FrameBuffer, EvalBuffer
+    ThreadBuffer, CodeBuffer, FrameBuffer, EvalBuffer, WatchBuffer, HistoryBuffer, SearchBuffer, ArrayBuffer
@@ -7,6 +7,8 @@ import cui_pydevd
 import cui_source
 import functools
 import itertools
+import os
+import time
 
 from cui_pydevd import buffers
 from cui_pydevd import constants
@@ -76,17 +78,47 @@ class BreakpointLineHandler(cui.buffers.NodeHandler(is_expanded_=True, has_child
             for session in self._breakpoints.sessions(item[0], item[1]).items()
         ]
 
+    def _label(self, item):
+        properties = self._breakpoints.properties(item[0], item[1])
+        label = str(item[1] + 1)
+        if properties['log_expression']:
+            label += ' log %s' % properties['log_expression']
+        if properties['condition']:
+            label += ' if %s' % properties['condition']
+        if properties['hit_count']:
+            label += ' (hits >= %s)' % properties['hit_count']
+        return label
+
     def render(self, window, item, depth, width):
         active = self._session is None or self._breakpoints.sessions(item[0], item[1])[str(self._session)]
         if self._session:
-            return with_checkbox(str(item[1] + 1), active)
+            return with_checkbox(self._label(item), active)
         else:
-            return [str(item[1] + 1)]
+            return [self._label(item)]
 
     def toggle(self, item):
         if self._session:
             cui_pydevd.toggle_breakpoint(self._session, item[0], item[1])
 
+    def edit_condition(self, item):
+        properties = self._breakpoints.properties(item[0], item[1])
+        condition = cui.read_string('Condition', properties['condition'] or '')
+        cui_pydevd.set_breakpoint_condition(item[0], item[1], condition.strip())
+
+    def edit_hit_count(self, item):
+        properties = self._breakpoints.properties(item[0], item[1])
+        hit_count = cui.read_string('Hit count', str(properties['hit_count'] or ''))
+        try:
+            cui_pydevd.set_breakpoint_hit_count(item[0], item[1],
+                                                int(hit_count) if hit_count.strip() else None)
+        except ValueError:
+            cui.message('Hit count must be a number: %s' % hit_count)
+
+    def edit_log_expression(self, item):
+        properties = self._breakpoints.properties(item[0], item[1])
+        log_expression = cui.read_string('Log expression', properties['log_expression'] or '')
+        cui_pydevd.set_breakpoint_log_expression(item[0], item[1], log_expression.strip())
+
     def remove(self, item):
         cui_pydevd.remove_breakpoint(item[0], item[1])
 
@@ -112,6 +144,55 @@ class BreakpointLineHandler(cui.buffers.NodeHandler(is_expanded_=True, has_child
                                    cui_source.FileBuffer, item[0])
 
 
+def exception_item(name):
+    return ('exception', name)
+
+
+class BreakpointExceptionHandler(cui.buffers.NodeHandler(is_expanded_=True)):
+    def __init__(self, session, *args, **kwargs):
+        super(BreakpointExceptionHandler, self).__init__(session, *args, **kwargs)
+        self._breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+
+    def matches(self, item):
+        return isinstance(item, tuple) and item[0] == 'exception' and isinstance(item[1], str)
+
+    def _properties(self, item):
+        return self._breakpoints.exception_breakpoints()[item[1]]
+
+    def render(self, window, item, depth, width):
+        properties = self._properties(item)
+        label = 'except %s (%s)' % (item[1],
+                                    ', '.join(mode for mode, enabled
+                                              in [('caught', properties['caught']),
+                                                  ('uncaught', properties['uncaught'])]
+                                              if enabled) or 'disabled')
+        if properties['excludes']:
+            label += ' not %s' % ', '.join(properties['excludes'])
+        if properties['project_only']:
+            label += ' in project'
+        return [label]
+
+    def toggle(self, item):
+        # Cycle through uncaught, caught and both
+        properties = self._properties(item)
+        caught, uncaught = {(False, True): (True, False),
+                            (True, False): (True, True)}.get((properties['caught'],
+                                                              properties['uncaught']),
+                                                             (False, True))
+        cui_pydevd.set_exception_breakpoint(item[1], caught=caught, uncaught=uncaught)
+
+    def toggle_project_only(self, item):
+        cui_pydevd.set_exception_breakpoint(item[1],
+                                            project_only=not self._properties(item)['project_only'])
+
+    def edit_excludes(self, item):
+        excludes = cui.read_string('Exclude types', ' '.join(self._properties(item)['excludes']))
+        cui_pydevd.set_exception_breakpoint(item[1], excludes=excludes.split())
+
+    def remove(self, item):
+        cui_pydevd.remove_exception_breakpoint(item[1])
+
+
 class BreakpointSessionHandler(cui.buffers.NodeHandler(is_expanded_=True)):
     def matches(self, item):
         return isinstance(item, tuple) and type(item[1]) is bool
@@ -125,13 +206,15 @@ class BreakpointSessionHandler(cui.buffers.NodeHandler(is_expanded_=True)):
 
 @cui.buffers.node_handlers(BreakpointFileHandler,
                            BreakpointLineHandler,
+                           BreakpointExceptionHandler,
                            BreakpointSessionHandler)
 class BreakpointBuffer(cui.buffers.DefaultTreeBuffer):
     """
     Display Python breakpoints.
 
     Displays all breakpoints defined in cui-pydevd, as well as the
-    sessions for which they are and are not active.
+    sessions for which they are and are not active. Exception
+    breakpoints are listed after the files and apply to all sessions.
     If this buffer is opened in the context of a session, the
     sessions will not be displayed.
     """
@@ -139,6 +222,12 @@ class BreakpointBuffer(cui.buffers.DefaultTreeBuffer):
     __keymap__ = {
         'b': cui.buffers.invoke_node_handler('toggle'),
         'r': cui.buffers.invoke_node_handler('remove'),
+        'c': cui.buffers.invoke_node_handler('edit_condition'),
+        'h': cui.buffers.invoke_node_handler('edit_hit_count'),
+        'l': cui.buffers.invoke_node_handler('edit_log_expression'),
+        'x': cui.buffers.invoke_node_handler('edit_excludes'),
+        'p': cui.buffers.invoke_node_handler('toggle_project_only'),
+        'e': lambda: cui.current_buffer().add_exception_breakpoints(),
         '<enter>': cui.buffers.invoke_node_handler('goto')
     }
 
@@ -153,13 +242,24 @@ class BreakpointBuffer(cui.buffers.DefaultTreeBuffer):
         self._breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
 
     def get_roots(self):
-        return self._breakpoints.paths()
+        return self._breakpoints.paths() + \
+            [exception_item(name) for name in self._breakpoints.exception_breakpoints()]
+
+    def add_exception_breakpoints(self):
+        for name in cui.read_string('Exception types').split():
+            cui_pydevd.set_exception_breakpoint(name)
 
 
 def py_display_all_breakpoints():
     cui.buffer_visible(BreakpointBuffer, None)
 
 
+def py_display_sessions():
+    """Display the breakpoint and session overviews."""
+    cui_pydevd.init_layout()
+    cui.buffer_visible(SessionBuffer)
+
+
 @with_session
 def py_display_session_breakpoints(session):
     cui.buffer_visible(BreakpointBuffer, session)
@@ -183,4 +283,170 @@ class SessionBuffer(cui.buffers.ListBuffer):
         return self._flattened
 
     def render_item(self, window, item, index):
-        return [str(item)]
+        return [[str(item),
+                 {'content':    ' (%s pending)' % item.requests.outstanding(),
+                  'foreground': 'inactive'}]]
+
+
+class OutputBuffer(cui.buffers.ListBuffer):
+    """
+    Display output of a session.
+
+    Shows the most recent lines of logpoint output and redirected
+    stdout/stderr of the debuggee. New lines are picked up at most
+    every ``pydevds/output-refresh`` seconds.
+    """
+    @classmethod
+    def name(cls, session, **kwargs):
+        return 'pydevd Output(%s)' % session.key
+
+    def __init__(self, session):
+        super(OutputBuffer, self).__init__(session)
+        self.session = session
+        self._lines = []
+        self._count = 0
+        self._refreshed = 0.0
+        self._flattened = []
+
+    def attach_session(self, session):
+        """Append the output of ``session``, which re-attached."""
+        self.session = session
+        self._count = 0
+        self._refreshed = 0.0
+
+    def on_pre_render(self):
+        now = time.monotonic()
+        if now - self._refreshed < cui.get_variable(constants.ST_OUTPUT_REFRESH):
+            return
+        self._refreshed = now
+
+        output = self.session.output
+        if output.count != self._count:
+            lines = output.lines_since(self._count)
+            if lines is None:
+                self._lines = list(output.lines)
+            else:
+                self._lines.extend(lines)
+                excess = len(self._lines) - output.lines.maxlen
+                if excess > 0:
+                    del self._lines[:excess]
+            self._count = output.count
+
+        partial_lines = output.partial_lines()
+        self._flattened = self._lines + partial_lines if partial_lines else self._lines
+
+    def items(self):
+        return self._flattened
+
+    def render_item(self, window, item, index):
+        return [{'content':    item[1],
+                 'foreground': 'error' if item[0] == constants.OUTPUT_STDERR else 'default'}]
+
+
+@with_session
+def py_display_output(session):
+    cui.buffer_visible(OutputBuffer, session)
+
+
+class StatsBuffer(cui.buffers.ListBuffer):
+    """
+    Display request statistics of a session.
+
+    Lists the number of outstanding requests per command, as well as
+    counters for completed, retried, cancelled, failed, timed out and
+    dropped requests.
+    """
+    @classmethod
+    def name(cls, session, **kwargs):
+        return 'pydevd Stats(%s)' % session.key
+
+    def __init__(self, session):
+        super(StatsBuffer, self).__init__(session)
+        self.session = session
+
+    def attach_session(self, session):
+        self.session = session
+
+    def on_pre_render(self):
+        requests = self.session.requests
+        self._flattened = \
+            [('outstanding', requests.outstanding())] + \
+            [('outstanding %s' % command, count)
+             for command, count in sorted(requests.outstanding_by_command().items())] + \
+            sorted(requests.stats.items())
+
+    def items(self):
+        return self._flattened
+
+    def render_item(self, window, item, index):
+        return ['%-30s %s' % item]
+
+
+@with_session
+def py_display_stats(session):
+    cui.buffer_visible(StatsBuffer, session)
+
+
+class ProfileBuffer(cui.buffers.ListBuffer):
+    """
+    Display hot functions recorded by the sampling profiler.
+
+    Shows the share of samples in which a function was on top of the
+    stack (self) and anywhere on the stack (total), as well as the
+    wall time during which the target was paused for sampling.
+    """
+
+    __keymap__ = {
+        'e': lambda: cui.current_buffer().export_folded()
+    }
+
+    @classmethod
+    def name(cls, session, **kwargs):
+        return 'pydevd Profile(%s)' % session.key
+
+    def __init__(self, session):
+        super(ProfileBuffer, self).__init__(session)
+        self.session = session
+
+    def attach_session(self, session):
+        self.session = session
+
+    def export_folded(self):
+        path = cui.read_string('Export folded stacks to').strip()
+        if path:
+            self.session.sampler.write_folded(os.path.expanduser(path))
+            cui.message('Folded stacks written to %s' % path)
+
+    def on_pre_render(self):
+        sampler = self.session.sampler
+        elapsed = sampler.elapsed()
+        self._flattened = [
+            '%s, %s samples, paused %.3fs of %.3fs (%.1f%%)'
+            % ('sampling' if sampler.active else 'stopped',
+               sampler.samples,
+               sampler.paused,
+               elapsed,
+               100.0 * sampler.paused / elapsed if elapsed else 0.0),
+            '%7s %7s  %s' % ('self', 'total', 'function')
+        ] + [
+            '%6.1f%% %6.1f%%  %s' % (100.0 * self_count / sampler.samples,
+                                     100.0 * total_count / sampler.samples,
+                                     label)
+            for label, self_count, total_count in sampler.hot_functions()
+        ]
+
+    def items(self):
+        return self._flattened
+
+    def render_item(self, window, item, index):
+        return [item]
+
+
+@with_session
+def py_toggle_profiler(session):
+    """Start or stop sampling all threads of the current session."""
+    if session.sampler.active:
+        session.sampler.stop()
+    else:
+        session.sampler.start(cui.get_variable(constants.ST_PROFILE_INTERVAL))
+    cui.buffer_visible(ProfileBuffer, session)
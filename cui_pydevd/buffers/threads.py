@@ -12,7 +12,9 @@ from cui_pydevd import constants
 from cui.util import truncate_left
 
 
-from .base import py_display_session_breakpoints
+from .base import \
+    py_display_session_breakpoints, py_display_output, py_display_stats, \
+    py_toggle_profiler, with_session
 
 
 def with_thread(fn):
@@ -59,6 +61,18 @@ def py_resume(thread):
     thread.resume()
 
 
+@with_session
+def py_suspend_all(session):
+    """Suspend all threads in all sessions of the current session group."""
+    session.group.suspend_all()
+
+
+@with_session
+def py_resume_all(session):
+    """Resume all threads in all sessions of the current session group."""
+    session.group.resume_all()
+
+
 @with_frame
 def py_open_eval(thread, frame):
     """Open a buffer to evaluate expressions in thread."""
@@ -67,49 +81,318 @@ def py_open_eval(thread, frame):
                                to_window=True)
 
 
+def py_open_watches():
+    """Open a buffer displaying watch expressions of the current thread."""
+    thread = cui.current_buffer().thread
+    if thread:
+        cui.buffer_visible(WatchBuffer, thread, to_window=True)
+
+
+def py_open_history():
+    """Open a buffer to browse suspend snapshots of the current thread."""
+    thread = cui.current_buffer().thread
+    if thread:
+        cui.buffer_visible(HistoryBuffer, thread, to_window=True)
+
+
 class ThreadBufferKeymap(cui.keymap.WithKeymap):
     __keymap__ = {
         '<f5>': py_step_into,
         '<f6>': py_step_over,
         '<f7>': py_step_return,
         '<f8>': py_resume,
-        'C-x b': py_display_session_breakpoints
+        'C-x s': py_suspend_all,
+        'C-x r': py_resume_all,
+        'C-x b': py_display_session_breakpoints,
+        'C-x o': py_display_output,
+        'C-x t': py_display_stats,
+        'C-x p': py_toggle_profiler,
+        'C-x w': py_open_watches,
+        'C-x h': py_open_history
     }
 
 class ThreadBufferMixin(ThreadBufferKeymap):
     @classmethod
     def name(cls, thread, **kwargs):
-        return ('%s (%s:%s/%s)'
-                % (cls.__buffer_name__,
-                   thread.session.address[0],
-                   thread.session.address[1],
-                   thread.id))
+        return '%s (%s/%s)' % (cls.__buffer_name__, thread.session.key, thread.key)
 
     @property
     def thread(self):
         return self._thread
 
+    def attach_thread(self, thread):
+        """Display ``thread``, which took over this buffer on re-attach."""
+        self._thread = thread
+
 class EvalBuffer(ThreadBufferMixin, cui.buffers.ConsoleBuffer):
     """Evaluate expressions in the current frame."""
 
     __buffer_name__ = 'Eval'
+    __keymap__ = {
+        'C-i': lambda: cui.current_buffer().complete()
+    }
 
     def __init__(self, thread):
         super(EvalBuffer, self).__init__(thread)
         self._thread = thread
         self._frame = None
+        # Show expressions evaluated earlier, also before a re-attach
+        if thread.session.eval_history:
+            self.extend(*['>>> %s' % expr for expr in thread.session.eval_history])
 
     def set_frame(self, frame):
         self._frame = frame
 
+    def attach_thread(self, thread):
+        super(EvalBuffer, self).attach_thread(thread)
+        self._frame = None
+
     def on_send_current_buffer(self, b):
         self._thread.eval(self._frame, b)
 
+    def input_line(self):
+        """Return the line being edited and the cursor position in it."""
+        # ConsoleBuffer does not expose its input line, keep the access
+        # to its attributes in these two methods.
+        return self._buffer, self._cursor
+
+    def set_input_line(self, line, cursor):
+        self._buffer = line
+        self._cursor = cursor
+
+    def complete(self):
+        """
+        Complete the token in front of the cursor. If there is more than
+        one candidate, their common prefix is inserted and they are listed.
+        """
+        if not self._frame or self._thread.state != constants.THREAD_STATE_SUSPENDED:
+            return
+
+        line, cursor = self.input_line()
+        text = line[:cursor]
+        names = self._thread.completions.complete(self._frame, text,
+                                                  lambda: self._on_completions(text))
+        if names is None:
+            cui.message('Fetching completions...')
+            return
+
+        if not names:
+            cui.message('No completions.')
+            return
+
+        from cui_pydevd import completion
+        insert = completion.insertion(text, names)
+        self.set_input_line(text + insert + line[cursor:], cursor + len(insert))
+        if len(names) > 1:
+            cui.message(' '.join(names[:constants.COMPLETIONS_SHOWN]) +
+                        (' ...' if len(names) > constants.COMPLETIONS_SHOWN else ''))
+
+    def _on_completions(self, text):
+        # Complete once the response arrives, unless the input changed
+        line, cursor = self.input_line()
+        if line[:cursor] == text:
+            self.complete()
+
+
+class WatchBuffer(ThreadBufferMixin, cui.buffers.ListBuffer):
+    """
+    Display watch expressions of the session.
+
+    Watches are evaluated each time the thread suspends, values that
+    changed since the previous suspend are highlighted.
+    """
+
+    __buffer_name__ = 'Watch'
+    __keymap__ = {
+        'a': lambda: cui.current_buffer().add_watch(),
+        'd': lambda: cui.current_buffer().remove_watch()
+    }
+
+    def __init__(self, thread):
+        super(WatchBuffer, self).__init__(thread)
+        self._thread = thread
+
+    def add_watch(self):
+        expr = cui.read_string('Watch expression').strip()
+        if expr:
+            self._thread.session.add_watch(expr)
+
+    def remove_watch(self):
+        expr = self.selected_item()
+        if expr:
+            self._thread.session.remove_watch(expr)
+
+    def items(self):
+        return self._thread.session.watches
+
+    def render_item(self, window, item, index):
+        value, changed = self._thread.watch_values.get(item, ('', False))
+        return [[item,
+                 ' = ',
+                 {'content':    value,
+                  'foreground': 'special' if changed else 'default'}]]
+
+
+class HistoryBuffer(ThreadBufferMixin, cui.buffers.TreeBuffer):
+    """
+    Browse suspend snapshots of a thread.
+
+    Snapshots are recorded on resume if history is enabled. Browsing
+    them only uses recorded data and sends no requests to the debuggee.
+    """
+
+    __buffer_name__ = 'History'
+
+    def __init__(self, thread):
+        super(HistoryBuffer, self).__init__(thread, show_handles=True)
+        self._thread = thread
+        self._expanded = set()
+
+    def _history(self):
+        from cui_pydevd import history
+        return history.store.history(self._thread)
+
+    def get_roots(self):
+        h = self._history()
+        return [('snapshot', index) for index in range(len(h.snapshots) - 1, -1, -1)] if h else []
+
+    def is_expanded(self, item):
+        return item in self._expanded
+
+    def set_expanded(self, item, expanded):
+        if expanded:
+            self._expanded.add(item)
+        else:
+            self._expanded.discard(item)
+
+    def has_children(self, item):
+        return item[0] in ('snapshot', 'frame')
+
+    def fetch_children(self, item):
+        pass
+
+    def get_children(self, item):
+        h = self._history()
+        if h is None or item[1] >= len(h.snapshots):
+            return []
+        if item[0] == 'snapshot':
+            return [('frame', item[1], index)
+                    for index in range(len(h.snapshots[item[1]].stack))]
+        return [('variable', path, vtype, value)
+                for path, (vtype, value) in sorted(h.variables(item[1]).items())
+                if path[0] == item[2]]
+
+    def render_node(self, window, item, depth, width):
+        h = self._history()
+        if item[0] == 'snapshot':
+            file_, name, line = h.snapshots[item[1]].stack.frames[0]
+            return ['#%s %s (%s:%s)' % (item[1], name, file_, line)]
+        elif item[0] == 'frame':
+            file_, name, line = h.snapshots[item[1]].stack.frames[item[2]]
+            return [truncate_left(width, '%s %s:%s' % (name, file_, line))]
+        return ['%s = {%s} %s' % ('.'.join(item[1][1:]), item[2], item[3])]
+
+
+class SearchBuffer(ThreadBufferMixin, cui.buffers.ListBuffer):
+    """
+    Display results of a variable search.
+
+    Matches are added while the search is running. Selecting a match
+    expands its path in the frame buffer.
+    """
+
+    __buffer_name__ = 'Search'
+    __keymap__ = {
+        'C-g': lambda: cui.current_buffer().cancel_search()
+    }
+
+    def __init__(self, thread):
+        super(SearchBuffer, self).__init__(thread)
+        self._thread = thread
+
+    def cancel_search(self):
+        if self._thread.search:
+            self._thread.search.cancel()
+
+    def on_item_selected(self):
+        item = self.selected_item()
+        if isinstance(item, tuple) and self._thread.search:
+            self._thread.search.frame.expand_path(item[0])
+            cui.buffer_visible(FrameBuffer, self._thread)
+
+    def items(self):
+        s = self._thread.search
+        if s is None:
+            return []
+        return ['%s "%s": %s matches, %s variables visited, %s skipped'
+                % ('Searching' if s.active else 'Searched', s.pattern,
+                   len(s.matches), s.visited, s.skipped)] + \
+               s.matches
+
+    def render_item(self, window, item, index):
+        if isinstance(item, str):
+            return [{'content': item, 'foreground': 'inactive'}]
+        return ['%s = {%s} %s' % ('.'.join(item[0]), item[1], item[2])]
+
+
+class ArrayBuffer(ThreadBufferMixin, cui.buffers.ListBuffer):
+    """
+    Display summary and one page of an array or data frame.
+
+    Pages are fetched on demand, n/p move down/up by a page of rows,
+    f/b move right/left by a page of columns.
+    """
+
+    __buffer_name__ = 'Array'
+    __keymap__ = {
+        'n': lambda: cui.current_buffer().move(1, 0),
+        'p': lambda: cui.current_buffer().move(-1, 0),
+        'f': lambda: cui.current_buffer().move(0, 1),
+        'b': lambda: cui.current_buffer().move(0, -1)
+    }
+
+    def __init__(self, thread):
+        super(ArrayBuffer, self).__init__(thread)
+        self._thread = thread
+        self._inspector = None
+
+    def set_inspector(self, inspector):
+        self._inspector = inspector
+
+    def attach_thread(self, thread):
+        super(ArrayBuffer, self).attach_thread(thread)
+        self._inspector = None
+
+    def move(self, rows, cols):
+        if self._inspector:
+            self._inspector.move(rows, cols)
+
+    def items(self):
+        i = self._inspector
+        if i is None:
+            return []
+        header = '%s {%s} rows %s-%s, cols %s-%s%s' % (
+            '.'.join(i.path), i.vtype,
+            i.row_offset, i.row_offset + len(i.data) - 1,
+            i.col_offset, i.col_offset + (len(i.data[0]) if i.data else 0) - 1,
+            ' of %sx%s' % i.shape if i.shape else '')
+        return [header] + i.summary + [''] + \
+               ['%6s  %s' % (i.row_offset + index,
+                             ' '.join('%12s' % value[:12] for value in row))
+                for index, row in enumerate(i.data)]
+
+    def render_item(self, window, item, index):
+        return [item]
+
 
 class FrameBuffer(ThreadBufferMixin, cui.buffers.TreeBuffer):
     """Display frame contents."""
 
     __buffer_name__ = 'Frame'
+    __keymap__ = {
+        'C-s': lambda: cui.current_buffer().search_variables(),
+        'a':   lambda: cui.current_buffer().inspect_array()
+    }
 
     def __init__(self, thread):
         super(FrameBuffer, self).__init__(thread, show_handles=True)
@@ -119,6 +402,26 @@ class FrameBuffer(ThreadBufferMixin, cui.buffers.TreeBuffer):
     def set_frame(self, frame):
         self._frame = frame
 
+    def attach_thread(self, thread):
+        super(FrameBuffer, self).attach_thread(thread)
+        self._frame = None
+
+    def search_variables(self):
+        if not (self._frame and self._frame.variables):
+            return
+        pattern = cui.read_string('Search variables').strip()
+        if pattern:
+            self._thread.search_variables(self._frame, pattern)
+            cui.buffer_visible(SearchBuffer, self._thread)
+
+    def inspect_array(self):
+        from cui_pydevd import arrays
+        item = self.selected_item()
+        if item and arrays.is_array(item):
+            inspector = self._frame.inspect_array(item)
+            cui.exec_in_buffer_visible(lambda b: b.set_inspector(inspector),
+                                       ArrayBuffer, self._thread)
+
     def get_roots(self):
         return self._frame.variables if self._frame and self._frame.variables else []
 
@@ -126,7 +429,7 @@ class FrameBuffer(ThreadBufferMixin, cui.buffers.TreeBuffer):
         return item['expanded']
 
     def set_expanded(self, item, expanded):
-        item['expanded'] = expanded
+        self._frame.set_expanded(item, expanded)
 
     def has_children(self, item):
         return item['has_children']
@@ -150,7 +453,9 @@ class CodeBuffer(ThreadBufferMixin, cui_source.BaseFileBuffer):
 
     __buffer_name__ = 'Code'
     __keymap__ = {
-        'C-b':  lambda: cui.current_buffer().center_break()
+        'C-b':  lambda: cui.current_buffer().center_break(),
+        'C-r':  lambda: cui.current_buffer().run_to_cursor(),
+        'C-u':  lambda: cui.current_buffer().run_until()
     }
 
     def __init__(self, thread):
@@ -163,14 +468,37 @@ class CodeBuffer(ThreadBufferMixin, cui_source.BaseFileBuffer):
             self.set_variable(['win/buf', 'selected-item'], self._line - 1)
             self.recenter()
 
-    def set_file(self, file_path=None, line=None):
+    def attach_thread(self, thread):
+        super(CodeBuffer, self).attach_thread(thread)
+        self._line = None
+
+    def set_file(self, file_path=None, line=None, source_path=None):
+        """
+        Display ``file_path``. If its source is read from another file,
+        e.g. the source cache, it is passed as ``source_path``, the
+        buffer stays associated with ``file_path`` for breakpoints.
+        """
         if file_path:
-            super(CodeBuffer, self).set_file(file_path)
+            super(CodeBuffer, self).set_file(source_path or file_path)
+            self._file_path = file_path
             self._line = line
         else:
             self._line = None
         self.center_break()
 
+    def run_to_cursor(self, condition=None):
+        if self._thread.state != constants.THREAD_STATE_SUSPENDED:
+            cui.message('Thread %s must be suspended.' % self._thread.name)
+            return
+        self._thread.run_to_line(self._file_path,
+                                 self.get_variable(['win/buf', 'selected-item']),
+                                 condition)
+
+    def run_until(self):
+        condition = cui.read_string('Run to cursor until').strip()
+        if condition:
+            self.run_to_cursor(condition)
+
     def hide_selection(self):
         return self._line == self.get_variable(['win/buf', 'selected-item']) + 1
 
@@ -195,20 +523,47 @@ thread_state_col = {
     constants.THREAD_STATE_RUNNING:   'info'
 }
 
+class ThreadGroup(object):
+    """Suspended threads sharing an identical stack."""
+
+    def __init__(self, stack):
+        self.stack = stack
+        self.threads = []
+
+    @property
+    def frames(self):
+        return self.threads[0].frames
+
+
 class ThreadBuffer(ThreadBufferKeymap, cui.buffers.TreeBuffer):
-    """Display all existing threads in the current session."""
+    """
+    Display all existing threads in the current session.
+
+    If grouping is enabled, suspended threads with identical stacks are
+    collapsed into one entry showing the number of threads.
+    """
 
     __keymap__ = {
-        'C-c':  py_open_eval
+        'C-c':  py_open_eval,
+        'g':    lambda: cui.current_buffer().toggle_grouping()
     }
 
     @classmethod
     def name(cls, session, **kwargs):
-        return 'pydevd Threads(%s:%s)' % session.address
+        return 'pydevd Threads(%s)' % session.key
 
     def __init__(self, session):
         super(ThreadBuffer, self).__init__(session)
         self.session = session
+        self._group_stacks = False
+        self._groups = {}
+
+    def attach_session(self, session):
+        self.session = session
+        self._groups = {}
+
+    def toggle_grouping(self):
+        self._group_stacks = not self._group_stacks
 
     @property
     def thread(self):
@@ -218,12 +573,15 @@ class ThreadBuffer(ThreadBufferKeymap, cui.buffers.TreeBuffer):
         item = self.selected_item()
         if isinstance(item, cui_pydevd.D_Thread):
             return item
+        elif isinstance(item, ThreadGroup):
+            return item.threads[0]
         elif isinstance(item, cui_pydevd.D_Frame):
             return item.thread
 
     def selected_frame(self):
         item = self.selected_item()
         return item           if isinstance(item, cui_pydevd.D_Frame) else \
+               item.frames[0] if isinstance(item, ThreadGroup) else \
                item.frames[0] if isinstance(item, cui_pydevd.D_Thread) and \
                                  item.state == constants.THREAD_STATE_SUSPENDED else \
                None
@@ -234,13 +592,32 @@ class ThreadBuffer(ThreadBufferKeymap, cui.buffers.TreeBuffer):
             frame.thread.display_frame(frame)
 
     def get_roots(self):
-        return list(self.session.threads.values())
+        if not self._group_stacks:
+            return list(self.session.threads.values())
+
+        # Reuse group objects, so selection survives re-rendering
+        groups = {}
+        roots = []
+        for thread in self.session.threads.values():
+            if thread.stack is None:
+                roots.append(thread)
+                continue
+            group = groups.get(thread.stack)
+            if group is None:
+                group = groups[thread.stack] = self._groups.get(thread.stack) or \
+                                               ThreadGroup(thread.stack)
+                group.threads = []
+                roots.append(group)
+            group.threads.append(thread)
+        self._groups = groups
+        return [root.threads[0] if isinstance(root, ThreadGroup) and len(root.threads) == 1 else root
+                for root in roots]
 
     def get_children(self, item):
         return item.frames
 
     def has_children(self, item):
-        return isinstance(item, cui_pydevd.D_Thread) and item.frames
+        return isinstance(item, (cui_pydevd.D_Thread, ThreadGroup)) and item.frames
 
     def is_expanded(self, item):
         return True
@@ -255,6 +632,12 @@ class ThreadBuffer(ThreadBufferKeymap, cui.buffers.TreeBuffer):
                      ' %s ' % item.name,
                      {'content':    '(%s)' % item.id,
                       'foreground': 'inactive'}]]
+        elif isinstance(item, ThreadGroup):
+            return [[{'content':    thread_state_str[constants.THREAD_STATE_SUSPENDED],
+                      'foreground': thread_state_col[constants.THREAD_STATE_SUSPENDED]},
+                     ' %s threads ' % len(item.threads),
+                     {'content':    '(%s)' % ', '.join(thread.name for thread in item.threads),
+                      'foreground': 'inactive'}]]
         elif isinstance(item, cui_pydevd.D_Frame):
             return [truncate_left(width,
                                   '%s:%s' % (item.file, item.line))]
@@ -0,0 +1,83 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Completions for expressions evaluated in a suspended frame.
+
+Completions are requested for the object in front of the token being
+typed, e.g. for ``obj.at`` all attributes of ``obj.`` are fetched, and
+cached per (frame, object). Further typing is completed from the cache,
+which is cleared when the thread resumes.
+"""
+
+import re
+
+from . import constants
+
+_TOKEN = re.compile(r'[\w.]*$')
+
+
+def split_token(text):
+    """
+    Split the token at the end of ``text`` into the object part,
+    including its trailing dot, and the qualifier typed so far.
+    """
+    token = _TOKEN.search(text).group(0)
+    obj, dot, qualifier = token.rpartition('.')
+    return obj + dot, qualifier
+
+
+def common_prefix(names):
+    prefix = names[0]
+    for name in names[1:]:
+        while not name.startswith(prefix):
+            prefix = prefix[:-1]
+    return prefix
+
+def insertion(text, names):
+    """
+    Return the text to insert after ``text`` to complete its last token
+    to the common prefix of ``names``.
+    """
+    _, qualifier = split_token(text)
+    return common_prefix(names)[len(qualifier):]
+
+
+class Completions(object):
+    def __init__(self, thread):
+        self.thread = thread
+        self._cache = {}
+        self._pending = set()
+
+    def complete(self, frame, text, on_loaded=None):
+        """
+        Return the names completing the token at the end of ``text`` or
+        None if they have to be fetched first, ``on_loaded`` is called
+        once they are available.
+        """
+        obj, qualifier = split_token(text)
+        key = (frame.id, obj)
+        names = self._cache.get(key)
+        if names is None:
+            if key not in self._pending:
+                self._pending.add(key)
+                self.thread.session.requests.send(
+                    constants.CMD_GET_COMPLETIONS,
+                    '%s\t%s\tLOCAL\t%s' % (self.thread.id, frame.id, obj),
+                    self.thread,
+                    lambda completions: self._on_completions(key, completions, on_loaded),
+                    lambda: self._pending.discard(key),
+                    idempotent=True)
+            return None
+        return [name for name in names if name.startswith(qualifier)]
+
+    def _on_completions(self, key, completions, on_loaded):
+        self._pending.discard(key)
+        self._cache[key] = sorted(set(completion['name'] for completion in completions))
+        if on_loaded:
+            on_loaded()
+
+    def clear(self):
+        self._cache.clear()
+        self._pending.clear()
@@ -4,6 +4,19 @@
 
 WINDOW_SET_NAME = 'pydevd'
 
+# Ids of temporary breakpoints (run to line) start here, ids of
+# persistent breakpoints are counted from 0
+TEMPORARY_BREAKPOINT_ID = 1000000
+
+# Maximum number of bytes read from a debugger connection at once
+RECEIVE_SIZE = 256 * 1024
+
+# Number of expressions kept in the eval history of a session
+EVAL_HISTORY_SIZE = 100
+
+# Number of completion candidates listed in the message line
+COMPLETIONS_SHOWN = 20
+
 ######################
 ## cui Variable Names
 ######################
@@ -17,8 +30,26 @@ ST_ON_SUSPEND =            ['pydevds', 'on-suspend']
 ST_ON_RESUME =             ['pydevds', 'on-resume']
 ST_ON_KILL_THREAD =        ['pydevds', 'on-kill-thread']
 ST_ON_KILL_SESSION =       ['pydevds', 'on-kill-session']
+ST_ON_NEW_SESSION =        ['pydevds', 'on-new-session']
 ST_FILE_MAPPING =          ['pydevds', 'file-mapping']
 ST_SERIALIZE_BREAKPOINTS = ['pydevds', 'serialize-breakpoints']
+ST_SESSION_GROUP =         ['pydevds', 'session-group']
+ST_OUTPUT_LINES =          ['pydevds', 'output-lines']
+ST_OUTPUT_REFRESH =        ['pydevds', 'output-refresh']
+ST_REQUEST_TIMEOUT =       ['pydevds', 'request-timeout']
+ST_REQUEST_RETRIES =       ['pydevds', 'request-retries']
+ST_PROFILE_INTERVAL =      ['pydevds', 'profile-interval']
+ST_ARRAY_PAGE_ROWS =       ['pydevds', 'array-page-rows']
+ST_ARRAY_PAGE_COLS =       ['pydevds', 'array-page-cols']
+ST_SEARCH_MAX_DEPTH =      ['pydevds', 'search-max-depth']
+ST_SEARCH_MAX_NODES =      ['pydevds', 'search-max-nodes']
+ST_SEARCH_WINDOW =         ['pydevds', 'search-window']
+ST_HISTORY =               ['pydevds', 'history']
+ST_HISTORY_MAX_BYTES =     ['pydevds', 'history-max-bytes']
+ST_HEADLESS =              ['pydevds', 'headless']
+ST_PROJECT_ROOTS =         ['pydevds', 'project-roots']
+ST_REVALIDATE_SOURCES =    ['pydevds', 'revalidate-sources']
+ST_PROTOCOL =              ['pydevds', 'protocol']
 ST_DEBUG_LOG =             ['logging', 'pydevds-comm']
 
 #####################
@@ -49,6 +80,22 @@ CMD_GET_VAR = 110
 # CMD_SET_BREAK
 # -------------
 #
+# Set or replace a breakpoint. Requires breakpoints by ID
+# (see CMD_VERSION).
+#
+# Payload:
+#
+#   111\t<SEQ_NO>\t<ID>\t<TYPE>\t<FILE>\t<LINE>\t<FUNC>\t<CONDITION>\t<EXPRESSION>\t<HIT_CONDITION>\t<IS_LOGPOINT>\t<SUSPEND_POLICY>
+#
+# Variables:
+#
+#   <ID> -> Breakpoint id, a breakpoint with the same id is replaced
+#   <CONDITION> -> Expression evaluated in the debuggee or 'None'
+#   <HIT_CONDITION> -> Expression where @HIT@ is replaced with
+#                      the hit count or 'None'
+#   <IS_LOGPOINT> -> 'True' | 'False'
+#   <SUSPEND_POLICY> -> 'NONE' | 'ALL'
+#
 CMD_SET_BREAK = 111
 
 # CMD_REMOVE_BREAK
@@ -58,7 +105,7 @@ CMD_SET_BREAK = 111
 #
 # Payload:
 #
-#   111/t<SEQ_NO>\t<TYPE>\t<FILE>\t<ID>
+#   112\t<SEQ_NO>\t<TYPE>\t<FILE>\t<ID>
 #
 # Variables:
 #
@@ -71,6 +118,124 @@ CMD_EVAL_EXPR = 113
 CMD_GET_FRAME = 114
 CMD_EXEC_EXPR = 115
 
+# CMD_WRITE_TO_CONSOLE
+# --------------------
+#
+# Sent from the debugger for redirected output and logpoint hits.
+#
+# Payload:
+#
+#   116\t<SEQ_NO>\t<xml><io s="<TEXT>" ctx="<CTX>"/></xml>
+#
+# Variables:
+#
+#   <TEXT> -> Quoted output text
+#   <CTX> -> 1 for stdout, 2 for stderr
+#
+CMD_WRITE_TO_CONSOLE = 116
+
+# CMD_GET_COMPLETIONS
+# -------------------
+#
+# Request completions for a token in the scope of a frame.
+#
+# Payload:
+#
+#   120\t<SEQ_NO>\t<THREAD>\t<FRAME>\tLOCAL\t<TOKEN>
+#
+# Variables:
+#
+#   <TOKEN> -> Text to complete, e.g. 'obj.attr' or 'na'
+#
+# Response:
+#
+#   120\t<SEQ_NO>\t<xml><comp p0="<NAME>" p1="<DOC>" p2="<ARGS>" p3="<TYPE>"/>...</xml>
+#
+CMD_GET_COMPLETIONS = 120
+
+# CMD_ADD_EXCEPTION_BREAK
+# -----------------------
+#
+# Suspend when an exception of a type (or a subclass) is raised.
+# Adding a type again replaces its settings.
+#
+# Payload:
+#
+#   122\t<SEQ_NO>\tpython-<TYPE>\t<CONDITION>\t<EXPRESSION>\t<CAUGHT>\t<UNCAUGHT>\t<IGNORE_LIBS>
+#
+# Variables:
+#
+#   <TYPE> -> Name of the exception type
+#   <CONDITION> -> Evaluated in the debuggee, or 'None'. For caught
+#                  exceptions this happens before __exception__ is
+#                  bound, so it cannot refer to the exception
+#   <CAUGHT> -> 1 to suspend on handled exceptions, else 0
+#   <UNCAUGHT> -> 1 to suspend on unhandled exceptions, else 0
+#   <IGNORE_LIBS> -> 1 to ignore exceptions outside the project roots
+#
+# Of all registered types an exception is an instance of, pydevd uses
+# the most specific one. Excluded types are registered with condition
+# 'False', so they and their subclasses never suspend.
+#
+CMD_ADD_EXCEPTION_BREAK = 122
+
+# CMD_REMOVE_EXCEPTION_BREAK
+# --------------------------
+#
+# Payload:
+#
+#   123\t<SEQ_NO>\tpython-<TYPE>
+#
+CMD_REMOVE_EXCEPTION_BREAK = 123
+
+# CMD_GET_ARRAY
+# -------------
+#
+# Request a rectangular slice of a numpy array or pandas data frame.
+#
+# Payload:
+#
+#   143\t<SEQ_NO>\t<ROFFSET>\t<COFFSET>\t<ROWS>\t<COLS>\t<FORMAT>\t<THREAD>\t<FRAME>\t<SCOPE>\t<PATH>
+#
+# Variables:
+#
+#   <FORMAT> -> Format string applied to values, '%' for default
+#   <PATH> -> Expression evaluated in the frame, only the part after
+#             the last tab is used
+#
+# Response:
+#
+#   143\t<SEQ_NO>\t<xml><array rows cols type min max .../><arraydata ...><row/><var/>...</arraydata></xml>
+#
+CMD_GET_ARRAY = 143
+
+# CMD_LOAD_SOURCE
+# ---------------
+#
+# Request the source of a file from the debuggee.
+#
+# Payload:
+#
+#   124\t<SEQ_NO>\t<FILE>
+#
+# Response:
+#
+#   124\t<SEQ_NO>\t<QUOTED_SOURCE>
+#
+CMD_LOAD_SOURCE = 124
+
+# CMD_SET_PROJECT_ROOTS
+# ---------------------
+#
+# Set the directories considered project code, as opposed to library
+# code, e.g. for exception breakpoints ignoring libraries.
+#
+# Payload:
+#
+#   202\t<SEQ_NO>\t<ROOT>\t<ROOT>...
+#
+CMD_SET_PROJECT_ROOTS = 202
+
 # CMD_VERSION
 # -----------
 #
@@ -104,6 +269,31 @@ CMD_RETURN = 502
 #
 CMD_ERROR = 901
 
+# CMD_CUI_IDENTITY
+# ----------------
+#
+# Not part of pydevd. Sent by the launcher through the connection of
+# pydevd to announce the identity of the debuggee, so a process that
+# reconnects gets the state of its previous session. Keep in sync with
+# pydevd_stub.py, which does not import this package.
+#
+# Payload:
+#
+#   5001\t0\t<IDENTITY>
+#
+# Variables:
+#
+#   <IDENTITY> -> Quoted JSON object with the keys program, module,
+#                 argv and children, the path of child indices from
+#                 the launched process
+#
+# Over DAP, the identity is sent as event, unquoted:
+#
+#   {"type": "event", "event": "cuiIdentity", "body": {"identity": <IDENTITY>}}
+#
+CMD_CUI_IDENTITY = 5001
+DAP_IDENTITY_EVENT = 'cuiIdentity'
+
 #################
 ## Thread States
 #################
@@ -111,3 +301,10 @@ CMD_ERROR = 901
 THREAD_STATE_INITIAL   = 1
 THREAD_STATE_SUSPENDED = 2
 THREAD_STATE_RUNNING   = 3
+
+##################
+## Output Streams
+##################
+
+OUTPUT_STDOUT = 1
+OUTPUT_STDERR = 2
@@ -0,0 +1,455 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Transport for pydevd's debug adapter protocol (DAP) mode, used for
+sessions with pydevds/protocol set to 'dap'. pydevd has to be started
+with ``--json-dap-http``, pydevd_stub.py does this if the environment
+variable CUI_PYDEVD_PROTOCOL is 'dap'.
+
+Sessions keep sending the commands of the line protocol, each command
+is translated into DAP requests here. Responses and events are turned
+into (command, sequence_no, payload) tuples with the payloads
+payload.py produces, so threads, frames and buffers do not depend on
+the protocol in use. Where the line protocol needs a single command,
+follow-up requests are sent by the transport: the stack trace of a
+stopped thread, the scopes of a frame, the threads after one started.
+
+CMD_VERSION sends the initialize and attach requests, CMD_RUN the
+configurationDone request that lets the debuggee run. Breakpoints are
+kept per file and sent with setBreakpoints, exception breakpoints with
+setExceptionBreakpoints, as DAP replaces them as a whole.
+
+Not available over DAP: array pages (CMD_GET_ARRAY), project roots and
+conditions of exception breakpoints. Exception types registered with a
+condition, excluded types among them, are not sent, so excludes have
+no effect.
+"""
+
+import collections
+import functools
+import json
+import sys
+import weakref
+
+import cui
+
+from . import constants
+from . import framing
+from . import pending
+
+# Stop reasons of the line protocol by reason of DAP stopped events
+_stop_reasons = {
+    'breakpoint':          constants.CMD_SET_BREAK,
+    'function breakpoint': constants.CMD_SET_BREAK,
+    'exception':           constants.CMD_ADD_EXCEPTION_BREAK,
+    'step':                constants.CMD_STEP_OVER,
+    'pause':               constants.CMD_THREAD_SUSPEND,
+}
+
+# Variables are listed inline, as in the line protocol
+_variable_presentation = {'special': 'inline', 'function': 'inline',
+                          'class': 'inline', 'protected': 'inline'}
+
+
+def encode_message(message):
+    body = json.dumps(message).encode('utf-8')
+    return b'Content-Length: %d\r\n\r\n' % len(body) + body
+
+# Mapped paths per file mapping, keyed by the path as sent by pydevd
+_mapped_paths = weakref.WeakKeyDictionary()
+
+def map_path(file_mapping, path):
+    """
+    Map a path received from pydevd to a local path. DAP paths are not
+    quoted, otherwise this is payload.map_path.
+    """
+    paths = _mapped_paths.setdefault(file_mapping, {})
+    mapped = paths.get(path)
+    if mapped is None:
+        mapped = paths[path] = sys.intern(file_mapping.to_this(path.replace('\\', '/')))
+    return mapped
+
+def _thread_id(thread_id):
+    return thread_id if thread_id == '*' else int(thread_id)
+
+def _variable(name, vtype, value, reference):
+    return {'type':  'variable',
+            'name':  name,
+            'vtype': vtype or '',
+            'value': value,
+            'isContainer': reference > 0}
+
+
+class DapTransport(object):
+    def __init__(self, session):
+        self._session = session
+        self._framer = framing.ContentLengthFramer()
+        # (sequence_no, on_response, on_fail) by sequence number of the
+        # request, sequence_no being that of the command the request
+        # was sent for
+        self._handlers = {}
+        self._outgoing = []
+        # Messages answered without a request, returned by poll
+        self._answered = []
+        self._threads = set()
+        # Stop reasons of stopped threads whose stack trace is pending
+        self._stopped = {}
+        # Suspends waiting for the outstanding stack traces
+        self._suspends = []
+        self._suspended = set()
+        # Frame ids by thread and variable references by frame id and path
+        self._frames = {}
+        self._references = {}
+        # Breakpoints by remote path and breakpoint id
+        self._breakpoints = {}
+        # (condition, caught, uncaught) by exception type
+        self._exceptions = collections.OrderedDict()
+
+        self._translators = {
+            constants.CMD_VERSION: self._initialize,
+            constants.CMD_LIST_THREADS: self._list_threads,
+            constants.CMD_RUN: self._run,
+            constants.CMD_THREAD_SUSPEND: functools.partial(self._thread_request, 'pause'),
+            constants.CMD_THREAD_RESUME: functools.partial(self._thread_request, 'continue'),
+            constants.CMD_STEP_INTO: functools.partial(self._thread_request, 'stepIn'),
+            constants.CMD_STEP_OVER: functools.partial(self._thread_request, 'next'),
+            constants.CMD_STEP_RETURN: functools.partial(self._thread_request, 'stepOut'),
+            constants.CMD_SET_BREAK: self._set_break,
+            constants.CMD_REMOVE_BREAK: self._remove_break,
+            constants.CMD_ADD_EXCEPTION_BREAK: self._add_exception_break,
+            constants.CMD_REMOVE_EXCEPTION_BREAK: self._remove_exception_break,
+            constants.CMD_SET_PROJECT_ROOTS: lambda sequence_no, argument: None,
+            constants.CMD_GET_FRAME: self._get_frame,
+            constants.CMD_GET_VAR: self._get_var,
+            constants.CMD_EVAL_EXPR: functools.partial(self._evaluate, 'watch'),
+            constants.CMD_EXEC_EXPR: functools.partial(self._evaluate, 'repl'),
+            constants.CMD_GET_COMPLETIONS: self._completions,
+            constants.CMD_LOAD_SOURCE: self._load_source,
+        }
+        self._events = {
+            'stopped': self._on_stopped,
+            'continued': self._on_continued,
+            'thread': self._on_thread,
+            'output': self._on_output,
+            constants.DAP_IDENTITY_EVENT: self._on_identity,
+        }
+
+    def encode(self, commands):
+        """
+        Translate (command, sequence_no, argument) tuples of the line
+        protocol into DAP requests and return them as bytes to send.
+        """
+        for command, sequence_no, argument in commands:
+            translator = self._translators.get(command)
+            if translator is None:
+                self._answered.append((constants.CMD_ERROR, sequence_no,
+                                       '%s is not available over DAP'
+                                       % pending.command_name(command)))
+            else:
+                translator(sequence_no, argument)
+        return self._take_outgoing()
+
+    def feed(self, data):
+        """
+        Return the messages received with ``data``. Follow-up requests
+        are sent before returning.
+        """
+        messages = self.poll()
+        for body in self._framer.feed(data):
+            if cui.get_variable(constants.ST_DEBUG_LOG):
+                cui.message('=== Received message: \n%s' % (body.decode('utf-8', 'replace'),))
+            message = json.loads(body.decode('utf-8'))
+            if message['type'] == 'response':
+                messages.extend(self._on_response(message))
+            elif message['type'] == 'event' and message['event'] in self._events:
+                messages.extend(self._events[message['event']](message.get('body', {})))
+        if self._outgoing:
+            data = self._take_outgoing()
+            if cui.get_variable(constants.ST_DEBUG_LOG):
+                cui.message('=== Sending requests: \n%s' % (data.decode('utf-8'),))
+            self._session.send_all(data)
+        return messages
+
+    def poll(self):
+        """Return messages for commands that were answered locally."""
+        answered, self._answered = self._answered, []
+        return answered
+
+    def _take_outgoing(self):
+        data = b''.join(encode_message(message) for message in self._outgoing)
+        del self._outgoing[:]
+        return data
+
+    def _send(self, command, arguments, sequence_no, on_response=None, on_fail=None,
+              request_seq=None):
+        """
+        Queue a request for the command with ``sequence_no``, as the
+        request with ``request_seq``, if given.
+        """
+        if request_seq is None:
+            request_seq = self._session.group.next_sequence_no()
+        message = {'seq': request_seq, 'type': 'request', 'command': command}
+        if arguments is not None:
+            message['arguments'] = arguments
+        self._outgoing.append(message)
+        self._handlers[request_seq] = (sequence_no, on_response, on_fail)
+
+    def _on_response(self, message):
+        handler = self._handlers.pop(message['request_seq'], None)
+        if handler is None:
+            return []
+        sequence_no, on_response, on_fail = handler
+        if not message['success']:
+            if on_fail is not None:
+                return on_fail()
+            return [(constants.CMD_ERROR, sequence_no,
+                     message.get('message', '%s failed' % message['command']))]
+        if on_response is None:
+            return []
+        return on_response(sequence_no, message.get('body', {}))
+
+    # Commands
+
+    def _initialize(self, sequence_no, argument):
+        self._send('initialize', {'clientID': 'cui',
+                                  'adapterID': 'cui_pydevd',
+                                  'pathFormat': 'path',
+                                  'linesStartAt1': True,
+                                  'columnsStartAt1': True,
+                                  'supportsVariableType': True},
+                   sequence_no,
+                   lambda sequence_no, body: [(constants.CMD_VERSION, sequence_no, 'DAP')],
+                   request_seq=sequence_no)
+        self._send('attach', {'justMyCode': False,
+                              'variablePresentation': _variable_presentation},
+                   sequence_no)
+
+    def _list_threads(self, sequence_no, argument):
+        self._send('threads', None, sequence_no, self._on_threads, request_seq=sequence_no)
+
+    def _run(self, sequence_no, argument):
+        self._send('configurationDone', None, sequence_no, request_seq=sequence_no)
+
+    def _thread_request(self, command, sequence_no, argument):
+        self._send(command, {'threadId': _thread_id(argument)}, sequence_no,
+                   request_seq=sequence_no)
+
+    def _set_break(self, sequence_no, argument):
+        breakpoint_id, _, path, line, _, condition, expression, hit_condition, is_logpoint = \
+            argument.split('\t')[:9]
+        breakpoint = {'line': int(line)}
+        if condition != 'None':
+            breakpoint['condition'] = condition
+        if hit_condition != 'None':
+            # pydevd passes conditions containing @HIT@ on unchanged
+            breakpoint['hitCondition'] = hit_condition
+        if is_logpoint == 'True':
+            breakpoint['logMessage'] = '{%s}' % expression
+        self._breakpoints.setdefault(path, collections.OrderedDict())[breakpoint_id] = breakpoint
+        self._set_breakpoints(sequence_no, path)
+
+    def _remove_break(self, sequence_no, argument):
+        _, path, breakpoint_id = argument.split('\t')
+        self._breakpoints.get(path, {}).pop(breakpoint_id, None)
+        self._set_breakpoints(sequence_no, path)
+
+    def _set_breakpoints(self, sequence_no, path):
+        breakpoints = self._breakpoints.get(path, {})
+        self._send('setBreakpoints', {'source': {'path': path},
+                                      'breakpoints': list(breakpoints.values())},
+                   sequence_no, request_seq=sequence_no)
+        if not breakpoints:
+            self._breakpoints.pop(path, None)
+
+    def _add_exception_break(self, sequence_no, argument):
+        name, condition, _, caught, uncaught = argument.split('\t')[:5]
+        self._exceptions[name[len('python-'):]] = (condition, caught == '1', uncaught == '1')
+        self._set_exception_breakpoints(sequence_no)
+
+    def _remove_exception_break(self, sequence_no, argument):
+        self._exceptions.pop(argument[len('python-'):], None)
+        self._set_exception_breakpoints(sequence_no)
+
+    def _set_exception_breakpoints(self, sequence_no):
+        options = []
+        for name, (condition, caught, uncaught) in self._exceptions.items():
+            if condition != 'None':
+                continue
+            path = [{'names': ['Python Exceptions']}, {'names': [name]}]
+            if caught:
+                options.append({'path': path, 'breakMode': 'always'})
+            if uncaught:
+                options.append({'path': path, 'breakMode': 'unhandled'})
+        self._send('setExceptionBreakpoints', {'filters': [], 'exceptionOptions': options},
+                   sequence_no, request_seq=sequence_no)
+
+    def _get_frame(self, sequence_no, argument):
+        frame_id = argument.split('\t')[1]
+        self._send('scopes', {'frameId': int(frame_id)}, sequence_no,
+                   functools.partial(self._on_scopes, frame_id), request_seq=sequence_no)
+
+    def _get_var(self, sequence_no, argument):
+        fields = argument.split('\t')
+        frame_id, path = fields[1], tuple(fields[3:])
+        reference = self._references.get(frame_id, {}).get(path)
+        if reference is None:
+            self._answered.append((constants.CMD_ERROR, sequence_no,
+                                   'Variable %s has not been listed' % '.'.join(path)))
+            return
+        self._send('variables', {'variablesReference': reference}, sequence_no,
+                   functools.partial(self._on_variables, constants.CMD_GET_VAR, frame_id, path),
+                   request_seq=sequence_no)
+
+    def _evaluate(self, context, sequence_no, argument):
+        fields = argument.split('\t')
+        expression = '\t'.join(fields[3:-1])
+        self._send('evaluate', {'expression': expression,
+                                'frameId': int(fields[1]),
+                                'context': context},
+                   sequence_no, functools.partial(self._on_evaluate, expression),
+                   request_seq=sequence_no)
+
+    def _completions(self, sequence_no, argument):
+        fields = argument.split('\t')
+        text = '\t'.join(fields[3:])
+        self._send('completions', {'frameId': int(fields[1]),
+                                   'text': text,
+                                   'column': len(text) + 1},
+                   sequence_no, self._on_completions, request_seq=sequence_no)
+
+    def _load_source(self, sequence_no, argument):
+        self._send('source', {'source': {'path': argument}, 'sourceReference': 0},
+                   sequence_no,
+                   lambda sequence_no, body: [(constants.CMD_LOAD_SOURCE, sequence_no,
+                                               body['content'])],
+                   request_seq=sequence_no)
+
+    # Responses
+
+    def _on_threads(self, sequence_no, body):
+        threads = [{'type': 'thread_info', 'id': str(thread['id']), 'name': thread['name']}
+                   for thread in body['threads']]
+        self._threads.update(thread['id'] for thread in threads)
+        return [(constants.CMD_RETURN, sequence_no, threads)]
+
+    def _on_scopes(self, frame_id, sequence_no, body):
+        # The first scope holds the local variables
+        if not body['scopes']:
+            return [(constants.CMD_GET_FRAME, sequence_no, [])]
+        self._send('variables', {'variablesReference': body['scopes'][0]['variablesReference']},
+                   sequence_no,
+                   functools.partial(self._on_variables, constants.CMD_GET_FRAME, frame_id, ()))
+        return []
+
+    def _on_variables(self, command, frame_id, path, sequence_no, body):
+        references = self._references.setdefault(frame_id, {})
+        variables = []
+        for variable in body['variables']:
+            reference = variable.get('variablesReference', 0)
+            if reference:
+                references[path + (variable['name'],)] = reference
+            variables.append(_variable(variable['name'], variable.get('type'),
+                                       variable['value'], reference))
+        return [(command, sequence_no, variables)]
+
+    def _on_evaluate(self, expression, sequence_no, body):
+        return [(constants.CMD_EVAL_EXPR, sequence_no,
+                 [_variable(expression, body.get('type'), body['result'],
+                            body.get('variablesReference', 0))])]
+
+    def _on_completions(self, sequence_no, body):
+        return [(constants.CMD_GET_COMPLETIONS, sequence_no,
+                 [{'type': 'completion', 'name': target['label'], 'kind': target.get('type', '')}
+                  for target in body['targets']])]
+
+    def _on_stack_trace(self, thread_id, sequence_no=None, body=None):
+        stop_reason = self._stopped.pop(thread_id, None)
+        if stop_reason is not None and body is not None:
+            file_mapping = self._session.group.file_mapping
+            frames = []
+            for frame in body['stackFrames']:
+                source = frame.get('source', {})
+                frames.append({'type': 'frame',
+                               'id':   str(frame['id']),
+                               'file': map_path(file_mapping,
+                                                source.get('path') or source.get('name', '')),
+                               'name': sys.intern(frame['name']),
+                               'line': frame['line']})
+            self._frames[thread_id] = [frame['id'] for frame in frames]
+            self._suspends.append({'type': 'thread_suspend',
+                                   'id': thread_id,
+                                   'stop_reason': stop_reason,
+                                   'frames': frames})
+        return self._take_suspends()
+
+    def _take_suspends(self):
+        """
+        Return the suspends of threads that stopped together as one
+        message, once all of their stack traces have arrived.
+        """
+        if self._stopped or not self._suspends:
+            return []
+        suspends, self._suspends = self._suspends, []
+        self._suspended.update(suspend['id'] for suspend in suspends)
+        return [(constants.CMD_THREAD_SUSPEND, 0, suspends)]
+
+    # Events
+
+    def _on_stopped(self, body):
+        thread_id = str(body['threadId'])
+        if thread_id not in self._threads:
+            # Threads are listed before their suspend is delivered
+            self._send('threads', None, 0, self._on_threads)
+        self._stopped[thread_id] = _stop_reasons.get(body.get('reason'), 0)
+        self._send('stackTrace', {'threadId': int(thread_id)}, 0,
+                   functools.partial(self._on_stack_trace, thread_id),
+                   functools.partial(self._on_stack_trace, thread_id))
+        return []
+
+    def _resumed(self, thread_id):
+        self._stopped.pop(thread_id, None)
+        self._suspends = [suspend for suspend in self._suspends if suspend['id'] != thread_id]
+        for frame_id in self._frames.pop(thread_id, ()):
+            self._references.pop(frame_id, None)
+        if thread_id not in self._suspended:
+            return []
+        self._suspended.discard(thread_id)
+        return [(constants.CMD_THREAD_RESUME, 0, {'type': 'thread_resume',
+                                                  'id': thread_id,
+                                                  'reason': str(constants.CMD_THREAD_RESUME)})]
+
+    def _on_continued(self, body):
+        if body.get('allThreadsContinued'):
+            thread_ids = sorted(self._suspended | set(self._stopped))
+        else:
+            thread_ids = [str(body['threadId'])]
+        messages = []
+        for thread_id in thread_ids:
+            messages.extend(self._resumed(thread_id))
+        return messages + self._take_suspends()
+
+    def _on_thread(self, body):
+        thread_id = str(body['threadId'])
+        if body['reason'] == 'started':
+            self._send('threads', None, 0, self._on_threads)
+            return []
+        if body['reason'] != 'exited' or thread_id not in self._threads:
+            return []
+        messages = self._resumed(thread_id)
+        self._threads.discard(thread_id)
+        return messages + [(constants.CMD_THREAD_KILL, 0, thread_id)] + self._take_suspends()
+
+    def _on_output(self, body):
+        category = body.get('category', 'console')
+        if category == 'telemetry':
+            return []
+        return [(constants.CMD_WRITE_TO_CONSOLE, 0,
+                 [{'type': 'output',
+                   'text': body['output'],
+                   'ctx':  constants.OUTPUT_STDERR if category == 'stderr'
+                           else constants.OUTPUT_STDOUT}])]
+
+    def _on_identity(self, body):
+        return [(constants.CMD_CUI_IDENTITY, 0, body['identity'])]
@@ -2,22 +2,76 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import collections
 import cui
 
-from cui_emacs import highlight_line
 from cui_pydevd import constants
 
+_highlight_line = None
+
+def highlight_line():
+    # cui_emacs is imported when the first highlight is sent
+    global _highlight_line
+    if _highlight_line is None:
+        from cui_emacs import highlight_line as _module
+        _highlight_line = _module
+    return _highlight_line
+
+# Overlay updates are queued per overlay and sent once per tick, an
+# update replaces the one queued before it. Updates that would not
+# change the state last sent to Emacs are dropped.
+_queue = collections.OrderedDict()
+_sent = {}
+stats = collections.Counter()
+
+def _enqueue(overlay, update):
+    stats['queued'] += 1
+    if overlay in _queue:
+        stats['superseded'] += 1
+        del _queue[overlay]
+    _queue[overlay] = update
+
+@cui.update_func
+def flush_overlay_updates():
+    while _queue:
+        overlay, update = _queue.popitem(last=False)
+        if _sent.get(overlay, ('remove',)) == update or \
+           (update[0] == 'unhighlight' and overlay not in _sent):
+            stats['redundant'] += 1
+            continue
+
+        stats['sent'] += 1
+        if update[0] == 'highlight':
+            highlight_line().highlight_line(overlay, update[1], update[2])
+        elif update[0] == 'unhighlight':
+            highlight_line().unhighlight_line(overlay)
+        else:
+            highlight_line().remove_overlay(overlay)
+
+        if update[0] == 'remove':
+            _sent.pop(overlay, None)
+        else:
+            _sent[overlay] = update
+
+def avoided_updates():
+    return stats['superseded'] + stats['redundant']
+
+def py_emacs_stats():
+    """Display the number of overlay updates sent to and avoided for Emacs."""
+    cui.message('Emacs overlay updates: %s queued, %s sent, %s avoided'
+                % (stats['queued'], stats['sent'], avoided_updates()))
+
 def overlay_id(thread):
     return 'pydevds/%s/%s' % (thread.session, thread.id)
 
 def on_set_frame(thread, file, line):
-    highlight_line.highlight_line(overlay_id(thread), file, line)
+    _enqueue(overlay_id(thread), ('highlight', file, line))
 
 def on_resume(thread):
-    highlight_line.unhighlight_line(overlay_id(thread))
+    _enqueue(overlay_id(thread), ('unhighlight',))
 
 def on_kill_thread(thread):
-    highlight_line.remove_overlay(overlay_id(thread))
+    _enqueue(overlay_id(thread), ('remove',))
 
 @cui.init_func
 def init_emacs_bindings():
@@ -0,0 +1,87 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Framing of inbound traffic on the bytes level, by newlines for the
+line protocol and by Content-Length headers for DAP.
+"""
+
+
+class LineFramer(object):
+    """
+    Collects received data in a bytearray and splits off complete
+    lines. Lines are returned as bytes, copied exactly once out of the
+    receive buffer, and are never decoded here.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def feed(self, data):
+        self._buffer += data
+        lines = []
+        start = 0
+        end = self._buffer.find(b'\n', self._scanned)
+        if end == -1:
+            # Do not search the same bytes again on the next feed
+            self._scanned = len(self._buffer)
+            return lines
+
+        with memoryview(self._buffer) as view:
+            while end != -1:
+                lines.append(bytes(view[start:end]))
+                start = end + 1
+                end = self._buffer.find(b'\n', start)
+        del self._buffer[:start]
+        self._scanned = len(self._buffer)
+        return lines
+
+    def pending(self):
+        return len(self._buffer)
+
+
+class ContentLengthFramer(object):
+    """
+    Collects received data in a bytearray and splits off the bodies of
+    complete messages, each preceded by a header with its
+    Content-Length. Bodies are returned as bytes and are never decoded
+    here.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # Length of the body following an already parsed header
+        self._length = None
+
+    def feed(self, data):
+        self._buffer += data
+        bodies = []
+        start = 0
+        with memoryview(self._buffer) as view:
+            while True:
+                if self._length is None:
+                    end = self._buffer.find(b'\r\n\r\n', start)
+                    if end == -1:
+                        break
+                    self._length = _content_length(bytes(view[start:end]))
+                    start = end + 4
+                if len(self._buffer) - start < self._length:
+                    break
+                bodies.append(bytes(view[start:start + self._length]))
+                start += self._length
+                self._length = None
+        del self._buffer[:start]
+        return bodies
+
+    def pending(self):
+        return len(self._buffer)
+
+
+def _content_length(header):
+    for field in header.split(b'\r\n'):
+        name, _, value = field.partition(b':')
+        if name.strip().lower() == b'content-length':
+            return int(value)
+    raise ValueError('Message header without Content-Length: %r' % header)
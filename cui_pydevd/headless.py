@@ -0,0 +1,283 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Headless scripted debugging.
+
+Runs the debugger server without the cui user interface. Breakpoints
+are set through _Breakpoints, on each hit the variables of the topmost
+frames and a list of expressions are collected, written to a JSONL file
+and the thread is resumed.
+
+    python -m cui_pydevd.headless -o hits.jsonl [ options ] file:line ...
+
+Each record carries the time from the suspend notification to the
+record being written, a summary of these latencies is printed when the
+run ends.
+"""
+
+import argparse
+import collections
+import functools
+import json
+import os
+import selectors
+import socket
+import sys
+import time
+
+import cui
+
+import cui_pydevd
+from cui_pydevd import constants
+
+
+class HeadlessServer(object):
+    """
+    Accepts debugger connections and dispatches their traffic in a
+    select loop driven by ``poll``. Provides ``clients`` and
+    ``clients_by_name`` like the server used with the cui UI.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.clients = collections.OrderedDict()
+        self.clients_by_name = {}
+        self._selector = selectors.DefaultSelector()
+        self._socket = None
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(5)
+        self._selector.register(self._socket, selectors.EVENT_READ)
+
+    def poll(self, timeout):
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._socket:
+                self._accept()
+            else:
+                self._handle(self.clients[key.fileobj])
+
+    def _accept(self):
+        client_socket, _ = self._socket.accept()
+        session = cui_pydevd.Session(client_socket)
+        self.clients[client_socket] = session
+        self.clients_by_name[str(session)] = session
+        self._selector.register(client_socket, selectors.EVENT_READ)
+
+    def _handle(self, session):
+        try:
+            session.handle()
+        except OSError:
+            self._close_session(session)
+
+    def _close_session(self, session):
+        self._selector.unregister(session.socket)
+        del self.clients[session.socket]
+        del self.clients_by_name[str(session)]
+        session.close()
+
+    def close(self):
+        for session in list(self.clients.values()):
+            self._close_session(session)
+        self._selector.close()
+        self._socket.close()
+
+
+class Hit(object):
+    def __init__(self, thread, record, pending):
+        self.thread = thread
+        self.record = record
+        self.pending = pending
+        self.started = time.monotonic()
+
+
+class Harvester(object):
+    """
+    Collect the variables of the ``max_frames`` topmost frames and the
+    values of ``expressions`` each time a thread suspends, write them
+    to ``output`` as one JSON object per line and resume the thread.
+    """
+
+    def __init__(self, output, breakpoints, max_frames=1, expressions=None, max_hits=None):
+        self.output = output
+        self.breakpoints = breakpoints
+        self.max_frames = max_frames
+        self.expressions = expressions or []
+        self.max_hits = max_hits
+        self.hits = 0
+        self.latencies = []
+        self.sessions_seen = 0
+
+    def on_new_session(self, session):
+        """Activate all breakpoints before the session starts running."""
+        self.sessions_seen += 1
+        breakpoints = cui.get_variable(constants.ST_BREAKPOINTS)
+        for path, line in self.breakpoints:
+            if not breakpoints.sessions(path, line).get(str(session), False):
+                session.toggle_breakpoint(path, line)
+
+    def on_suspend(self, thread, file_, line):
+        frames = thread.frames[:self.max_frames]
+        # Expressions are evaluated in the topmost frame, even if no
+        # frame variables are collected
+        expressions = self.expressions if thread.frames else []
+        hit = Hit(thread,
+                  {'hit': self.hits,
+                   'time': time.time(),
+                   'session': str(thread.session),
+                   'thread': thread.id,
+                   'file': file_,
+                   'line': line,
+                   'frames': [{'file': frame.file,
+                               'name': frame.name,
+                               'line': frame.line,
+                               'variables': None}
+                              for frame in frames],
+                   'expressions': {}},
+                  len(frames) + len(expressions))
+        self.hits += 1
+
+        if not hit.pending:
+            self._write(hit)
+            return
+
+        # Fetching frames is retried on timeout, expressions may have
+        # side effects and are sent only once.
+        if frames:
+            thread.session.requests.send_batch([
+                (constants.CMD_GET_FRAME,
+                 '%s\t%s\t' % (thread.id, frame.id),
+                 functools.partial(self._on_frame, hit, index),
+                 functools.partial(self._done, hit))
+                for index, frame in enumerate(frames)
+            ], thread, idempotent=True)
+        if expressions:
+            thread.session.requests.send_batch([
+                (constants.CMD_EVAL_EXPR,
+                 '%s\t%s\tLOCAL\t%s\t0' % (thread.id, thread.frames[0].id, expr),
+                 functools.partial(self._on_expression, hit, expr),
+                 functools.partial(self._done, hit))
+                for expr in expressions
+            ], thread)
+
+    def _on_frame(self, hit, index, variables):
+        hit.record['frames'][index]['variables'] = [
+            {'name': variable['name'], 'type': variable['vtype'], 'value': variable['value']}
+            for variable in variables
+        ]
+        self._done(hit)
+
+    def _on_expression(self, hit, expr, variables):
+        hit.record['expressions'][expr] = variables[0]['value'] if variables else None
+        self._done(hit)
+
+    def _done(self, hit):
+        hit.pending -= 1
+        if hit.pending == 0:
+            self._write(hit)
+
+    def _write(self, hit):
+        latency = time.monotonic() - hit.started
+        hit.record['latency'] = latency
+        self.output.write(json.dumps(hit.record) + '\n')
+        self.latencies.append(latency)
+        hit.thread.resume()
+
+    def finished(self):
+        return self.max_hits is not None and len(self.latencies) >= self.max_hits
+
+    def summary(self):
+        if not self.latencies:
+            return 'No breakpoint hits recorded.'
+        latencies = sorted(self.latencies)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        return ('%s hits, latency ms: mean %.2f, p50 %.2f, p95 %.2f, max %.2f'
+                % (len(latencies),
+                   1000 * sum(latencies) / len(latencies),
+                   1000 * percentile(0.5),
+                   1000 * percentile(0.95),
+                   1000 * latencies[-1]))
+
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError('Expected a number >= 0, got %s' % value)
+    return number
+
+
+def parse_breakpoint(spec):
+    path, _, line = spec.rpartition(':')
+    if not path:
+        raise argparse.ArgumentTypeError('Expected file:line, got %s' % spec)
+    # Lines are 1-based on the command line, 0-based in _Breakpoints
+    return os.path.abspath(path), int(line) - 1
+
+
+def run(host, port, output, breakpoints, max_frames=1, expressions=None,
+        max_hits=None, timeout=None):
+    """
+    Serve debugger sessions until ``max_hits`` hits have been recorded,
+    all sessions are gone after at least one connected, or ``timeout``
+    seconds have passed. Returns the harvester.
+    """
+    cui.set_variable(constants.ST_HEADLESS, True)
+    cui.set_variable(constants.ST_HOST, host)
+    cui.set_variable(constants.ST_PORT, port)
+    cui.set_variable(constants.ST_SERIALIZE_BREAKPOINTS, False)
+
+    srv = HeadlessServer(host, port)
+    cui.set_variable(constants.ST_SERVER, srv)
+    breakpoint_source = cui_pydevd._Breakpoints()
+    cui.set_variable(constants.ST_BREAKPOINTS, breakpoint_source)
+    for path, line in breakpoints:
+        breakpoint_source.add_breakpoint(path, line)
+
+    harvester = Harvester(output, breakpoints, max_frames, expressions, max_hits)
+    cui.add_hook(constants.ST_ON_NEW_SESSION, harvester.on_new_session)
+    cui.add_hook(constants.ST_ON_SUSPEND, harvester.on_suspend)
+
+    srv.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while not harvester.finished():
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            if harvester.sessions_seen and not srv.clients:
+                break
+            srv.poll(0.1)
+            cui_pydevd.update_sessions()
+    finally:
+        srv.close()
+    return harvester
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cui_pydevd.headless',
+                                     description='Collect variables at breakpoints without the cui UI.')
+    parser.add_argument('breakpoints', nargs='+', type=parse_breakpoint, metavar='file:line')
+    parser.add_argument('-o', '--output', required=True, help='JSONL file to write hits to')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=4040)
+    parser.add_argument('--frames', type=non_negative_int, default=1,
+                        help='Number of frames to collect')
+    parser.add_argument('--eval', action='append', dest='expressions', default=[],
+                        help='Expression evaluated in the topmost frame, may be repeated')
+    parser.add_argument('--max-hits', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.output, 'w') as output:
+        harvester = run(args.host, args.port, output, args.breakpoints,
+                        args.frames, args.expressions, args.max_hits, args.timeout)
+    print(harvester.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
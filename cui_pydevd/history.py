@@ -0,0 +1,129 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Bounded history of suspend snapshots.
+
+A snapshot holds the interned stack of a thread and the variables
+fetched while it was suspended. Variables are keyed by their path,
+(frame index, name, child name, ...), and only the first snapshot of
+a thread stores all of them, later ones store differences to their
+predecessor. Histories are evicted oldest snapshot first from the
+least recently used thread once the memory cap is exceeded.
+"""
+
+import collections
+import sys
+
+# Rough per-entry overhead used for estimating memory consumption
+_ENTRY_SIZE = 100
+
+
+class Snapshot(object):
+    __slots__ = ('stack', 'changed', 'removed', 'size')
+
+    def __init__(self, stack, changed, removed):
+        self.stack = stack
+        self.changed = changed
+        self.removed = removed
+        self.size = _ENTRY_SIZE * (1 + len(stack) + len(changed) + len(removed)) + \
+                    sum(len(value) for _, value in changed.values())
+
+
+def _collect(frames):
+    variables = {}
+    def collect(prefix, children):
+        for variable in children:
+            path = prefix + (sys.intern(variable['name']),)
+            variables[path] = (sys.intern(variable['vtype']), variable['value'])
+            collect(path, variable['variables'])
+    for index, frame in enumerate(frames):
+        if frame.variables:
+            collect((index,), frame.variables)
+    return variables
+
+
+class History(object):
+    """Snapshots of a single thread, oldest first."""
+
+    def __init__(self):
+        self.snapshots = []
+        self._last = {}
+
+    def size(self):
+        return sum(snapshot.size for snapshot in self.snapshots)
+
+    def record(self, stack, variables):
+        changed = {path: entry for path, entry in variables.items()
+                   if self._last.get(path) != entry}
+        removed = tuple(path for path in self._last if path not in variables)
+        self._last = variables
+        snapshot = Snapshot(stack, changed, removed)
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def variables(self, index):
+        """Reconstruct all variables of snapshot ``index``."""
+        variables = {}
+        for snapshot in self.snapshots[:index + 1]:
+            for path in snapshot.removed:
+                variables.pop(path, None)
+            variables.update(snapshot.changed)
+        return variables
+
+    def drop_oldest(self):
+        """
+        Remove the oldest snapshot, folding its variables into its
+        successor. Returns the number of bytes freed.
+        """
+        oldest = self.snapshots.pop(0)
+        if not self.snapshots:
+            self._last = {}
+            return oldest.size
+
+        successor = self.snapshots[0]
+        variables = dict(oldest.changed)
+        for path in successor.removed:
+            variables.pop(path, None)
+        variables.update(successor.changed)
+        self.snapshots[0] = Snapshot(successor.stack, variables, ())
+        return oldest.size + successor.size - self.snapshots[0].size
+
+
+class HistoryStore(object):
+    def __init__(self):
+        self._histories = collections.OrderedDict()
+        self.size = 0
+
+    def history(self, thread):
+        """Return the history of ``thread`` and mark it as recently used."""
+        history = self._histories.get(thread)
+        if history is not None:
+            self._histories.move_to_end(thread)
+        return history
+
+    def record(self, thread, max_bytes):
+        if thread.stack is None:
+            return
+
+        if thread not in self._histories:
+            self._histories[thread] = History()
+        history = self.history(thread)
+        self.size += history.record(thread.stack, _collect(thread.frames)).size
+        self._evict(max_bytes)
+
+    def _evict(self, max_bytes):
+        while self.size > max_bytes and self._histories:
+            thread, history = next(iter(self._histories.items()))
+            self.size -= history.drop_oldest()
+            if not history.snapshots:
+                del self._histories[thread]
+
+    def remove(self, thread):
+        history = self._histories.pop(thread, None)
+        if history is not None:
+            self.size -= history.size()
+
+
+store = HistoryStore()
@@ -0,0 +1,87 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Bounded log of output written by the debuggee.
+"""
+
+import collections
+import itertools
+
+
+# Incomplete lines longer than this are emitted as lines of their own
+MAX_PARTIAL_LENGTH = 64 * 1024
+
+
+def _carriage_return(line):
+    """Return what is left of a complete line after carriage returns."""
+    if line.endswith('\r'):
+        line = line[:-1]
+    return line[line.rfind('\r') + 1:]
+
+
+class OutputLog(object):
+    """
+    Keeps the most recent ``max_lines`` lines of output. Writes are
+    split into lines per stream, incomplete lines are held back until
+    they are terminated, so many small writes end up as one line.
+
+    A carriage return starts the line over, as on a terminal, so
+    progress bars keep a single short line instead of growing one.
+    """
+
+    def __init__(self, max_lines):
+        self.lines = collections.deque(maxlen=max_lines)
+        self.count = 0
+        # ctx -> [chunks of the incomplete line, their total length]
+        self._partial = collections.OrderedDict()
+
+    def _append(self, ctx, lines):
+        self.lines.extend((ctx, line) for line in lines)
+        self.count += len(lines)
+
+    def write(self, ctx, text):
+        if ctx not in self._partial and text.endswith('\n') and '\r' not in text:
+            # Complete lines, the common case
+            self._append(ctx, text[:-1].split('\n'))
+            return
+
+        chunks, length = self._partial.pop(ctx, ([], 0))
+        lines = text.split('\n')
+        last = lines.pop()
+        if lines:
+            lines[0] = ''.join(chunks) + lines[0]
+            self._append(ctx, [_carriage_return(line) for line in lines])
+            chunks, length = [], 0
+
+        if last:
+            carriage_return = last.rfind('\r', 0, len(last) - 1)
+            if carriage_return >= 0 or (chunks and chunks[-1].endswith('\r')):
+                # The incomplete line is overwritten
+                chunks = [last[carriage_return + 1:]]
+                length = len(chunks[0])
+            else:
+                chunks.append(last)
+                length += len(last)
+
+            if length > MAX_PARTIAL_LENGTH:
+                self._append(ctx, [_carriage_return(''.join(chunks))])
+            else:
+                self._partial[ctx] = (chunks, length)
+        elif chunks:
+            self._partial[ctx] = (chunks, length)
+
+    def partial_lines(self):
+        return [(ctx, _carriage_return(''.join(chunks)))
+                for ctx, (chunks, _) in self._partial.items()]
+
+    def lines_since(self, count):
+        """
+        Return the lines appended after the log had seen ``count``
+        lines, or None if some of them have already been discarded.
+        """
+        new = self.count - count
+        if new > len(self.lines):
+            return None
+        return list(itertools.islice(self.lines, len(self.lines) - new, None))
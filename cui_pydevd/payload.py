@@ -7,16 +7,51 @@ This module turns mean xml payloads to nice Python Dicts for easier
 handling in application code.
 """
 
-from urllib.parse import unquote
+import re
+import sys
+import weakref
+
+from urllib.parse import unquote, unquote_to_bytes
 from xml.etree import ElementTree as et
 
 from . import constants
 
+def encode_command(command, sequence_no, argument=''):
+    return ('%s\t%s\t%s\n' % (command, sequence_no, argument)).encode('utf-8')
+
+def split_message(line):
+    """
+    Split a message into command, sequence number and raw payload.
+    If ``line`` is bytes, the payload is returned as bytes as well, it
+    is only decoded by the parsers that need text.
+    """
+    command, sequence_no, payload_raw = line.split(b'\t' if isinstance(line, bytes) else '\t', 2)
+    return int(command), int(sequence_no), payload_raw
+
+def text(payload):
+    return payload.decode('utf-8') if isinstance(payload, bytes) else payload
+
 def unescape(string):
     return unquote(unquote(string).replace('&lt;', '<') \
                                   .replace('&gt;', '>') \
                                   .replace('&quot;', '"'))
 
+# Mapped paths per file mapping, keyed by the path as sent by pydevd
+_mapped_paths = weakref.WeakKeyDictionary()
+
+def map_path(file_mapping, path):
+    """
+    Map a path received from pydevd to a local path. Results are
+    interned and cached per file mapping, so frames of the same file
+    share a single string.
+    """
+    paths = _mapped_paths.setdefault(file_mapping, {})
+    mapped = paths.get(path)
+    if mapped is None:
+        mapped = paths[path] = sys.intern(
+            file_mapping.to_this(unquote(unquote(path)).replace('\\', '/')))
+    return mapped
+
 def parse_object(file_mapping, payload):
     if payload.tag == 'xml':
         return [parse_object(file_mapping, child) for child in payload]
@@ -27,8 +62,8 @@ def parse_object(file_mapping, payload):
     elif payload.tag == 'frame':
         return {'type': 'frame',
                 'id':   payload.attrib['id'],
-                'file': file_mapping.to_this(unquote(unquote(payload.attrib['file'])).replace('\\', '/')),
-                'name': payload.attrib['name'],
+                'file': map_path(file_mapping, payload.attrib['file']),
+                'name': sys.intern(payload.attrib['name']),
                 'line': int(payload.attrib['line'])}
     elif payload.tag == 'var':
         return {'type':  'variable',
@@ -36,34 +71,81 @@ def parse_object(file_mapping, payload):
                 'vtype': payload.attrib['type'],
                 'value': unescape(payload.attrib['value']),
                 'isContainer': payload.attrib.get('isContainer', 'False') == 'True'}
+    elif payload.tag == 'io':
+        return {'type': 'output',
+                'text': unescape(payload.attrib['s']),
+                'ctx':  int(payload.attrib.get('ctx', constants.OUTPUT_STDOUT))}
 
 def parse_return(file_mapping, payload):
     return parse_object(file_mapping, et.fromstring(payload))
 
 def parse_version_response(file_mapping, payload):
-    return payload
+    return text(payload)
 
 def parse_thread_create(file_mapping, payload):
     return parse_object(file_mapping, et.fromstring(payload))
 
 def parse_thread_kill(file_mapping, payload):
-    return payload
+    return text(payload)
 
 def parse_thread_suspend(file_mapping, payload):
     return [{'type':   'thread_suspend',
              'id':     thread.attrib['id'],
+             'stop_reason': int(thread.attrib.get('stop_reason', 0)),
              'frames': [parse_object(file_mapping, frame)
                         for frame in thread.iter('frame')]}
             for thread in et.fromstring(payload).iter('thread')]
 
 def parse_thread_resume(file_mapping, payload):
-    the_id, reason = payload.split('\t', 1)
+    the_id, reason = text(payload).split('\t', 1)
     return {'type':   'thread_resume',
             'id':     the_id,
             'reason': reason}
 
+# Console output as sent by pydevd, a single io element without
+# character references. Anything else goes through ElementTree.
+_console_output = re.compile(br'<xml><io s="([^"&]*)" ctx="(\d+)"\s*/></xml>\Z')
+
+def parse_write_to_console(file_mapping, payload):
+    match = _console_output.match(payload) if isinstance(payload, bytes) else None
+    if match:
+        text = unquote_to_bytes(match.group(1)).decode('utf-8', 'replace')
+        if '%' in text or '&' in text:
+            text = unquote(text.replace('&lt;', '<') \
+                               .replace('&gt;', '>') \
+                               .replace('&quot;', '"'))
+        return [{'type': 'output',
+                 'text': text,
+                 'ctx':  int(match.group(2))}]
+    return parse_object(file_mapping, et.fromstring(payload))
+
+def parse_array(file_mapping, payload):
+    array = {'type': 'array', 'rows': 0, 'cols': 0, 'dtype': None, 'data': []}
+    for element in et.fromstring(payload).iter():
+        if element.tag == 'array':
+            array['rows'] = int(element.attrib.get('rows', 0))
+            array['cols'] = int(element.attrib.get('cols', 0))
+            array['dtype'] = element.attrib.get('type')
+        elif element.tag == 'row':
+            array['data'].append([])
+        elif element.tag == 'var' and array['data']:
+            array['data'][-1].append(unescape(element.attrib['value']))
+    return array
+
+def parse_completions(file_mapping, payload):
+    return [{'type': 'completion',
+             'name': unescape(comp.attrib['p0']),
+             'kind': comp.attrib.get('p3', '')}
+            for comp in et.fromstring(payload).iter('comp')]
+
+def parse_load_source(file_mapping, payload):
+    return unquote(text(payload))
+
 def parse_error(file_mapping, payload):
-    return unescape(payload)
+    return unescape(text(payload))
+
+def parse_identity(file_mapping, payload):
+    return unquote(text(payload))
 
 payload_factory_map = {
     constants.CMD_THREAD_CREATE: parse_thread_create,
@@ -75,7 +157,12 @@ payload_factory_map = {
     constants.CMD_GET_VAR: parse_return,
     constants.CMD_RETURN: parse_return,
     constants.CMD_EVAL_EXPR: parse_return,
+    constants.CMD_WRITE_TO_CONSOLE: parse_write_to_console,
+    constants.CMD_GET_COMPLETIONS: parse_completions,
+    constants.CMD_GET_ARRAY: parse_array,
+    constants.CMD_LOAD_SOURCE: parse_load_source,
     constants.CMD_ERROR: parse_error,
+    constants.CMD_CUI_IDENTITY: parse_identity,
 }
 
 def create_payload(file_mapping, command_id, payload):
@@ -0,0 +1,148 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Book-keeping for requests sent to pydevd that expect a response.
+
+Every request carries a deadline. Requests are cancelled when their
+thread resumes or is killed, when pydevd answers with CMD_ERROR, or
+when their deadline passes and no retries are left. Idempotent
+requests (fetching frames and variables) are resent on timeout.
+"""
+
+import collections
+import time
+
+from . import constants
+
+_command_names = {value: name[4:]
+                  for name, value in vars(constants).items()
+                  if name.startswith('CMD_')}
+
+def command_name(command):
+    return _command_names.get(command, str(command))
+
+
+class Request(object):
+    def __init__(self, command, argument, thread, on_response, on_cancel, retries,
+                 on_fail=None):
+        self.command = command
+        self.argument = argument
+        self.thread = thread
+        self.on_response = on_response
+        self.on_cancel = on_cancel
+        self.on_fail = on_fail
+        self.retries = retries
+        self.deadline = None
+
+
+class RequestTracker(object):
+    def __init__(self, session, timeout, retries):
+        self._session = session
+        self._requests = {}
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = collections.Counter()
+
+    def _send(self, request):
+        sequence_no = self._session.send_command(request.command, request.argument)
+        request.deadline = time.monotonic() + self.timeout
+        self._requests[sequence_no] = request
+        return sequence_no
+
+    def send(self, command, argument, thread, on_response,
+             on_cancel=None, idempotent=False, on_fail=None):
+        """
+        Send a command and register ``on_response`` to be called with
+        the payload of its response. ``on_cancel`` is called if the
+        request is dropped without a response, ``on_fail`` instead of
+        it, if given, when pydevd answers with CMD_ERROR.
+        """
+        self.stats['sent'] += 1
+        return self._send(Request(command, argument, thread,
+                                  on_response, on_cancel,
+                                  self.retries if idempotent else 0,
+                                  on_fail))
+
+    def send_batch(self, commands, thread, idempotent=False):
+        """
+        Send a list of (command, argument, on_response) triples, or
+        quadruples with an additional ``on_cancel``, with a single
+        write.
+        """
+        requests = [Request(command, argument, thread, on_response,
+                            on_cancel[0] if on_cancel else None,
+                            self.retries if idempotent else 0)
+                    for command, argument, on_response, *on_cancel in commands]
+        sequence_nos = self._session.send_commands([(request.command, request.argument)
+                                                    for request in requests])
+        deadline = time.monotonic() + self.timeout
+        for sequence_no, request in zip(sequence_nos, requests):
+            request.deadline = deadline
+            self._requests[sequence_no] = request
+        self.stats['sent'] += len(requests)
+        return sequence_nos
+
+    def complete(self, response):
+        """
+        Pass the payload of ``response`` to the request waiting for
+        it. The payload is not accessed, and therefore not parsed, if
+        there is no such request.
+        """
+        request = self._requests.pop(response.sequence_no, None)
+        if request is None:
+            self.stats['dropped'] += 1
+            return False
+
+        self.stats['completed'] += 1
+        request.on_response(response.payload)
+        return True
+
+    def _cancel(self, sequence_no, reason):
+        request = self._requests.pop(sequence_no)
+        self.stats[reason] += 1
+        if request.on_cancel:
+            request.on_cancel()
+
+    def fail(self, sequence_no):
+        request = self._requests.get(sequence_no)
+        if request is None:
+            return
+        if request.on_fail:
+            del self._requests[sequence_no]
+            self.stats['failed'] += 1
+            request.on_fail()
+        else:
+            self._cancel(sequence_no, 'failed')
+
+    def cancel_thread(self, thread):
+        for sequence_no in [sequence_no
+                            for sequence_no, request in self._requests.items()
+                            if request.thread is thread]:
+            self._cancel(sequence_no, 'cancelled')
+
+    def cancel_all(self):
+        for sequence_no in list(self._requests.keys()):
+            self._cancel(sequence_no, 'cancelled')
+
+    def expire(self):
+        now = time.monotonic()
+        for sequence_no in [sequence_no
+                            for sequence_no, request in self._requests.items()
+                            if request.deadline < now]:
+            request = self._requests[sequence_no]
+            if request.retries > 0:
+                del self._requests[sequence_no]
+                request.retries -= 1
+                self.stats['retried'] += 1
+                self._send(request)
+            else:
+                self._cancel(sequence_no, 'timed_out')
+
+    def outstanding(self):
+        return len(self._requests)
+
+    def outstanding_by_command(self):
+        return collections.Counter(command_name(request.command)
+                                   for request in self._requests.values())
@@ -0,0 +1,139 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Sampling profiler built on the pydevd connection.
+
+While sampling, all threads of a session are periodically suspended
+with CMD_THREAD_SUSPEND, their stacks are recorded and each thread is
+resumed as soon as its suspend notification arrives. Only suspends of
+threads that were running when a sampling round was requested are
+consumed, suspends caused by breakpoints or requested by the user
+reach the debugger as usual.
+"""
+
+import collections
+import os
+import time
+
+from . import constants
+
+
+def frame_label(frame):
+    return '%s (%s)' % (frame[1], os.path.basename(frame[0]))
+
+
+class Sampler(object):
+    def __init__(self, session):
+        self.session = session
+        self.active = False
+        self.interval = None
+        self._reset()
+
+    def _reset(self):
+        # Collapsed stacks, root first, of function labels
+        self.stacks = collections.Counter()
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self.samples = 0
+        self.paused = 0.0
+        self.started = None
+        self._paused_until = 0.0
+        self._next_sample = 0.0
+        # Request time of the outstanding sampling round by thread id
+        self._pending = {}
+        self._resumed = set()
+
+    def start(self, interval):
+        self._reset()
+        self.active = True
+        self.interval = interval
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.active = False
+
+    def elapsed(self):
+        return 0.0 if self.started is None else time.monotonic() - self.started
+
+    def tick(self):
+        if not self.active:
+            return
+
+        now = time.monotonic()
+        if now >= self._next_sample:
+            self._next_sample = now + self.interval
+            # Threads already suspended do not report another suspend
+            self._pending = {thread.id: now
+                             for thread in self.session.threads.values()
+                             if thread.state != constants.THREAD_STATE_SUSPENDED}
+            if self._pending:
+                self.session.send_command(constants.CMD_THREAD_SUSPEND, '*')
+
+    def _record(self, frames):
+        labels = tuple(frame_label(frame) for frame in reversed(frames))
+        if not labels:
+            return
+        self.samples += 1
+        self.stacks[labels] += 1
+        self.self_counts[labels[-1]] += 1
+        for label in set(labels):
+            self.total_counts[label] += 1
+
+    def filter_suspends(self, items):
+        """
+        Consume suspend notifications of the outstanding sampling round
+        and return the remaining ones. Consumed threads are resumed with
+        a single write.
+        """
+        if not self._pending:
+            return items
+
+        now = time.monotonic()
+        remaining = []
+        resumed = []
+        for item in items:
+            requested = self._pending.get(item['id'])
+            if item['stop_reason'] == constants.CMD_THREAD_SUSPEND and \
+               requested is not None and now - requested <= self.interval + 1.0:
+                del self._pending[item['id']]
+                resumed.append((item['id'], requested))
+                self._record([(frame['file'], frame['name']) for frame in item['frames']])
+            else:
+                remaining.append(item)
+        if not resumed:
+            return items
+
+        self.session.send_commands([(constants.CMD_THREAD_RESUME, thread_id)
+                                    for thread_id, _ in resumed])
+        self._resumed.update(thread_id for thread_id, _ in resumed)
+
+        # Threads are paused at the same time, so paused time is the
+        # union of the intervals from the request to each resume.
+        start = max(min(requested for _, requested in resumed), self._paused_until)
+        if now > start:
+            self.paused += now - start
+            self._paused_until = now
+        return remaining
+
+    def filter_resume(self, item):
+        """
+        Consume the resume notification of a thread resumed by the
+        sampler. Returns True if it was consumed.
+        """
+        if item['id'] in self._resumed:
+            self._resumed.remove(item['id'])
+            return True
+        return False
+
+    def hot_functions(self):
+        """Return (label, self count, total count) sorted by self count."""
+        return [(label, count, self.total_counts[label])
+                for label, count in self.self_counts.most_common()]
+
+    def write_folded(self, path):
+        """Write collapsed stacks in folded-stack format."""
+        with open(path, 'w') as f:
+            for labels, count in self.stacks.most_common():
+                f.write('%s %s\n' % (';'.join(labels), count))
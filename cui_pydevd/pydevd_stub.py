@@ -1,23 +1,213 @@
-import pydevd
-import runpy
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Launch a Python program under pydevd and connect it to cui_pydevd.
+
+    python pydevd_stub.py debug_host debug_port script [ args ... ]
+    python pydevd_stub.py debug_host debug_port -m module [ args ... ]
+
+Subprocesses and multiprocessing workers started by the program are
+attached to the same server, so each of them gets its own session.
+Each process announces its identity, the program, its arguments and
+its position among the children of its parent, with a command of its
+own, so a restarted process gets the state of its previous session.
+
+With CUI_PYDEVD_PROTOCOL=dap in the environment, pydevd speaks DAP, for
+a server with pydevds/protocol set to 'dap'.
+
+Only the standard library is imported before pydevd is needed, keep it
+that way to keep the startup overhead of the launcher low.
+"""
+
+import json
+import os
 import sys
 
-def main():
-    debug_host = sys.argv.pop(1)
-    debug_port = int(sys.argv.pop(1))
-    bin_module = sys.argv.pop(1)
+# Keep in sync with constants.CMD_CUI_IDENTITY
+CMD_CUI_IDENTITY = 5001
+# Keep in sync with constants.DAP_IDENTITY_EVENT
+DAP_IDENTITY_EVENT = 'cuiIdentity'
+# Identity of the current process, inherited by spawned children
+IDENTITY_ENV = 'CUI_PYDEVD_IDENTITY'
+# 'dap' to make pydevd speak DAP, inherited by spawned children
+PROTOCOL_ENV = 'CUI_PYDEVD_PROTOCOL'
+USAGE = 'Usage: %s debug_host debug_port (script | -m module) [ args ... ]'
+
+
+def parse_args(argv):
+    """
+    Return (debug_host, debug_port, target, is_module, args) or None
+    if argv is malformed.
+    """
+    if len(argv) < 4:
+        return None
+
+    debug_host = argv[1]
+    try:
+        debug_port = int(argv[2])
+    except ValueError:
+        return None
+
+    if argv[3] == '-m':
+        if len(argv) < 5:
+            return None
+        return debug_host, debug_port, argv[4], True, argv[5:]
+
+    return debug_host, debug_port, argv[3], False, argv[4:]
+
+
+def program_identity(target, is_module, target_args):
+    return {'program': target if is_module else os.path.abspath(target),
+            'module': is_module,
+            'argv': target_args,
+            'children': []}
+
+
+def child_identity(index):
+    """Return the identity of the ``index``th child of this process."""
+    identity = json.loads(os.environ[IDENTITY_ENV])
+    identity['children'].append(index)
+    return identity
+
+
+def announce_identity(identity):
+    """
+    Send ``identity`` to the server on the connection of pydevd, and
+    store it for children of this process. Does nothing if the pydevd
+    in use does not provide the expected internals.
+    """
+    os.environ[IDENTITY_ENV] = json.dumps(identity)
+    try:
+        import pydevd
+        try:
+            from _pydevd_bundle.pydevd_net_command import NetCommand
+        except ImportError:
+            from _pydevd_bundle.pydevd_comm import NetCommand
+    except ImportError:
+        return
 
+    get_debugger = getattr(pydevd, 'get_global_debugger', None) or \
+                   getattr(pydevd, 'GetGlobalDebugger', None)
+    writer = getattr(get_debugger() if get_debugger else None, 'writer', None)
+    if writer is None:
+        return
+    if os.environ.get(PROTOCOL_ENV) == 'dap':
+        writer.add_command(NetCommand(CMD_CUI_IDENTITY, 0,
+                                      {'type': 'event',
+                                       'event': DAP_IDENTITY_EVENT,
+                                       'body': {'identity': os.environ[IDENTITY_ENV]}},
+                                      is_json=True))
+    else:
+        writer.add_command(NetCommand(CMD_CUI_IDENTITY, 0, os.environ[IDENTITY_ENV]))
+
+
+def announce_child(index):
+    """Announce the ``index``th child of the parent process."""
+    announce_identity(child_identity(index))
+    announce_children()
+
+
+class _SpawnPatcher(object):
+    """
+    Patch multiprocessing.spawn once it is imported, importing it here
+    would slow down the start of programs that do not use it.
+    """
+
+    def __init__(self, patch):
+        self.patch = patch
+
+    def find_spec(self, name, path=None, target=None):
+        if name != 'multiprocessing.spawn':
+            return None
+        sys.meta_path.remove(self)
+        from importlib.machinery import PathFinder
+        spec = PathFinder.find_spec(name, path)
+        exec_module = spec.loader.exec_module
+        def _exec_module(module):
+            exec_module(module)
+            self.patch(module)
+        spec.loader.exec_module = _exec_module
+        return spec
+
+
+def announce_children():
+    """
+    Make children of this process announce their identity. Forked
+    children announce after pydevd reconnected them, spawned
+    multiprocessing children before running their target.
+    """
+    children = [0]
+
+    def next_child():
+        children[0] += 1
+        return children[0]
+
+    if hasattr(os, 'fork'):
+        # pydevd has already wrapped os.fork to reconnect the child
+        fork = os.fork
+        def _fork():
+            index = next_child()
+            pid = fork()
+            if pid == 0:
+                children[0] = 0
+                announce_identity(child_identity(index))
+            return pid
+        os.fork = _fork
+
+    def patch_spawn(spawn):
+        get_command_line = spawn.get_command_line
+        def _get_command_line(**kwds):
+            command_line = get_command_line(**kwds)
+            if '-c' in command_line:
+                code = command_line.index('-c') + 1
+                command_line[code] = ('import sys; sys.path.insert(0, %r); import pydevd_stub; '
+                                      'pydevd_stub.announce_child(%s); %s'
+                                      % (os.path.dirname(os.path.abspath(__file__)),
+                                         next_child(), command_line[code]))
+            return command_line
+        spawn.get_command_line = _get_command_line
+
+    if 'multiprocessing.spawn' in sys.modules:
+        patch_spawn(sys.modules['multiprocessing.spawn'])
+    else:
+        sys.meta_path.insert(0, _SpawnPatcher(patch_spawn))
+
+
+def main(argv=None):
+    args = parse_args(sys.argv if argv is None else argv)
+    if args is None:
+        print(USAGE % sys.argv[0], file=sys.stderr)
+        return 2
+
+    debug_host, debug_port, target, is_module, target_args = args
+
+    import pydevd
+    if os.environ.get(PROTOCOL_ENV) == 'dap':
+        # DAP messages framed by Content-Length, as --json-dap-http
+        pydevd.config('http_json', '')
     pydevd.settrace(debug_host,
                     port=debug_port,
                     stdoutToServer=True,
                     stderrToServer=True,
-                    suspend=False)
+                    suspend=False,
+                    patch_multiprocessing=True)
+    announce_identity(program_identity(target, is_module, target_args))
+    announce_children()
 
-    runpy.run_path(bin_module, run_name='__main__')
+    # Replace the launcher directory with what the interpreter would
+    # have put there for the target.
+    import runpy
+    sys.argv = [target] + target_args
+    if is_module:
+        sys.path[0] = os.getcwd()
+        runpy.run_module(target, run_name='__main__', alter_sys=True)
+    else:
+        sys.path[0] = os.path.dirname(os.path.abspath(target))
+        runpy.run_path(target, run_name='__main__')
+    return 0
 
 
 if __name__ == '__main__':
-    if sys.argv < 4:
-        print "Usage: prog debug_host debug_port module [ args ... ]"
-
-    main()
+    sys.exit(main())
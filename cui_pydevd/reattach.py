@@ -0,0 +1,66 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+State of closed sessions, kept for debuggees that reconnect.
+
+The launcher announces the identity of the debuggee, its program and
+arguments, with CMD_CUI_IDENTITY. A session that announces a known
+identity takes over the buffers and window sets, active breakpoints,
+expanded variables, watches and eval history of the last closed session
+with the same identity.
+"""
+
+import collections
+
+# Number of identities for which state is kept
+_MAX_STATES = 32
+
+
+class SessionState(object):
+    def __init__(self, session, threads, breakpoints, expanded, watches, eval_history):
+        # The closed session and its threads by name, whose buffers are kept
+        self.session = session
+        self.threads = threads
+        # (path, line) of breakpoints active in the session
+        self.breakpoints = breakpoints
+        # (file, function) -> set of expanded variable paths
+        self.expanded = expanded
+        self.watches = watches
+        self.eval_history = eval_history
+
+
+class StateStore(object):
+    def __init__(self, max_states):
+        self._states = collections.OrderedDict()
+        self.max_states = max_states
+
+    def store(self, identity, state):
+        """
+        Store ``state`` for ``identity``. Returns the states dropped to
+        stay within ``max_states``.
+        """
+        evicted = []
+        replaced = self._states.pop(identity, None)
+        if replaced is not None:
+            evicted.append(replaced)
+        self._states[identity] = state
+        while len(self._states) > self.max_states:
+            evicted.append(self._states.popitem(last=False)[1])
+        return evicted
+
+    def take(self, identity):
+        """Remove and return the state stored for ``identity`` or None."""
+        return self._states.pop(identity, None)
+
+    def unique_key(self, key):
+        """Return ``key``, made distinct from the keys of stored sessions."""
+        keys = set(state.session.key for state in self._states.values())
+        unique, suffix = key, 2
+        while unique in keys:
+            unique, suffix = '%s#%s' % (key, suffix), suffix + 1
+        return unique
+
+
+store = StateStore(_MAX_STATES)
@@ -0,0 +1,98 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+Breadth-first search through the variables of a frame.
+
+Containers are expanded with CMD_GET_VAR, with at most ``window``
+requests in flight. The crawl stops at ``max_depth`` and after
+``max_nodes`` visited variables. Objects whose value contains an
+address are expanded only once, which breaks reference cycles.
+Containers that fail to expand or time out are skipped.
+"""
+
+import collections
+import functools
+import re
+
+from . import constants
+
+_address = re.compile(r' at (0x[0-9a-fA-F]+)')
+
+
+class VariableSearch(object):
+    def __init__(self, frame, pattern, max_depth, max_nodes, window):
+        self.frame = frame
+        self.pattern = pattern.lower()
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.window = window
+        self.matches = []
+        self.visited = 0
+        self.skipped = 0
+        self.active = True
+        self._queue = collections.deque()
+        self._seen = set()
+        self._in_flight = 0
+
+    def start(self):
+        for variable in self.frame.variables or []:
+            self._visit((variable['name'],), variable, 1)
+        self._pump()
+
+    def _matches(self, variable):
+        return any(self.pattern in field.lower()
+                   for field in (variable['name'], variable['vtype'], variable['value']))
+
+    def _visit(self, path, variable, depth):
+        self.visited += 1
+        if self._matches(variable):
+            self.matches.append((path, variable['vtype'], variable['value']))
+
+        if not variable['isContainer'] or depth >= self.max_depth:
+            return
+
+        address = _address.search(variable['value'])
+        if address:
+            if address.group(1) in self._seen:
+                return
+            self._seen.add(address.group(1))
+        self._queue.append((path, depth))
+
+    def _pump(self):
+        thread = self.frame.thread
+        while self.active and self._queue and \
+              self._in_flight < self.window and self.visited < self.max_nodes:
+            path, depth = self._queue.popleft()
+            self._in_flight += 1
+            thread.session.requests.send(constants.CMD_GET_VAR,
+                                         self.frame.get_var_argument(path),
+                                         thread,
+                                         functools.partial(self._on_children, path, depth),
+                                         self._on_failed,
+                                         idempotent=True)
+
+        if self._in_flight == 0 and (not self._queue or self.visited >= self.max_nodes):
+            self.active = False
+
+    def _on_children(self, path, depth, variables):
+        self._in_flight -= 1
+        if not self.active:
+            return
+        for variable in variables:
+            if self.visited >= self.max_nodes:
+                break
+            self._visit(path + (variable['name'],), variable, depth + 1)
+        self._pump()
+
+    def _on_failed(self):
+        self._in_flight -= 1
+        if not self.active:
+            return
+        self.skipped += 1
+        self._pump()
+
+    def cancel(self):
+        self.active = False
+        self._queue.clear()
@@ -0,0 +1,77 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""
+On-disk cache for source files retrieved from the debuggee.
+
+Sources are stored content-addressed, as ``<sha1 of content>.py``, an
+index maps remote paths to content hashes. The cache is shared by all
+sessions and persists across restarts. Cached sources are trusted,
+unless pydevds/revalidate-sources is set, in which case they are
+displayed immediately and compared with the debuggee's once per
+session.
+"""
+
+import json
+import os
+
+import cui
+
+INDEX = 'index.json'
+
+
+class SourceCache(object):
+    def __init__(self, directory):
+        self.directory = directory
+        self.loading = set()
+        self._index = None
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX)
+
+    def _read_index(self):
+        if self._index is None:
+            try:
+                with open(self._index_path(), 'r') as f:
+                    self._index = json.load(f)
+            except (IOError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _content_path(self, content_hash):
+        return os.path.join(self.directory, '%s.py' % content_hash)
+
+    def lookup(self, remote_path):
+        """Return the path of the cached source of ``remote_path`` or None."""
+        content_hash = self._read_index().get(remote_path)
+        if content_hash is None:
+            return None
+        path = self._content_path(content_hash)
+        return path if os.path.exists(path) else None
+
+    def store(self, remote_path, source):
+        # hashlib is only needed once a source is fetched
+        import hashlib
+        content = source.encode('utf-8')
+        content_hash = hashlib.sha1(content).hexdigest()
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._content_path(content_hash)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+
+        index = self._read_index()
+        index[remote_path] = content_hash
+        with open(self._index_path(), 'w') as f:
+            json.dump(index, f)
+        return path
+
+
+_cache = None
+
+def cache():
+    global _cache
+    if _cache is None:
+        _cache = SourceCache(cui.user_directory('pydevd_sources'))
+    return _cache
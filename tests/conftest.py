@@ -0,0 +1,160 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+import json
+
+from urllib.parse import quote
+
+import pytest
+
+
+class Socket(object):
+    """The connection of a session, recording what is sent."""
+
+    def __init__(self, address):
+        self.address = address
+        self.written = []
+        self.inbound = bytearray()
+
+    def getpeername(self):
+        return self.address
+
+    def sendall(self, data):
+        self.written.append(data)
+
+    def recv(self, size):
+        data = bytes(self.inbound[:size])
+        del self.inbound[:size]
+        return data
+
+    def close(self):
+        pass
+
+
+class Debuggee(object):
+    """
+    Connects real sessions and plays the pydevd side of them. Global
+    state sessions register with is reset for every test.
+    """
+
+    def __init__(self, monkeypatch):
+        import cui
+        import cui_pydevd
+        from cui_pydevd import constants
+        from cui_pydevd import reattach
+
+        monkeypatch.setattr(cui_pydevd, '_session_groups', collections.OrderedDict())
+        monkeypatch.setattr(reattach, 'store', reattach.StateStore(reattach._MAX_STATES))
+        self._headless = cui.get_variable(constants.ST_HEADLESS)
+        cui.set_variable(constants.ST_HEADLESS, True)
+        self.breakpoints = cui_pydevd._Breakpoints()
+        self.breakpoints._loaded = True
+        cui.set_variable(constants.ST_BREAKPOINTS, self.breakpoints)
+        self._sockets = {}
+        self._sequence_no = 0
+
+    def restore(self):
+        import cui
+        from cui_pydevd import constants
+        cui.set_variable(constants.ST_HEADLESS, self._headless)
+
+    def connect(self, address=('127.0.0.1', 5678)):
+        import cui_pydevd
+        socket = Socket(address)
+        session = cui_pydevd.Session(socket)
+        self._sockets[session] = socket
+        return session
+
+    def received(self, session):
+        """
+        Return the (command, sequence_no, argument) tuples ``session``
+        sent since the last call.
+        """
+        socket = self._sockets[session]
+        lines = [line for data in socket.written for line in data.decode('utf-8').splitlines()]
+        del socket.written[:]
+        return [(int(command), int(sequence_no), argument)
+                for command, sequence_no, argument in (line.split('\t', 2) for line in lines)]
+
+    def send(self, session, command, payload, sequence_no=None):
+        """
+        Send ``payload`` to ``session``, as response to ``sequence_no``
+        or as an event.
+        """
+        from cui_pydevd import payload as payload_
+        if sequence_no is None:
+            self._sequence_no += 2
+            sequence_no = self._sequence_no
+        session.handle_line(payload_.encode_command(command, sequence_no, payload)[:-1])
+
+    def create_thread(self, session, the_id, name):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_THREAD_CREATE,
+                  '<xml><thread name="%s" id="%s" /></xml>' % (name, the_id))
+        return session.threads[the_id]
+
+    def announce(self, session, identity):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_CUI_IDENTITY, quote(identity))
+
+    def suspend(self, session, thread, stop_reason, path, line):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_THREAD_SUSPEND,
+                  '<xml><thread id="%s" stop_reason="%s">'
+                  '<frame id="1" name="f" file="%s" line="%s" /></thread></xml>'
+                  % (thread.id, stop_reason, quote(path), line))
+
+    def resume(self, session, thread):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_THREAD_RESUME,
+                  '%s\t%s' % (thread.id, constants.CMD_THREAD_RESUME))
+
+    def load_source(self, session, sequence_no, source):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_LOAD_SOURCE, quote(source), sequence_no)
+
+    def fail(self, session, sequence_no, message):
+        from cui_pydevd import constants
+        self.send(session, constants.CMD_ERROR, quote(message), sequence_no)
+
+    # Sessions speaking DAP
+
+    def requests(self, session):
+        """Return the DAP requests ``session`` sent since the last call."""
+        from cui_pydevd import framing
+        socket = self._sockets[session]
+        bodies = framing.ContentLengthFramer().feed(b''.join(socket.written))
+        del socket.written[:]
+        return [json.loads(body.decode('utf-8')) for body in bodies]
+
+    def deliver(self, session, *messages):
+        """Send DAP ``messages`` to ``session`` with a single write."""
+        from cui_pydevd import dap
+        socket = self._sockets[session]
+        for message in messages:
+            self._sequence_no += 2
+            socket.inbound += dap.encode_message(dict(message, seq=self._sequence_no))
+        session.handle()
+
+    @staticmethod
+    def response(request, body=None, success=True, message=None):
+        response = {'type': 'response', 'request_seq': request['seq'],
+                    'command': request['command'], 'success': success}
+        if body is not None:
+            response['body'] = body
+        if message is not None:
+            response['message'] = message
+        return response
+
+    @staticmethod
+    def event(event, **body):
+        return {'type': 'event', 'event': event, 'body': body}
+
+
+@pytest.fixture
+def debuggee(monkeypatch):
+    debuggee = Debuggee(monkeypatch)
+    yield debuggee
+    debuggee.restore()
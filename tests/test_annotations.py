@@ -0,0 +1,58 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+cui = pytest.importorskip('cui')
+
+import cui_pydevd
+
+PATH = '/src/a.py'
+
+
+@pytest.fixture
+def breakpoints(monkeypatch):
+    monkeypatch.setattr(cui_pydevd, 'pydevd_sessions', lambda: [])
+    breakpoints = cui_pydevd._Breakpoints()
+    breakpoints._loaded = True
+    for line in (3, 10, 40):
+        breakpoints.add_breakpoint(PATH, line)
+    return breakpoints
+
+
+def test_annotations_are_memoized_per_viewport(breakpoints):
+    annotations = breakpoints.get_annotations(PATH, 0, 20)
+    assert annotations == [3, 10]
+    assert breakpoints.get_annotations(PATH, 0, 20) is annotations
+    assert breakpoints.get_annotations(PATH, 5, 40) == [10, 40]
+    assert breakpoints.get_annotations('/src/b.py', 0, 20) == []
+
+
+def test_adding_a_breakpoint_invalidates(breakpoints):
+    breakpoints.get_annotations(PATH, 0, 20)
+    breakpoints.add_breakpoint(PATH, 5)
+    annotations = breakpoints.get_annotations(PATH, 0, 20)
+    assert annotations == [3, 5, 10]
+    # Adding an existing breakpoint changes nothing
+    breakpoints.add_breakpoint(PATH, 5)
+    assert breakpoints.get_annotations(PATH, 0, 20) is annotations
+
+
+def test_removing_a_breakpoint_invalidates(breakpoints):
+    breakpoints.get_annotations(PATH, 0, 20)
+    breakpoints.remove_breakpoint(PATH, 10)
+    assert breakpoints.get_annotations(PATH, 0, 20) == [3]
+
+
+def test_changing_properties_invalidates(breakpoints):
+    annotations = breakpoints.get_annotations(PATH, 0, 20)
+    breakpoints.set_properties(PATH, 3, condition='x > 1')
+    assert breakpoints.get_annotations(PATH, 0, 20) is not annotations
+
+
+def test_other_paths_stay_memoized(breakpoints):
+    breakpoints.add_breakpoint('/src/b.py', 1)
+    annotations = breakpoints.get_annotations(PATH, 0, 20)
+    breakpoints.remove_breakpoint('/src/b.py', 1)
+    assert breakpoints.get_annotations(PATH, 0, 20) is annotations
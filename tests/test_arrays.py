@@ -0,0 +1,47 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import arrays
+from cui_pydevd import constants
+
+Frame = collections.namedtuple('Frame', 'thread id')
+Thread = collections.namedtuple('Thread', 'session id')
+Session = collections.namedtuple('Session', 'requests')
+
+
+class Requests(object):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, command, argument, thread, on_response, on_cancel=None, idempotent=False):
+        self.sent.append((command, argument))
+
+
+def inspector(path):
+    frame = Frame(Thread(Session(Requests()), 't1'), '7')
+    return arrays.ArrayInspector(frame, path, 'ndarray', 20, 8)
+
+
+def test_nested_array_is_sent_as_expression():
+    i = inspector(['self', 'data'])
+    i.fetch_page()
+    (command, argument), = i.frame.thread.session.requests.sent
+    assert command == constants.CMD_GET_ARRAY
+    assert argument == '0\t0\t20\t8\t%\tt1\t7\tFRAME\tself.data'
+
+
+def test_paths_without_expression_are_not_fetched():
+    i = inspector(['d', "'key'"])
+    i.fetch_summary()
+    i.fetch_page()
+    assert i.frame.thread.session.requests.sent == []
+    assert not i.pending
+    assert i.summary == ["Summary and contents not available for d/'key', "
+                         "it cannot be expressed as attribute access"]
@@ -0,0 +1,24 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+import cui_pydevd
+from cui_pydevd import constants
+from cui_pydevd import payload
+
+
+def test_from_string_parses_payload_lazily():
+    line = payload.encode_command(constants.CMD_THREAD_KILL, 4, 'pid_1_id_2')[:-1]
+    command = cui_pydevd.Command.from_string(None, line)
+    assert (command.command, command.sequence_no) == (constants.CMD_THREAD_KILL, 4)
+    assert command.payload_raw == b'pid_1_id_2'
+    assert command.payload == 'pid_1_id_2'
+
+
+def test_unknown_command_has_no_payload():
+    command = cui_pydevd.Command.from_string(None, b'999\t1\tsomething')
+    assert command.payload is None
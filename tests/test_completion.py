@@ -0,0 +1,20 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import completion
+
+
+def test_split_token():
+    assert completion.split_token('x = obj.attr.na') == ('obj.attr.', 'na')
+    assert completion.split_token('print(val') == ('', 'val')
+
+
+def test_insertion_completes_to_common_prefix():
+    assert completion.insertion('obj.na', ['name', 'namespace']) == 'me'
+    assert completion.insertion('obj.', ['alpha']) == 'alpha'
+    assert completion.insertion('obj.x', ['xa', 'xb']) == ''
@@ -0,0 +1,198 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+cui = pytest.importorskip('cui')
+
+import cui_pydevd
+from cui_pydevd import constants
+
+PATH = '/src/a.py'
+
+
+@pytest.fixture
+def dap(debuggee):
+    cui.set_variable(constants.ST_PROTOCOL, 'dap')
+    yield debuggee
+    cui.set_variable(constants.ST_PROTOCOL, 'line')
+
+
+@pytest.fixture
+def session(dap):
+    session = dap.connect()
+    initialize, attach, threads, _ = dap.requests(session)
+    dap.deliver(session,
+                dap.response(initialize, {}),
+                dap.response(attach),
+                dap.response(threads, {'threads': [{'id': 1, 'name': 'MainThread'}]}))
+    return session
+
+
+def stop(dap, session, *thread_ids):
+    dap.deliver(session, *[dap.event('stopped', reason='breakpoint', threadId=thread_id)
+                           for thread_id in thread_ids])
+    traces = dap.requests(session)
+    dap.deliver(session, *[
+        dap.response(trace, {'stackFrames': [{'id': 10 * trace['arguments']['threadId'],
+                                              'name': 'f',
+                                              'source': {'path': PATH},
+                                              'line': 3}]})
+        for trace in traces])
+
+
+def test_handshake(dap):
+    session = dap.connect()
+    initialize, attach, threads, done = dap.requests(session)
+    assert [initialize['command'], attach['command'], threads['command'], done['command']] \
+        == ['initialize', 'attach', 'threads', 'configurationDone']
+    assert attach['arguments']['justMyCode'] is False
+
+    dap.deliver(session,
+                dap.response(initialize, {}),
+                dap.response(attach),
+                dap.response(threads, {'threads': [{'id': 1, 'name': 'MainThread'}]}),
+                dap.response(done))
+    assert cui.messages[-1] == 'pydevd version (%s): DAP' % session
+    assert session.threads['1'].name == 'MainThread'
+
+
+def test_identity_event_attaches(dap, session):
+    dap.deliver(session, dap.event(constants.DAP_IDENTITY_EVENT, identity='worker-1'))
+    assert session.identity == 'worker-1'
+
+
+def test_stopped_threads_are_suspended_together(dap, session):
+    dap.deliver(session, dap.event('thread', reason='started', threadId=2))
+    threads, = dap.requests(session)
+    dap.deliver(session, dap.response(threads, {'threads': [{'id': 1, 'name': 'MainThread'},
+                                                           {'id': 2, 'name': 'Worker'}]}))
+
+    dap.deliver(session, dap.event('stopped', reason='breakpoint', threadId=1),
+                dap.event('stopped', reason='breakpoint', threadId=2))
+    first, second = dap.requests(session)
+    assert first['command'] == 'stackTrace'
+    frames = {'stackFrames': [{'id': 7, 'name': 'f', 'source': {'path': PATH}, 'line': 3}]}
+    dap.deliver(session, dap.response(first, frames))
+    assert session.threads['1'].state != constants.THREAD_STATE_SUSPENDED
+
+    dap.deliver(session, dap.response(second, frames))
+    for thread_id in ('1', '2'):
+        frame, = session.threads[thread_id].frames
+        assert session.threads[thread_id].state == constants.THREAD_STATE_SUSPENDED
+        assert (frame.id, frame.file, frame.name, frame.line) == ('7', PATH, 'f', 3)
+
+
+def test_unknown_thread_is_listed_before_suspend(dap, session):
+    dap.deliver(session, dap.event('stopped', reason='pause', threadId=3))
+    threads, trace = dap.requests(session)
+    assert (threads['command'], trace['command']) == ('threads', 'stackTrace')
+    dap.deliver(session,
+                dap.response(threads, {'threads': [{'id': 3, 'name': 'Late'}]}),
+                dap.response(trace, {'stackFrames': [{'id': 1, 'name': 'g',
+                                                      'source': {'path': PATH}, 'line': 1}]}))
+    assert session.threads['3'].state == constants.THREAD_STATE_SUSPENDED
+
+
+def test_continued_resumes(dap, session):
+    stop(dap, session, 1)
+    dap.deliver(session, dap.event('continued', threadId=1, allThreadsContinued=True))
+    thread = session.threads['1']
+    assert thread.state == constants.THREAD_STATE_RUNNING
+    assert thread.frames == []
+
+
+def test_exited_thread_is_killed(dap, session):
+    dap.deliver(session, dap.event('thread', reason='exited', threadId=1))
+    assert '1' not in session.threads
+
+
+def test_frame_variables_are_fetched_by_reference(dap, session):
+    stop(dap, session, 1)
+    frame, = session.threads['1'].frames
+    loaded = []
+    session.requests.send(constants.CMD_GET_FRAME, '1\t%s\t' % frame.id,
+                          frame.thread, loaded.append)
+    scopes, = dap.requests(session)
+    assert scopes['arguments'] == {'frameId': 10}
+    dap.deliver(session, dap.response(scopes, {'scopes': [{'name': 'Locals',
+                                                           'variablesReference': 4}]}))
+    variables, = dap.requests(session)
+    assert variables['arguments'] == {'variablesReference': 4}
+    dap.deliver(session, dap.response(variables, {'variables': [
+        {'name': 'd', 'type': 'dict', 'value': '{...}', 'variablesReference': 5},
+        {'name': 'x', 'type': 'int', 'value': '1', 'variablesReference': 0},
+    ]}))
+    assert loaded == [[
+        {'type': 'variable', 'name': 'd', 'vtype': 'dict', 'value': '{...}',
+         'isContainer': True},
+        {'type': 'variable', 'name': 'x', 'vtype': 'int', 'value': '1', 'isContainer': False},
+    ]]
+
+    session.requests.send(constants.CMD_GET_VAR, frame.get_var_argument(['d']),
+                          frame.thread, loaded.append)
+    children, = dap.requests(session)
+    assert children['arguments'] == {'variablesReference': 5}
+    dap.deliver(session, dap.response(children, {'variables': [
+        {'name': "'k'", 'type': 'str', 'value': "'v'"}]}))
+    assert loaded[-1][0]['name'] == "'k'"
+
+
+def test_unlisted_variable_fails_on_poll(dap, session):
+    stop(dap, session, 1)
+    frame, = session.threads['1'].frames
+    failed = []
+    session.requests.send(constants.CMD_GET_VAR, frame.get_var_argument(['d']),
+                          frame.thread, None, on_fail=lambda: failed.append('d'))
+    session.requests.send(constants.CMD_GET_ARRAY, '', frame.thread, None,
+                          on_fail=lambda: failed.append('array'))
+    assert dap.requests(session) == []
+    session.poll()
+    assert failed == ['d', 'array']
+    assert cui.messages[-1] == 'GET_ARRAY is not available over DAP'
+
+
+def test_failed_response_fails_request(dap, session):
+    failed = []
+    session.requests.send(constants.CMD_LOAD_SOURCE, PATH, None, None,
+                          on_fail=lambda: failed.append(1))
+    source, = dap.requests(session)
+    assert source['arguments']['source'] == {'path': PATH}
+    dap.deliver(session, dap.response(source, success=False, message='No such file'))
+    assert failed == [1]
+    assert cui.messages[-1] == 'No such file'
+
+
+def test_breakpoints_are_set_per_file(dap, session, monkeypatch):
+    monkeypatch.setattr(cui_pydevd, 'pydevd_sessions', lambda: [session])
+    dap.breakpoints.add_breakpoint(PATH, 3, activate=True)
+    dap.breakpoints.add_breakpoint(PATH, 8, activate=True)
+    dap.breakpoints.set_properties(PATH, 8, condition='x > 1')
+    dap.breakpoints.add_breakpoint('/src/b.py', 1, activate=True)
+    dap.breakpoints.remove_breakpoint(PATH, 3)
+    requests = [request['arguments'] for request in dap.requests(session)]
+    assert requests[-2] == {'source': {'path': '/src/b.py'}, 'breakpoints': [{'line': 2}]}
+    assert requests[-1] == {'source': {'path': PATH},
+                            'breakpoints': [{'line': 9, 'condition': 'x > 1'}]}
+
+
+def test_exception_breakpoints_skip_excludes(dap, session):
+    dap.breakpoints.set_exception_breakpoint('Exception', caught=True, excludes=['KeyError'])
+    request = dap.requests(session)[-1]
+    assert request['command'] == 'setExceptionBreakpoints'
+    path = [{'names': ['Python Exceptions']}, {'names': ['Exception']}]
+    assert request['arguments']['exceptionOptions'] == [
+        {'path': path, 'breakMode': 'always'},
+        {'path': path, 'breakMode': 'unhandled'},
+    ]
+
+
+def test_output_is_written(dap, session):
+    written = []
+    session.output.write = lambda ctx, text: written.append((ctx, text))
+    dap.deliver(session,
+                dap.event('output', category='stderr', output='boom\n'),
+                dap.event('output', category='telemetry', output='{}'),
+                dap.event('output', category='stdout', output='hello\n'))
+    assert written == [(constants.OUTPUT_STDERR, 'boom\n'), (constants.OUTPUT_STDOUT, 'hello\n')]
@@ -0,0 +1,75 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import emacs
+
+
+class HighlightLine(object):
+    """Records the calls that would be sent to Emacs."""
+
+    def __init__(self):
+        self.calls = []
+
+    def highlight_line(self, overlay, file_, line):
+        self.calls.append(('highlight', overlay, file_, line))
+
+    def unhighlight_line(self, overlay):
+        self.calls.append(('unhighlight', overlay))
+
+    def remove_overlay(self, overlay):
+        self.calls.append(('remove', overlay))
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    module = HighlightLine()
+    monkeypatch.setattr(emacs, '_highlight_line', module)
+    monkeypatch.setattr(emacs, '_queue', emacs.collections.OrderedDict())
+    monkeypatch.setattr(emacs, '_sent', {})
+    monkeypatch.setattr(emacs, 'stats', emacs.collections.Counter())
+    return module.calls
+
+
+def test_updates_of_one_tick_are_superseded(sent):
+    for line in range(10):
+        emacs._enqueue('o1', ('highlight', '/src/a.py', line))
+    emacs._enqueue('o2', ('highlight', '/src/b.py', 1))
+    emacs.flush_overlay_updates()
+    assert sent == [('highlight', 'o1', '/src/a.py', 9),
+                    ('highlight', 'o2', '/src/b.py', 1)]
+    assert emacs.stats['superseded'] == 9
+    assert emacs.stats['sent'] == 2
+
+
+def test_updates_matching_the_sent_state_are_redundant(sent):
+    emacs._enqueue('o1', ('highlight', '/src/a.py', 3))
+    emacs.flush_overlay_updates()
+    emacs._enqueue('o1', ('highlight', '/src/a.py', 3))
+    emacs._enqueue('o2', ('unhighlight',))
+    emacs._enqueue('o3', ('remove',))
+    emacs.flush_overlay_updates()
+    assert sent == [('highlight', 'o1', '/src/a.py', 3)]
+    assert emacs.stats['redundant'] == 3
+    assert emacs.avoided_updates() == 3
+
+
+def test_resume_and_kill_are_sent_once(sent):
+    emacs._enqueue('o1', ('highlight', '/src/a.py', 3))
+    emacs.flush_overlay_updates()
+    emacs._enqueue('o1', ('unhighlight',))
+    emacs.flush_overlay_updates()
+    emacs._enqueue('o1', ('unhighlight',))
+    emacs._enqueue('o1', ('remove',))
+    emacs.flush_overlay_updates()
+    emacs._enqueue('o1', ('remove',))
+    emacs.flush_overlay_updates()
+    assert sent == [('highlight', 'o1', '/src/a.py', 3),
+                    ('unhighlight', 'o1'),
+                    ('remove', 'o1')]
+    assert emacs.stats['queued'] == 5
+    assert emacs.stats['superseded'] + emacs.stats['redundant'] + emacs.stats['sent'] == 5
@@ -0,0 +1,107 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+import json
+
+import pytest
+
+cui = pytest.importorskip('cui')
+
+import cui_pydevd
+from cui_pydevd import constants
+
+
+def properties(**kwargs):
+    result = dict(cui_pydevd._Breakpoints.DEFAULT_EXCEPTION_PROPERTIES, excludes=[])
+    result.update(kwargs)
+    return result
+
+
+@pytest.fixture
+def session(debuggee):
+    return debuggee.connect()
+
+
+def exception_commands(debuggee, session):
+    return [(command, argument) for command, _, argument in debuggee.received(session)
+            if command in (constants.CMD_ADD_EXCEPTION_BREAK,
+                           constants.CMD_REMOVE_EXCEPTION_BREAK)]
+
+
+def test_breakpoint_argument_has_no_condition():
+    assert cui_pydevd.exception_break_argument('Exception', properties(excludes=['KeyError'])) \
+        == 'python-Exception\tNone\tNone\t0\t1\t0'
+
+
+def test_excluded_types_are_registered_without_suspending():
+    registrations = cui_pydevd.exception_registrations(collections.OrderedDict([
+        ('Exception', properties(caught=True, excludes=['KeyError', 'StopIteration'])),
+        ('OSError', properties(excludes=['FileNotFoundError', 'StopIteration'])),
+    ]))
+    assert list(registrations.items()) == [
+        ('Exception', 'python-Exception\tNone\tNone\t1\t1\t0'),
+        ('OSError', 'python-OSError\tNone\tNone\t0\t1\t0'),
+        ('KeyError', 'python-KeyError\tFalse\tNone\t1\t1\t0'),
+        ('StopIteration', 'python-StopIteration\tFalse\tNone\t1\t1\t0'),
+        ('FileNotFoundError', 'python-FileNotFoundError\tFalse\tNone\t0\t1\t0'),
+    ]
+
+
+def test_excludes_do_not_override_breakpoints():
+    registrations = cui_pydevd.exception_registrations(collections.OrderedDict([
+        ('Exception', properties(excludes=['KeyError'])),
+        ('KeyError', properties(caught=True)),
+    ]))
+    assert registrations['KeyError'] == 'python-KeyError\tNone\tNone\t1\t1\t0'
+
+
+def test_changed_excludes_are_sent_to_sessions(debuggee, session):
+    add, remove = constants.CMD_ADD_EXCEPTION_BREAK, constants.CMD_REMOVE_EXCEPTION_BREAK
+    debuggee.breakpoints.set_exception_breakpoint('Exception', excludes=['KeyError'])
+    assert exception_commands(debuggee, session) == [
+        (add, 'python-Exception\tNone\tNone\t0\t1\t0'),
+        (add, 'python-KeyError\tFalse\tNone\t0\t1\t0'),
+    ]
+
+    debuggee.breakpoints.set_exception_breakpoint('Exception', excludes=['ValueError'])
+    assert exception_commands(debuggee, session) == [
+        (remove, 'python-KeyError'),
+        (add, 'python-ValueError\tFalse\tNone\t0\t1\t0'),
+    ]
+
+    debuggee.breakpoints.remove_exception_breakpoint('Exception')
+    assert exception_commands(debuggee, session) == [
+        (remove, 'python-Exception'),
+        (remove, 'python-ValueError'),
+    ]
+
+
+def test_new_sessions_register_excludes(debuggee):
+    debuggee.breakpoints.set_exception_breakpoint('Exception', caught=True, excludes=['KeyError'])
+    session = debuggee.connect()
+    assert exception_commands(debuggee, session) == [
+        (constants.CMD_ADD_EXCEPTION_BREAK, 'python-Exception\tNone\tNone\t1\t1\t0'),
+        (constants.CMD_ADD_EXCEPTION_BREAK, 'python-KeyError\tFalse\tNone\t1\t1\t0'),
+    ]
+
+
+def test_loaded_breakpoints_do_not_share_excludes(tmpdir, monkeypatch):
+    tmpdir.join('pydevd_breaks.json').write(json.dumps([
+        {'exception': 'ValueError', 'properties': {'caught': True}},
+        {'exception': 'KeyError', 'properties': {}},
+    ]))
+    monkeypatch.setattr(cui, 'user_directory', lambda name: str(tmpdir.join(name)),
+                        raising=False)
+    serialize = cui.get_variable(constants.ST_SERIALIZE_BREAKPOINTS)
+    cui.set_variable(constants.ST_SERIALIZE_BREAKPOINTS, True)
+    try:
+        breakpoints = cui_pydevd._Breakpoints()
+        breakpoints._read_breakpoints()
+    finally:
+        cui.set_variable(constants.ST_SERIALIZE_BREAKPOINTS, serialize)
+
+    breakpoints._exception_breakpoints['ValueError']['excludes'].append('UnicodeError')
+    assert breakpoints._exception_breakpoints['KeyError']['excludes'] == []
+    assert breakpoints.DEFAULT_EXCEPTION_PROPERTIES['excludes'] == []
@@ -0,0 +1,47 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import framing
+
+
+def test_lines_split_across_feeds():
+    framer = framing.LineFramer()
+    assert framer.feed(b'101\t1\tfi') == []
+    assert framer.pending() == 8
+    assert framer.feed(b'rst\n102\t3\tsecond\n103') == [b'101\t1\tfirst', b'102\t3\tsecond']
+    assert framer.pending() == 3
+    assert framer.feed(b'\t5\t\n') == [b'103\t5\t']
+    assert framer.pending() == 0
+
+
+def test_large_line_in_chunks():
+    framer = framing.LineFramer()
+    line = b'120\t2\t' + b'x' * (1024 * 1024)
+    lines = []
+    for start in range(0, len(line), 4096):
+        lines.extend(framer.feed(line[start:start + 4096]))
+    assert lines == []
+    assert framer.feed(b'\n') == [line]
+
+
+def test_empty_lines_are_returned():
+    assert framing.LineFramer().feed(b'\n\n') == [b'', b'']
+
+
+def test_bodies_split_across_feeds():
+    framer = framing.ContentLengthFramer()
+    assert framer.feed(b'Content-Length: 2\r\n\r') == []
+    assert framer.feed(b'\n{}Content-Length: 3\r\n\r\n[1') == [b'{}']
+    assert framer.pending() == 2
+    assert framer.feed(b']content-length: 0\r\n\r\n') == [b'[1]', b'']
+    assert framer.pending() == 0
+
+
+def test_header_without_content_length():
+    with pytest.raises(ValueError):
+        framing.ContentLengthFramer().feed(b'Content-Type: x\r\n\r\n')
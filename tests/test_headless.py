@@ -0,0 +1,85 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import io
+import json
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import constants
+from cui_pydevd import headless
+
+
+class Frame(object):
+    def __init__(self, id_, file_, name, line):
+        self.id = id_
+        self.file = file_
+        self.name = name
+        self.line = line
+
+
+class Requests(object):
+    """Answers every request with an empty list of variables."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, commands, thread, idempotent=False):
+        for command, argument, on_response, *_ in commands:
+            self.sent.append((command, argument))
+            on_response([])
+
+
+class Session(object):
+    def __init__(self):
+        self.requests = Requests()
+
+
+class Thread(object):
+    def __init__(self, frames):
+        self.id = 'pid_1_id_1'
+        self.session = Session()
+        self.frames = frames
+        self.resumed = False
+
+    def resume(self):
+        self.resumed = True
+
+
+def test_record_keeps_line_numbers_of_pydevd():
+    output = io.StringIO()
+    harvester = headless.Harvester(output, [], max_frames=2)
+    thread = Thread([Frame('1', '/src/a.py', 'f', 10), Frame('2', '/src/a.py', '<module>', 20)])
+    harvester.on_suspend(thread, '/src/a.py', 10)
+
+    record = json.loads(output.getvalue())
+    assert record['line'] == 10
+    assert [frame['line'] for frame in record['frames']] == [10, 20]
+    assert thread.resumed
+
+
+def test_expressions_without_frames():
+    output = io.StringIO()
+    harvester = headless.Harvester(output, [], max_frames=0, expressions=['x'])
+    thread = Thread([Frame('1', '/src/a.py', 'f', 10)])
+    harvester.on_suspend(thread, '/src/a.py', 10)
+
+    assert thread.session.requests.sent == [(constants.CMD_EVAL_EXPR,
+                                             'pid_1_id_1\t1\tLOCAL\tx\t0')]
+    record = json.loads(output.getvalue())
+    assert record['frames'] == []
+    assert record['expressions'] == {'x': None}
+    assert thread.resumed
+
+
+def test_negative_frame_count_is_rejected():
+    with pytest.raises(SystemExit):
+        headless.main(['--frames', '-1', '-o', 'hits.jsonl', 'a.py:1'])
+
+
+def test_breakpoint_spec_is_one_based():
+    path, line = headless.parse_breakpoint('a.py:10')
+    assert path.endswith('a.py') and line == 9
@@ -0,0 +1,101 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import history
+
+
+def variable(name, value, variables=()):
+    return {'name': name, 'vtype': 'int', 'value': value, 'variables': list(variables)}
+
+
+class Frame(object):
+    def __init__(self, *variables):
+        self.variables = list(variables)
+
+
+class Thread(object):
+    def __init__(self):
+        self.stack = ('a.py', 'f', 1)
+        self.frames = []
+
+
+def test_later_snapshots_store_differences():
+    h = history.History()
+    h.record('s1', {(0, 'a'): ('int', '1'), (0, 'b'): ('int', '2')})
+    snapshot = h.record('s2', {(0, 'a'): ('int', '1'), (0, 'c'): ('int', '3')})
+    assert snapshot.changed == {(0, 'c'): ('int', '3')}
+    assert snapshot.removed == ((0, 'b'),)
+    assert h.variables(1) == {(0, 'a'): ('int', '1'), (0, 'c'): ('int', '3')}
+
+
+def test_drop_oldest_folds_into_successor():
+    h = history.History()
+    h.record('s1', {(0, 'a'): ('int', '1'), (0, 'b'): ('int', '2')})
+    h.record('s2', {(0, 'a'): ('int', '1'), (0, 'c'): ('int', '3')})
+    h.record('s3', {(0, 'a'): ('int', '4'), (0, 'c'): ('int', '3')})
+    expected = [h.variables(1), h.variables(2)]
+    size = h.size()
+
+    freed = h.drop_oldest()
+    assert [h.variables(0), h.variables(1)] == expected
+    assert h.snapshots[0].stack == 's2'
+    assert h.snapshots[0].removed == ()
+    assert h.size() == size - freed
+
+
+def test_drop_last_snapshot_resets_differences():
+    h = history.History()
+    h.record('s1', {(0, 'a'): ('int', '1')})
+    h.drop_oldest()
+    snapshot = h.record('s2', {(0, 'a'): ('int', '1')})
+    assert snapshot.changed == {(0, 'a'): ('int', '1')}
+
+
+def test_collect_keys_nested_variables_by_path():
+    frames = [Frame(variable('x', '1', [variable('y', '2')])), Frame()]
+    assert history._collect(frames) == {(0, 'x'): ('int', '1'),
+                                        (0, 'x', 'y'): ('int', '2')}
+
+
+def test_least_recently_used_thread_is_evicted_first():
+    store = history.HistoryStore()
+    first, second = Thread(), Thread()
+    for thread in (first, second):
+        thread.frames = [Frame(variable('x', 'v' * 100))]
+        store.record(thread, 1 << 20)
+    # Looking at a history marks it as recently used
+    store.history(first)
+
+    store._evict(store.size - 1)
+    assert store.history(second) is None
+    assert len(store.history(first).snapshots) == 1
+    assert store.size == store.history(first).size() > 0
+
+
+def test_store_size_follows_records_and_removal():
+    store = history.HistoryStore()
+    thread = Thread()
+    for value in range(5):
+        thread.frames = [Frame(variable('x', str(value)))]
+        store.record(thread, 1 << 20)
+    assert store.size == store.history(thread).size()
+    store.record(thread, 0)
+    assert store.size == 0
+    assert store.history(thread) is None
+
+    store.record(thread, 1 << 20)
+    store.remove(thread)
+    assert store.size == 0
+
+
+def test_threads_without_stack_are_not_recorded():
+    store = history.HistoryStore()
+    thread = Thread()
+    thread.stack = None
+    store.record(thread, 1 << 20)
+    assert store.history(thread) is None
@@ -0,0 +1,74 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import time
+
+from urllib.parse import quote
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import constants
+from cui_pydevd import output
+from cui_pydevd import payload
+
+STDOUT = constants.OUTPUT_STDOUT
+STDERR = constants.OUTPUT_STDERR
+
+
+def test_writes_are_joined_to_lines_per_stream():
+    log = output.OutputLog(100)
+    log.write(STDOUT, 'hello ')
+    log.write(STDERR, 'oops\n')
+    log.write(STDOUT, 'world\nnext')
+    assert list(log.lines) == [(STDERR, 'oops'), (STDOUT, 'hello world')]
+    assert log.partial_lines() == [(STDOUT, 'next')]
+    assert log.count == 2
+
+
+def test_carriage_return_overwrites_line():
+    log = output.OutputLog(100)
+    log.write(STDOUT, ' 10%\r')
+    log.write(STDOUT, ' 20%\r')
+    assert log.partial_lines() == [(STDOUT, ' 20%')]
+    log.write(STDOUT, 'done\r\n')
+    assert list(log.lines) == [(STDOUT, 'done')]
+    assert log.partial_lines() == []
+
+
+def test_progress_bar_keeps_partial_short():
+    log = output.OutputLog(100)
+    started = time.perf_counter()
+    for _ in range(20000):
+        log.write(STDOUT, 'x' * 50 + '\r')
+    assert time.perf_counter() - started < 1
+    assert log.partial_lines() == [(STDOUT, 'x' * 50)]
+    assert log.count == 0
+
+
+def test_long_partial_line_is_flushed():
+    log = output.OutputLog(100)
+    for _ in range(output.MAX_PARTIAL_LENGTH // 1000 + 1):
+        log.write(STDOUT, 'y' * 1000)
+    assert log.count == 1
+    assert len(log.lines[0][1]) > output.MAX_PARTIAL_LENGTH
+    assert log.partial_lines() == []
+
+
+def test_lines_since_after_rotation():
+    log = output.OutputLog(3)
+    log.write(STDOUT, ''.join('%s\n' % i for i in range(5)))
+    assert log.count == 5
+    assert [text for _, text in log.lines] == ['2', '3', '4']
+    assert log.lines_since(3) == [(STDOUT, '3'), (STDOUT, '4')]
+    assert log.lines_since(1) is None
+
+
+@pytest.mark.parametrize('text', ['plain line\n', '100% <done> & "ok"\r\n', 'café\n'])
+def test_console_output_parsing(text):
+    raw = ('<xml><io s="%s" ctx="2"/></xml>' % quote(text, '/>_= ')).encode('utf-8')
+    assert payload.parse_write_to_console(None, raw) == \
+        payload.parse_object(None, payload.et.fromstring(raw))
+    assert payload.parse_write_to_console(None, raw)[0]['text'] == text
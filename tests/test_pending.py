@@ -0,0 +1,100 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import constants
+from cui_pydevd import pending
+
+Response = collections.namedtuple('Response', 'sequence_no payload')
+
+
+class Session(object):
+    def __init__(self):
+        self.sent = []
+        self._sequence_no = 1
+
+    def send_command(self, command, argument=''):
+        self.sent.append((command, argument))
+        self._sequence_no += 2
+        return self._sequence_no
+
+    def send_commands(self, commands):
+        return [self.send_command(command, argument) for command, argument in commands]
+
+
+@pytest.fixture
+def tracker():
+    return pending.RequestTracker(Session(), timeout=0.0, retries=1)
+
+
+def test_complete_routes_payload(tracker):
+    received = []
+    sequence_no = tracker.send(constants.CMD_GET_VAR, 'x', None, received.append)
+    assert tracker.complete(Response(sequence_no, ['value']))
+    assert received == [['value']]
+    assert tracker.outstanding() == 0
+
+
+def test_unknown_response_is_dropped(tracker):
+    assert not tracker.complete(Response(99, None))
+    assert tracker.stats['dropped'] == 1
+
+
+def test_cancel_thread_only_cancels_its_requests(tracker):
+    cancelled = []
+    tracker.send(constants.CMD_GET_VAR, 'a', 'thread-1', None, lambda: cancelled.append('a'))
+    tracker.send(constants.CMD_GET_VAR, 'b', 'thread-2', None, lambda: cancelled.append('b'))
+    tracker.cancel_thread('thread-1')
+    assert cancelled == ['a']
+    assert tracker.outstanding() == 1
+
+
+def test_fail_cancels_request(tracker):
+    cancelled = []
+    sequence_no = tracker.send(constants.CMD_EVAL_EXPR, 'x', None, None,
+                               lambda: cancelled.append(True))
+    tracker.fail(sequence_no)
+    assert cancelled == [True]
+    assert tracker.stats['failed'] == 1
+
+
+def test_idempotent_requests_are_retried(tracker):
+    tracker.send(constants.CMD_GET_FRAME, 'f', None, None, idempotent=True)
+    tracker.expire()
+    assert tracker.stats['retried'] == 1
+    assert len(tracker._session.sent) == 2
+    tracker.expire()
+    assert tracker.stats['timed_out'] == 1
+    assert tracker.outstanding() == 0
+
+
+def test_expressions_are_not_retried(tracker):
+    cancelled = []
+    tracker.send_batch([(constants.CMD_EVAL_EXPR, 'x', None, lambda: cancelled.append(True))],
+                       None)
+    tracker.expire()
+    assert len(tracker._session.sent) == 1
+    assert cancelled == [True]
+
+
+def test_outstanding_by_command(tracker):
+    tracker.send(constants.CMD_GET_VAR, 'a', None, None)
+    tracker.send(constants.CMD_GET_VAR, 'b', None, None)
+    assert tracker.outstanding_by_command() == {'GET_VAR': 2}
+
+
+def test_fail_calls_on_fail_instead_of_on_cancel(tracker):
+    called = []
+    sequence_no = tracker.send(constants.CMD_LOAD_SOURCE, 'x', None, None,
+                               lambda: called.append('cancel'),
+                               on_fail=lambda: called.append('fail'))
+    tracker.fail(sequence_no)
+    assert called == ['fail']
+    assert tracker.stats['failed'] == 1
+    assert tracker.outstanding() == 0
@@ -0,0 +1,98 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import time
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import constants
+from cui_pydevd import profiler
+
+
+class Thread(object):
+    def __init__(self, id_, state=constants.THREAD_STATE_RUNNING):
+        self.id = id_
+        self.state = state
+
+
+class Session(object):
+    def __init__(self, threads=64):
+        self.threads = {'t%s' % i: Thread('t%s' % i) for i in range(threads)}
+        self.sent = []
+        self.writes = 0
+
+    def send_command(self, command, argument=''):
+        self.send_commands([(command, argument)])
+
+    def send_commands(self, commands):
+        self.sent.extend(commands)
+        self.writes += 1
+
+
+def suspend(thread_id, stop_reason=constants.CMD_THREAD_SUSPEND):
+    return {'type': 'thread_suspend', 'id': thread_id, 'stop_reason': stop_reason,
+            'frames': [{'file': '/src/a.py', 'name': 'inner'},
+                       {'file': '/src/a.py', 'name': 'outer'}]}
+
+
+@pytest.fixture
+def sampler():
+    sampler = profiler.Sampler(Session())
+    sampler.start(0.01)
+    sampler.tick()
+    return sampler
+
+
+def test_sampled_threads_are_resumed_and_recorded(sampler):
+    writes = sampler.session.writes
+    remaining = sampler.filter_suspends([suspend('t1'), suspend('t2')])
+    assert remaining == []
+    assert sampler.samples == 2
+    assert sampler.stacks[('outer (a.py)', 'inner (a.py)')] == 2
+    assert sampler.session.sent[-2:] == [(constants.CMD_THREAD_RESUME, 't1'),
+                                         (constants.CMD_THREAD_RESUME, 't2')]
+    assert sampler.session.writes == writes + 1
+    assert sampler.filter_resume({'id': 't1'})
+    assert not sampler.filter_resume({'id': 't1'})
+
+
+def test_breakpoint_suspends_are_passed_through(sampler):
+    hit = suspend('t1', constants.CMD_SET_BREAK)
+    assert sampler.filter_suspends([hit]) == [hit]
+    assert sampler.samples == 0
+
+
+def test_user_suspends_are_passed_through(sampler):
+    sampler.filter_suspends([suspend('t1')])
+    # A second suspend of the same thread is not part of the round
+    user = suspend('t1')
+    assert sampler.filter_suspends([user]) == [user]
+    assert sampler.samples == 1
+
+
+def test_suspended_threads_are_not_sampled():
+    session = Session(2)
+    session.threads['t0'].state = constants.THREAD_STATE_SUSPENDED
+    sampler = profiler.Sampler(session)
+    sampler.start(0.01)
+    sampler.tick()
+    user = suspend('t0')
+    assert sampler.filter_suspends([user, suspend('t1')]) == [user]
+
+
+def test_paused_time_does_not_exceed_wall_time(sampler):
+    time.sleep(0.01)
+    sampler.filter_suspends([suspend('t%s' % i) for i in range(32)])
+    time.sleep(0.01)
+    sampler.filter_suspends([suspend('t%s' % i) for i in range(32, 64)])
+    assert 0 < sampler.paused <= sampler.elapsed()
+
+
+def test_folded_output(sampler, tmp_path):
+    sampler.filter_suspends([suspend('t1')])
+    path = tmp_path / 'stacks.folded'
+    sampler.write_folded(str(path))
+    assert path.read_text() == 'outer (a.py);inner (a.py) 1\n'
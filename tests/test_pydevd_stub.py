@@ -0,0 +1,46 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import runpy
+import subprocess
+import sys
+
+# The launcher is a standalone script, it is loaded without importing
+# the cui_pydevd package.
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    os.pardir, 'cui_pydevd', 'pydevd_stub.py')
+stub = runpy.run_path(STUB, run_name='pydevd_stub')
+
+
+def test_parse_script():
+    assert stub['parse_args'](['stub', 'localhost', '4040', 'prog.py', '-v', 'x']) == \
+        ('localhost', 4040, 'prog.py', False, ['-v', 'x'])
+
+
+def test_parse_module():
+    assert stub['parse_args'](['stub', 'localhost', '4040', '-m', 'pkg.mod', 'a']) == \
+        ('localhost', 4040, 'pkg.mod', True, ['a'])
+
+
+def test_parse_malformed():
+    assert stub['parse_args'](['stub', 'localhost', '4040']) is None
+    assert stub['parse_args'](['stub', 'localhost', 'port', 'prog.py']) is None
+    assert stub['parse_args'](['stub', 'localhost', '4040', '-m']) is None
+
+
+def test_usage_without_importing_pydevd():
+    result = subprocess.run([sys.executable, STUB], stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    assert result.returncode == 2
+    assert result.stderr.startswith('Usage:')
+
+
+def test_child_identity_extends_parent(monkeypatch):
+    monkeypatch.delenv(stub['IDENTITY_ENV'], raising=False)
+    identity = stub['program_identity']('prog.py', False, ['-v'])
+    assert identity['program'] == os.path.abspath('prog.py')
+    # Only stored for children if pydevd is not connected
+    stub['announce_identity'](identity)
+    assert stub['child_identity'](3) == dict(identity, children=[3])
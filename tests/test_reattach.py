@@ -0,0 +1,105 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+cui = pytest.importorskip('cui')
+
+from cui_pydevd import buffers
+from cui_pydevd import reattach
+
+
+class Buffer(object):
+    def __init__(self, owner):
+        self.owner = owner
+
+    def attach_thread(self, thread):
+        self.owner = thread
+
+    def attach_session(self, session):
+        self.owner = session
+
+
+class Buffers(object):
+    """Buffers by name, standing in for the buffer list of cui."""
+
+    def __init__(self, monkeypatch):
+        self.buffers = {}
+        monkeypatch.setattr(cui, 'exec_if_buffer_exists', self.exec_if_buffer_exists,
+                            raising=False)
+        monkeypatch.setattr(cui, 'kill_buffer', self.kill_buffer, raising=False)
+        monkeypatch.setattr(cui, 'delete_window_set_by_name', lambda name: None,
+                            raising=False)
+
+    def create(self, cls, owner):
+        buffer = self.buffers[cls.name(owner)] = Buffer(owner)
+        return buffer
+
+    def exec_if_buffer_exists(self, fn, cls, *args):
+        buffer = self.buffers.get(cls.name(*args))
+        if buffer is not None:
+            fn(buffer)
+
+    def kill_buffer(self, cls, *args):
+        self.buffers.pop(cls.name(*args), None)
+
+
+@pytest.fixture
+def store(debuggee, monkeypatch):
+    store = reattach.StateStore(1)
+    monkeypatch.setattr(reattach, 'store', store)
+    return store
+
+
+def closed(debuggee, address, identity):
+    session = debuggee.connect(address)
+    debuggee.announce(session, identity)
+    session.close()
+
+
+def test_store_evicts_oldest(store, debuggee):
+    old = reattach.SessionState(debuggee.connect(('a', 1)), {}, [], {}, [], [])
+    assert store.store('x', old) == []
+    new = reattach.SessionState(debuggee.connect(('b', 1)), {}, [], {}, [], [])
+    assert store.store('y', new) == [old]
+    assert store.take('x') is None
+
+
+def test_unique_key_avoids_stored_sessions(store, debuggee):
+    closed(debuggee, ('host', 1), 'program')
+    assert debuggee.connect(('host', 1)).key == 'host:1#2'
+    assert debuggee.connect(('host', 2)).key == 'host:2'
+
+
+def test_reattach_takes_over_buffers(store, debuggee, monkeypatch):
+    registry = Buffers(monkeypatch)
+    old = debuggee.connect(('host', 1))
+    debuggee.announce(old, 'program')
+    old_thread = debuggee.create_thread(old, 'pid_1_id_1', 'MainThread')
+    output = registry.create(buffers.OutputBuffer, old)
+    frame = registry.create(buffers.FrameBuffer, old_thread)
+    old.close()
+
+    new = debuggee.connect(('host', 2))
+    thread = debuggee.create_thread(new, 'pid_2_id_1', 'MainThread')
+    other = debuggee.create_thread(new, 'pid_2_id_2', 'Worker')
+    debuggee.announce(new, 'program')
+
+    assert new.key == 'host:1'
+    assert thread.key == 'pid_1_id_1'
+    assert other.key == 'pid_2_id_2'
+    assert output.owner is new
+    assert frame.owner is thread
+
+
+def test_evicted_state_kills_buffers(store, debuggee, monkeypatch):
+    registry = Buffers(monkeypatch)
+    old = debuggee.connect(('host', 1))
+    debuggee.announce(old, 'program')
+    registry.create(buffers.FrameBuffer, debuggee.create_thread(old, 'pid_1_id_1', 'MainThread'))
+    registry.create(buffers.OutputBuffer, old)
+    old.close()
+
+    closed(debuggee, ('host', 2), 'other program')
+    assert registry.buffers == {}
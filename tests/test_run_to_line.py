@@ -0,0 +1,40 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import constants
+
+
+@pytest.fixture
+def session(debuggee):
+    session = debuggee.connect()
+    session.run_to_line(debuggee.create_thread(session, 't1', 'MainThread'), '/src/a.py', 9)
+    debuggee.create_thread(session, 't2', 'Worker')
+    debuggee.received(session)
+    return session
+
+
+def sent_commands(debuggee, session):
+    return [command for command, _, _ in debuggee.received(session)]
+
+
+def test_other_thread_suspending_keeps_breakpoint(debuggee, session):
+    debuggee.suspend(session, session.threads['t2'], constants.CMD_SET_BREAK, '/src/b.py', 3)
+    assert sent_commands(debuggee, session) == []
+    assert len(session._temporary_breakpoints) == 1
+
+
+def test_hitting_the_breakpoint_removes_it(debuggee, session):
+    debuggee.suspend(session, session.threads['t2'], constants.CMD_SET_BREAK, '/src/a.py', 10)
+    assert sent_commands(debuggee, session) == [constants.CMD_REMOVE_BREAK]
+    assert session._temporary_breakpoints == []
+
+
+def test_requesting_thread_suspending_removes_it(debuggee, session):
+    debuggee.suspend(session, session.threads['t1'], constants.CMD_THREAD_SUSPEND, '/src/b.py', 3)
+    assert sent_commands(debuggee, session) == [constants.CMD_REMOVE_BREAK]
+    assert session._temporary_breakpoints == []
@@ -0,0 +1,70 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+
+import pytest
+
+pytest.importorskip('cui')
+
+from cui_pydevd import pending
+from cui_pydevd import search
+
+Response = collections.namedtuple('Response', 'sequence_no payload')
+
+
+class Session(object):
+    def __init__(self):
+        self.sent = {}
+        self._sequence_no = 1
+        self.requests = pending.RequestTracker(self, timeout=10.0, retries=0)
+
+    def send_command(self, command, argument=''):
+        self._sequence_no += 2
+        self.sent[argument] = self._sequence_no
+        return self._sequence_no
+
+
+class Thread(object):
+    def __init__(self):
+        self.session = Session()
+
+
+class Frame(object):
+    def __init__(self, variables):
+        self.thread = Thread()
+        self.variables = variables
+
+    def get_var_argument(self, path):
+        return '.'.join(path)
+
+
+def variable(name, value='', container=False):
+    return {'name': name, 'vtype': 'object', 'value': value, 'isContainer': container}
+
+
+def respond(session, path, variables):
+    session.requests.complete(Response(session.sent[path], variables))
+
+
+def test_failed_node_is_skipped():
+    frame = Frame([variable('a', container=True), variable('b', container=True)])
+    s = search.VariableSearch(frame, 'needle', max_depth=3, max_nodes=100, window=1)
+    s.start()
+    session = frame.thread.session
+    session.requests.fail(session.sent['a'])
+    assert s.active and s.skipped == 1
+    respond(session, 'b', [variable('needle')])
+    assert not s.active
+    assert s.matches == [(('b', 'needle'), 'object', '')]
+
+
+def test_cancel_stops_search():
+    frame = Frame([variable('a', container=True), variable('b', container=True)])
+    s = search.VariableSearch(frame, 'needle', max_depth=3, max_nodes=100, window=1)
+    s.start()
+    s.cancel()
+    frame.thread.session.requests.cancel_all()
+    assert not s.active
+    assert list(frame.thread.session.sent) == ['a']
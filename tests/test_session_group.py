@@ -0,0 +1,48 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+pytest.importorskip('cui')
+
+import cui_pydevd
+from cui_pydevd import constants
+
+
+class Connection(object):
+    def __init__(self):
+        self.written = []
+
+    def send_all(self, data):
+        self.written.append(data)
+
+
+def make_group(size):
+    group = cui_pydevd.SessionGroup('test')
+    group.sessions.extend(Connection() for _ in range(size))
+    return group
+
+
+def test_broadcast_writes_the_same_line_to_all_members():
+    group = make_group(64)
+    sequence_no = group.broadcast(constants.CMD_THREAD_SUSPEND, '*')
+    expected = ('%s\t%s\t*\n' % (constants.CMD_THREAD_SUSPEND, sequence_no)).encode('utf-8')
+    assert all(session.written == [expected] for session in group.sessions)
+
+
+def test_broadcast_to_subset():
+    group = make_group(3)
+    group.broadcast(constants.CMD_THREAD_RESUME, '*', group.sessions[1:])
+    assert [len(session.written) for session in group.sessions] == [0, 1, 1]
+
+
+def test_broadcast_without_members_sends_nothing():
+    group = make_group(0)
+    assert group.broadcast(constants.CMD_THREAD_RESUME, '*') is None
+
+
+def test_sequence_numbers_are_shared_and_odd():
+    group = make_group(2)
+    numbers = [group.next_sequence_no() for _ in range(3)]
+    assert numbers == [1, 3, 5]
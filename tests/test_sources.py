@@ -0,0 +1,94 @@
+# Copyright (c) 2017 Christoph Landgraf. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import pytest
+
+cui = pytest.importorskip('cui')
+
+from cui_pydevd import constants
+from cui_pydevd import sources
+
+REMOTE_PATH = '/nonexistent/remote/module.py'
+
+
+@pytest.fixture
+def cache(tmpdir, monkeypatch):
+    cache = sources.SourceCache(str(tmpdir))
+    monkeypatch.setattr(sources, '_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def revalidate():
+    cui.set_variable(constants.ST_REVALIDATE_SOURCES, True)
+    yield
+    cui.set_variable(constants.ST_REVALIDATE_SOURCES, False)
+
+
+@pytest.fixture
+def session(debuggee):
+    session = debuggee.connect()
+    debuggee.create_thread(session, 't1', 'MainThread')
+    return session
+
+
+def load_requests(debuggee, session):
+    return [sequence_no for command, sequence_no, _ in debuggee.received(session)
+            if command == constants.CMD_LOAD_SOURCE]
+
+
+def test_fetched_once_per_session(cache, debuggee, session):
+    loaded = []
+    thread = session.threads['t1']
+    assert session.local_source(REMOTE_PATH, thread, lambda: loaded.append(1)) is None
+    sequence_no, = load_requests(debuggee, session)
+    debuggee.load_source(session, sequence_no, 'x = 1\n')
+    assert loaded == [1]
+    path = session.local_source(REMOTE_PATH, thread, None)
+    assert open(path).read() == 'x = 1\n'
+    assert load_requests(debuggee, session) == []
+
+
+def test_cached_source_is_trusted(cache, debuggee, session):
+    path = cache.store(REMOTE_PATH, 'x = 1\n')
+    assert session.local_source(REMOTE_PATH, session.threads['t1'], None) == path
+    assert load_requests(debuggee, session) == []
+
+
+def test_changed_source_is_redisplayed(cache, revalidate, debuggee, session):
+    cache.store(REMOTE_PATH, 'x = 1\n')
+    loaded = []
+    assert session.local_source(REMOTE_PATH, session.threads['t1'],
+                                lambda: loaded.append(1)) is not None
+    sequence_no, = load_requests(debuggee, session)
+    debuggee.load_source(session, sequence_no, 'x = 2\n')
+    assert loaded == [1]
+    assert open(cache.lookup(REMOTE_PATH)).read() == 'x = 2\n'
+
+
+def test_unchanged_source_is_not_redisplayed(cache, revalidate, debuggee, session):
+    cache.store(REMOTE_PATH, 'x = 1\n')
+    loaded = []
+    session.local_source(REMOTE_PATH, session.threads['t1'], lambda: loaded.append(1))
+    sequence_no, = load_requests(debuggee, session)
+    debuggee.load_source(session, sequence_no, 'x = 1\n')
+    assert loaded == []
+
+
+def test_request_is_cancelled_on_resume(cache, debuggee, session):
+    thread = session.threads['t1']
+    session.local_source(REMOTE_PATH, thread, None)
+    debuggee.resume(session, thread)
+    session.local_source(REMOTE_PATH, thread, None)
+    assert len(load_requests(debuggee, session)) == 2
+
+
+def test_error_is_remembered(cache, debuggee, session):
+    thread = session.threads['t1']
+    session.local_source(REMOTE_PATH, thread, None)
+    sequence_no, = load_requests(debuggee, session)
+    debuggee.fail(session, sequence_no, 'No such file')
+    assert session.local_source(REMOTE_PATH, thread, None) is None
+    assert load_requests(debuggee, session) == []
+    assert not cache.loading